@@ -1,7 +1,7 @@
 import os
 import subprocess
 import datetime
-from typing import Optional
+from typing import Iterator, Optional
 import requests
 import openai
 import json
@@ -9,6 +9,9 @@ import difflib
 import logging
 import time
 import re
+import concurrent.futures
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from config import load_config, get_api_key, get_llm, get_prompt
 
@@ -17,6 +20,11 @@ from calendar_reader import (
     list_events_for_day as _local_list_events_for_day,
     list_events_for_range as _local_list_events_for_range,
     create_event as _local_create_event,
+    create_events as _local_create_events,
+    find_free_time as _find_free_slots,
+    check_conflicts as _find_conflicts,
+    WORKDAY_START,
+    WORKDAY_END,
 )
 try:
     from n8n_client import (
@@ -28,8 +36,7 @@ try:
     )
 except Exception:
     USE_N8N = False
-from dateparser import parse as parse_date
-from date_utils import date_keyword, today_pt
+from date_utils import date_keyword, parse_when, resolve_date, today_pt
 from reminder_scheduler import (
     schedule as schedule_reminder,
     schedule_air_quality,
@@ -40,14 +47,21 @@ from reminder_scheduler import (
     list_tasks,
 )
 from action_executor import execute as execute_action
+import tracing
+from tracing import span
+from intent_rules import INTENT_THRESHOLD, match_intent
 from memory_db import (
     save_message,
     get_recent_messages,
 )
 from summarizer import summarize_text
-from llm_client import chat_completion, gpt
+import vector_index
+from onedrive_reader import search as _search_files
+from llm_client import chat_completion, gpt, stream_chat_completion
 from server_common import _load_model
 from user_settings import get_selected_model
+from session_store import get_session
+from conversation import build_messages, estimate_tokens, record_turn
 
 
 def _is_relevant(prior: dict, query: str) -> bool:
@@ -70,7 +84,18 @@ FOLLOW_UPS = {
     "yesterday",
 }
 
-last_tool_output = {}
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", "4"))
+# Ask the model for schema-constrained JSON plans instead of free text
+PLANNER_JSON_MODE = os.getenv("PLANNER_JSON_MODE", "1") not in {"0", "false", "no"}
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "30"))
+# Tools that consume the output of other actions in the same plan
+DEPENDENT_TOOLS = {"summarize"}
+# Token budget for document excerpts handed to the answer step
+DOC_CONTEXT_TOKENS = int(os.getenv("DOC_CONTEXT_TOKENS", "1500"))
+DOC_TOP_K = int(os.getenv("DOC_TOP_K", "8"))
+# A timed-out tool keeps its thread until it returns (running futures cannot
+# be cancelled), so the pool gets headroom for a few stuck calls.
+_tool_pool = ThreadPoolExecutor(max_workers=TOOL_WORKERS * 2, thread_name_prefix="tool")
 
 def _search_email(a):
     try:
@@ -80,50 +105,314 @@ def _search_email(a):
     except Exception as e:
         return f"\u26a0\ufe0f email error: {e}"
 
+def _get_calendar(a):
+    day = resolve_date(a.get("date") or "today")
+    if not day:
+        return "\u26a0\ufe0f Invalid date"
+    if USE_N8N:
+        return list_events_for_day(day.isoformat())
+    return _local_list_events_for_day(day.isoformat(), fresh=bool(a.get("fresh")))
+
+def _day_events(day):
+    """Events for ``day`` from n8n, or None to let calendar_reader look them up."""
+    if USE_N8N:
+        return list_events_for_day(day.isoformat())
+    return None
+
+
+def _hhmm(iso: str) -> str:
+    return iso[11:16]
+
+
+def _find_free_time(a):
+    day = resolve_date(a.get("date") or "today")
+    if not day:
+        return "\u26a0\ufe0f Invalid date"
+    start = a.get("start") or WORKDAY_START
+    end = a.get("end") or WORKDAY_END
+    minutes = int(a.get("duration") or 30)
+    slots = _find_free_slots(day, start, end, minutes, events=_day_events(day))
+    label = day.strftime("%a %Y-%m-%d")
+    if not slots:
+        return f"No free time of {minutes}+ minutes on {label} between {start} and {end}."
+    spans = ", ".join(f"{_hhmm(s['start'])}-{_hhmm(s['end'])}" for s in slots)
+    return f"Free on {label}: {spans}"
+
+
+def _check_conflicts(a):
+    day = resolve_date(a.get("date") or "today")
+    if not day:
+        return "\u26a0\ufe0f Invalid date"
+    start = parse_when(f"{day.isoformat()} {a.get('time') or '09:00'}")
+    if not start:
+        return "\u26a0\ufe0f Invalid time"
+    end = start + datetime.timedelta(minutes=int(a.get("duration") or 60))
+    clashes = _find_conflicts(start, end, events=_day_events(day))
+    when = f"{day:%a %Y-%m-%d} {start:%H:%M}-{end:%H:%M}"
+    if not clashes:
+        return f"No conflicts on {when}."
+    names = ", ".join(f"{c['title']} ({_hhmm(c['start']) or 'all day'})" for c in clashes)
+    return f"Conflicts on {when}: {names}"
+
+
+def _search_documents(a):
+    """Best-matching document excerpts that fit the answer step's token budget.
+
+    Uses semantic search when the vector index is available and falls back
+    to keyword search over the full-text index.
+    """
+    query = (a.get("query") or "").strip()
+    if not query:
+        return "\u26a0\ufe0f No search query"
+    budget = int(a.get("tokens") or DOC_CONTEXT_TOKENS)
+    try:
+        hits = vector_index.search(query, DOC_TOP_K)
+        if hits is None:
+            hits = [
+                {"name": h["name"], "path": h["path"], "text": h["snippet"]}
+                for h in _search_files(query, DOC_TOP_K)
+            ]
+    except Exception as e:
+        return f"\u26a0\ufe0f document search error: {e}"
+    excerpts = []
+    used = 0
+    for hit in hits:
+        cost = estimate_tokens(hit["text"])
+        if used + cost > budget:
+            if not excerpts:
+                excerpts.append({"name": hit["name"], "path": hit["path"],
+                                 "text": hit["text"][:budget * 4]})
+            break
+        excerpts.append({"name": hit["name"], "path": hit["path"], "text": hit["text"]})
+        used += cost
+    return excerpts or f"No documents match '{query}'."
+
+
 TOOL_REGISTRY = {
     "search_email": _search_email,
-    "get_calendar": lambda a: (
-        list_events_for_day(
-            parse_date(a.get("date", "today")).strftime("%Y-%m-%d")
-        )
-        if USE_N8N
-        else _local_list_events_for_day(
-            parse_date(a.get("date", "today")).strftime("%Y-%m-%d")
-        )
-    )
-    if parse_date(a.get("date", "today"))
-    else "\u26a0\ufe0f Invalid date",
+    "get_calendar": lambda a: _get_calendar(a),
     "get_calendar_range": lambda a: (
         list_events_for_range(a.get("start"), a.get("end"))
         if USE_N8N
-        else _local_list_events_for_range(a.get("start"), a.get("end"))
-    ),
-    "summarize": lambda a: summarize_text(
-        last_tool_output.get(
-            a.get("source") or next(iter(last_tool_output), None),
-            "\u26a0\ufe0f No previous tool output"
+        else _local_list_events_for_range(
+            a.get("start"), a.get("end"), fresh=bool(a.get("fresh"))
         )
     ),
+    "summarize": lambda a: _summarize(a),
     "chat": lambda a: gpt(a.get("prompt", ""), a["model"]),
-    "schedule_event": lambda a: _schedule(a)
+    "schedule_event": lambda a: _schedule(a),
+    "schedule_events": lambda a: _schedule_many(a),
+    "find_free_time": _find_free_time,
+    "check_conflicts": _check_conflicts,
+    "search_documents": _search_documents,
+}
+
+# Arguments the planner may pass to each tool, as JSON schema fragments.
+# Used to build the structured planning schema and to validate plans.
+TOOL_SPECS = {
+    "search_email": {
+        "params": {"query": {"type": "string"}},
+        "required": ["query"],
+    },
+    "get_calendar": {
+        "params": {"date": {"type": "string"}, "fresh": {"type": "boolean"}},
+        "required": ["date"],
+    },
+    "get_calendar_range": {
+        "params": {
+            "start": {"type": "string"},
+            "end": {"type": "string"},
+            "fresh": {"type": "boolean"},
+        },
+        "required": ["start", "end"],
+    },
+    "schedule_event": {
+        "params": {
+            "title": {"type": "string"},
+            "time": {"type": "string"},
+            "date": {"type": "string"},
+        },
+        "required": ["title", "time"],
+    },
+    "schedule_events": {
+        "params": {
+            "events": {
+                "type": "array",
+                "minItems": 1,
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "title": {"type": "string"},
+                        "date": {"type": "string"},
+                        "time": {"type": "string"},
+                        "duration": {"type": "integer"},
+                    },
+                    "required": ["title", "date", "time"],
+                },
+            },
+        },
+        "required": ["events"],
+    },
+    "find_free_time": {
+        "params": {
+            "date": {"type": "string"},
+            "start": {"type": "string"},
+            "end": {"type": "string"},
+            "duration": {"type": "integer"},
+        },
+        "required": ["date"],
+    },
+    "check_conflicts": {
+        "params": {
+            "date": {"type": "string"},
+            "time": {"type": "string"},
+            "duration": {"type": "integer"},
+        },
+        "required": ["date", "time"],
+    },
+    "search_documents": {
+        "params": {"query": {"type": "string"}, "tokens": {"type": "integer"}},
+        "required": ["query"],
+    },
+    "summarize": {
+        "params": {"source": {"type": "string", "enum": ["email", "calendar"]}},
+        "required": [],
+    },
+    "chat": {
+        "params": {"prompt": {"type": "string"}},
+        "required": [],
+    },
 }
 
+
+def _actions_schema() -> dict:
+    variants = []
+    for name in TOOL_REGISTRY:
+        spec = TOOL_SPECS.get(name)
+        if spec is None:
+            continue
+        variants.append({
+            "type": "object",
+            "properties": {"type": {"type": "string", "enum": [name]}, **spec["params"]},
+            "required": ["type", *spec["required"]],
+        })
+    return {"type": "array", "items": {"anyOf": variants}, "minItems": 1}
+
+
+def plan_schema() -> dict:
+    """Return the JSON schema of a plan: ``{"actions": [...]}``."""
+    return {
+        "type": "object",
+        "properties": {"actions": _actions_schema()},
+        "required": ["actions"],
+    }
+
+
+_JSON_TYPES = {
+    "string": str, "boolean": bool, "integer": int, "number": (int, float), "array": list,
+}
+
+
+def validate_action(action: dict) -> tuple[dict | None, str | None]:
+    """Check ``action`` against ``TOOL_SPECS``.
+
+    Returns the action with unknown keys dropped, or ``None`` and the reason
+    it was rejected.
+    """
+    t = action.get("type")
+    spec = TOOL_SPECS.get(t)
+    if spec is None or t not in TOOL_REGISTRY:
+        return None, f"unknown tool {t!r}"
+    clean = {"type": t}
+    for key, schema in spec["params"].items():
+        if key not in action:
+            continue
+        value = action[key]
+        kind = schema.get("type", "string")
+        if not isinstance(value, _JSON_TYPES[kind]) or (kind != "boolean" and isinstance(value, bool)):
+            return None, f"{t}.{key} must be a {kind}"
+        if "enum" in schema and value not in schema["enum"]:
+            return None, f"{t}.{key} must be one of {schema['enum']}"
+        clean[key] = value
+    missing = [k for k in spec["required"] if not str(clean.get(k, "")).strip()]
+    if missing:
+        return None, f"{t} is missing {', '.join(missing)}"
+    return clean, None
+
+
+def validate_actions(actions) -> tuple[list[dict], list[str]]:
+    """Return the valid actions in ``actions`` and an error per invalid one."""
+    if not isinstance(actions, list):
+        return [], ["actions must be a list"]
+    valid, errors = [], []
+    for a in actions:
+        a = _normalise(a)
+        if not a:
+            errors.append("action is not an object")
+            continue
+        clean, error = validate_action(a)
+        if error:
+            errors.append(error)
+        else:
+            valid.append(clean)
+    return valid, errors
+
+def _summarize(a):
+    """Summarize output from earlier in this turn or from the last turn."""
+    source_data = a.get("_results") or get_session()["last_tool_output"]
+    return summarize_text(
+        source_data.get(
+            a.get("source") or next(iter(source_data), None),
+            "\u26a0\ufe0f No previous tool output"
+        )
+    )
+
+
 def _schedule(a):
     date_str = a.get("date")
     when = a.get("time", "17:00")
-    if date_str:
-        parsed = parse_date(date_str)
-        if parsed:
-            date = parsed.date()
-        else:
-            date = today_pt()
-    else:
-        date = today_pt()
+    date = (resolve_date(date_str) if date_str else None) or today_pt()
     title = a.get("title", "Appointment")
     if USE_N8N:
         return create_event(f"{title} {date} {when}")
     return _local_create_event(f"{title} {date} {when}")
 
+def _schedule_many(a):
+    """Create several events at once and report each one."""
+    items = [e for e in a.get("events") or [] if isinstance(e, dict)]
+    if not items:
+        return "\u26a0\ufe0f No events to schedule"
+    if USE_N8N:
+        return "\n".join(
+            create_event(f"{e.get('title', 'Appointment')} {e.get('date', '')} {e.get('time', '17:00')}")
+            for e in items
+        )
+    parsed = []
+    for e in items:
+        day = resolve_date(str(e.get("date") or "today"))
+        start = parse_when(f"{day.isoformat()} {e.get('time') or '17:00'}") if day else None
+        parsed.append({
+            "title": e.get("title") or "Appointment",
+            "start": start,
+            "minutes": e.get("duration"),
+        })
+    statuses = _local_create_events(parsed)
+    created = sum(s["status"] == "created" for s in statuses)
+    header = f"Created {created} of {len(statuses)} events"
+    if statuses and statuses[0].get("recurrence"):
+        header += " as one recurring event"
+    lines = [header + ":"]
+    for s in statuses:
+        when = s["start"][:16].replace("T", " ")
+        if s["status"] == "created":
+            line = f"\u2022 {s['title']} {when}"
+            if s.get("conflicts"):
+                line += " \u26a0\ufe0f overlaps " + ", ".join(c["title"] for c in s["conflicts"])
+        else:
+            line = f"\u26a0\ufe0f {s['title']} {when}: {s.get('error', 'failed')}"
+        lines.append(line)
+    return "\n".join(lines)
+
 load_dotenv()
 
 
@@ -132,22 +421,30 @@ def _get_config():
     return load_config()
 
 
-def plan_actions(user_prompt: str, model: str) -> list[dict]:
-    """Map the user's prompt to a list of tool actions."""
-    planning_prompt = (
+def _planning_prompt(user_prompt: str) -> str:
+    return (
         "You are a tool-planning agent with direct Gmail and Calendar access via these tools. "
         "For the **user message** below, output a VALID JSON list (no commentary) of 1-N actions.\n"
         "Available tools:\n"
         "- search_email  {{ \"query\": \"<keywords>\" }}\n"
-        "- get_calendar   {{ \"date\": \"<YYYY-MM-DD|today|yesterday>\" }}\n"
+        "- get_calendar   {{ \"date\": \"<YYYY-MM-DD|today|yesterday>\" }}"
+        " (add \"fresh\": true only if the user asks to refresh)\n"
         "- get_calendar_range {{ \"start\": \"<YYYY-MM-DD|today>\", \"end\": \"<YYYY-MM-DD|+7d>\" }}\n"
         "- schedule_event {{ \"title\":\"<text>\", \"time\":\"<HH:MM>\" }}\n"
+        "- schedule_events {{ \"events\": [{{ \"title\":\"<text>\", \"date\":\"<YYYY-MM-DD>\", \"time\":\"<HH:MM>\" }}, ...] }}\n"
+        "- find_free_time {{ \"date\": \"<YYYY-MM-DD|today>\", \"start\": \"<HH:MM>\", \"end\": \"<HH:MM>\", \"duration\": <minutes> }}\n"
+        "- check_conflicts {{ \"date\": \"<YYYY-MM-DD|today>\", \"time\": \"<HH:MM>\", \"duration\": <minutes> }}\n"
+        "- search_documents {{ \"query\": \"<question or keywords>\" }}\n"
         "- summarize      {{ \"source\":\"email|calendar\" }}\n"
         "Output JSON **must** use the key \"type\" (not \"tool\" or \"action\").\n"
         "Rules:\n"
         "• If user says “today / yesterday / tomorrow”, map to exact dates in Pacific Time (UTC-07).\n"
         "• If user adds an event like “add 5 pm dinner”, emit **schedule_event**.\n"
         "• If user says “change 5 pm today”, emit get_calendar + schedule_event (update).\n"
+        "• If user adds several events or a repeating one (“standup every weekday at 9”), emit one schedule_events with every occurrence.\n"
+        "• If user asks when they are free, emit find_free_time (afternoon = 12:00-17:00).\n"
+        "• If user asks whether a time is taken or clashes, emit check_conflicts.\n"
+        "• If user asks about the contents of their documents or files, emit search_documents.\n"
         "• If user asks follow-up (“titles”, “summary”, “all of them”), emit summarize.\n"
         "• If user says \"list calendar\" or \"calendar events today\":\n  output [{{ \"type\":\"get_calendar\",\"date\":\"today\" }}]\n"
         "• If user says \"list emails\" or \"emails today\":\n  output [{{ \"type\":\"search_email\", \"query\": \"today\" }}]\n\n"
@@ -155,17 +452,72 @@ def plan_actions(user_prompt: str, model: str) -> list[dict]:
         "User message:\n{msg}\n"
     ).format(msg=user_prompt.replace('{', '[').replace('}', ']'))
 
+
+def _plan_actions_json(user_prompt: str, model: str) -> list[dict]:
+    """Plan with the reply constrained to :func:`plan_schema`.
+
+    A reply that does not parse or validate is sent back once with the
+    errors so the model can correct it.
+    """
+    prompt = _planning_prompt(user_prompt).replace(
+        "Only output the JSON array.",
+        'Reply with a JSON object of the form {"actions": [...]}.',
+    )
+    messages = [
+        {"role": "system", "content": "You're a smart assistant planner."},
+        {"role": "user", "content": prompt},
+    ]
+    valid: list[dict] = []
+    for attempt in (1, 2):
+        response = chat_completion(
+            model, messages, options={"temperature": 0}, format=plan_schema(), cache=True
+        )
+        if response.strip().startswith("\u26a0\ufe0f"):
+            tracing.count("planner_parse_total", mode="json", attempt=str(attempt), result="llm_error")
+            return [{"type": "chat", "prompt": response}]
+        result = "invalid"
+        try:
+            plan = json.loads(response)
+            if isinstance(plan, list):
+                plan = {"actions": plan}
+            valid, errors = validate_actions(plan.get("actions"))
+        except (ValueError, AttributeError) as e:
+            valid, errors = [], [f"invalid JSON: {e}"]
+            result = "unparsable"
+        if valid and not errors:
+            result = "ok"
+        tracing.count("planner_parse_total", mode="json", attempt=str(attempt), result=result)
+        if result == "ok":
+            return valid
+        logging.warning("planner attempt %d rejected: %s", attempt, errors)
+        messages += [
+            {"role": "assistant", "content": response},
+            {
+                "role": "user",
+                "content": f"That plan is invalid: {'; '.join(errors)}. Reply with the corrected JSON only.",
+            },
+        ]
+    return valid or [{"type": "chat", "prompt": "I'm not sure what to do. Can you clarify?"}]
+
+
+def plan_actions(user_prompt: str, model: str) -> list[dict]:
+    """Map the user's prompt to a list of tool actions."""
+    if PLANNER_JSON_MODE:
+        return _plan_actions_json(user_prompt, model)
+
     response = chat_completion(
         model,
         [
             {"role": "system", "content": "You're a smart assistant planner."},
-            {"role": "user", "content": planning_prompt},
+            {"role": "user", "content": _planning_prompt(user_prompt)},
         ],
+        cache=True,
     )
 
     import re, json
     match = re.search(r"\[[\s\S]*?]", response)
     if not match:
+        tracing.count("planner_parse_total", mode="text", attempt="1", result="unparsable")
         print("\u26a0\ufe0f No valid JSON block found in planner output")
         print("Raw model response:", response)
         logs_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "logs"))
@@ -183,6 +535,7 @@ def plan_actions(user_prompt: str, model: str) -> list[dict]:
     try:
         plan = json.loads(match.group(0))
     except Exception as e:
+        tracing.count("planner_parse_total", mode="text", attempt="1", result="unparsable")
         print("\u26a0\ufe0f Failed to parse JSON:", e)
         print("Raw block:", match.group(0))
         logs_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "logs"))
@@ -206,6 +559,9 @@ def plan_actions(user_prompt: str, model: str) -> list[dict]:
         a = _normalise(a)
         if "type" in a:
             out.append(a)
+    tracing.count(
+        "planner_parse_total", mode="text", attempt="1", result="ok" if out else "invalid"
+    )
     return out
 
 
@@ -270,8 +626,16 @@ def _run_python(code: str) -> str:
 
 
 
-def gpt(prompt: str, model: str | None = None, cot_mode: bool = False) -> str:
-    """Return an LLM reply using ``model`` or the configured default."""
+def gpt(
+    prompt: str,
+    model: str | None = None,
+    cot_mode: bool = False,
+    stream: bool = False,
+) -> str | Iterator[str]:
+    """Return an LLM reply using ``model`` or the configured default.
+
+    With ``stream=True`` an iterator of text fragments is returned instead.
+    """
     cfg = _get_config()
     llm = (model or get_llm(cfg)).lower()
     api_key = get_api_key(cfg)
@@ -283,15 +647,9 @@ def gpt(prompt: str, model: str | None = None, cot_mode: bool = False) -> str:
         )
     else:
         system_prompt = "You are InsightMate. Respond concisely and act immediately."
-    history = get_recent_messages(10)
-    messages = [{"role": "system", "content": system_prompt}]
-    for m in history:
-        messages.append({"role": "user", "content": m["user"]})
-        messages.append({"role": "assistant", "content": m["assistant"]})
-    messages.append({"role": "user", "content": prompt})
     if llm in {"gpt-4", "gpt-4o", "o4-mini", "o4-mini-high"}:
         if not api_key:
-            return "OpenAI API key missing."
+            return iter(["OpenAI API key missing."]) if stream else "OpenAI API key missing."
         openai.api_key = api_key
         if llm == "gpt-4o":
             llm_name = "gpt-4o"
@@ -299,8 +657,11 @@ def gpt(prompt: str, model: str | None = None, cot_mode: bool = False) -> str:
             llm_name = "gpt-4"
         else:
             llm_name = llm
-        return chat_completion(llm_name, messages)
-    llm_name = llm if llm else _load_model()
+    else:
+        llm_name = llm if llm else _load_model()
+    messages = build_messages(system_prompt, prompt, llm_name)
+    if stream:
+        return stream_chat_completion(llm_name, messages)
     return chat_completion(llm_name, messages)
 
 
@@ -333,61 +694,64 @@ def generate_response(user_prompt: str, data: dict, cot_mode: bool) -> str:
 
 
 
-def plan_then_answer(user_prompt: str, model: str | None = None):
-    """Plan actions for ``user_prompt`` then execute them."""
-    global last_tool_output
-    selected_model = get_selected_model()
-    prompt_clean = user_prompt.lower().strip()
+def _answer_from_documents(user_prompt: str, excerpts: list[dict], model: str, stream: bool = False):
+    """Answer ``user_prompt`` from the ``search_documents`` excerpts.
 
+    The excerpts were already trimmed to ``DOC_CONTEXT_TOKENS``, so the
+    prompt stays within that budget plus the question.
+    """
+    sources = "\n\n".join(
+        f"[{i}] {e['name']} ({e['path']})\n{e['text']}" for i, e in enumerate(excerpts, 1)
+    )
+    prompt = (
+        f"Document excerpts:\n{sources}\n\nQuestion: {user_prompt}\n\n"
+        "Answer the question using only these excerpts and cite the documents "
+        "you used by name. If they do not contain the answer, say so."
+    )
+    return gpt(prompt, model, stream=stream)
 
-    FOLLOW = prompt_clean
-    if last_tool_output and FOLLOW in {"titles", "all of them", "entire week"}:
-        if "email" in last_tool_output:
-            emails = last_tool_output["email"]
-            if "titles" in FOLLOW:
-                return "\n".join(e["subject"] for e in emails)
-            return summarize_text(emails)
-        if "calendar" in last_tool_output:
-            events = last_tool_output["calendar"]
-            return summarize_text(events)
 
-    if last_tool_output and prompt_clean.startswith(("summarize", "summary")):
-        for key in ("email", "search_email", "calendar", "get_calendar"):
-            if key in last_tool_output:
-                return summarize_text(last_tool_output[key])
-        return "\u26a0\ufe0f Nothing to summarize."
+def _stream_chat(action: dict) -> Iterator[str]:
+    """Stream the reply for a lone ``chat`` action and remember it."""
+    session = get_session()
+    parts = []
+    for chunk in gpt(action.get("prompt", ""), action["model"], stream=True):
+        parts.append(chunk)
+        yield chunk
+    session["last_tool_output"] = {"chat": "".join(parts)}
 
-    # Casual conversation fallback
-    if prompt_clean in ["hi", "hello", "hey", "how are you", "yo", "what's up", "good afternoon"]:
-        return chat_completion(selected_model, [{"role": "user", "content": user_prompt}])
 
+def _plan_with_llm(user_prompt: str, selected_model: str) -> list[dict] | str:
+    """Run the THINK, planning and reflection LLM calls for ``user_prompt``.
+
+    Returns the planned actions, or a warning string when planning fails.
+    """
     # ---- THINK stage ---------------------------------------------------
-    thought = chat_completion(
-        selected_model,
-        [
-            {
-                "role": "system",
-                "content": (
-                    "You are reasoning internally. You can read Gmail using the "
-                    "search_email tool and access Calendar via get_calendar. "
-                    "Explain in ONE short sentence what you will do next."
-                ),
-            },
-            {"role": "user", "content": user_prompt},
-        ],
-    )
+    with span("router.think"):
+        thought = chat_completion(
+            selected_model,
+            [
+                {
+                    "role": "system",
+                    "content": (
+                        "You are reasoning internally. You can read Gmail using the "
+                        "search_email tool and access Calendar via get_calendar. "
+                        "Explain in ONE short sentence what you will do next."
+                    ),
+                },
+                {"role": "user", "content": user_prompt},
+            ],
+        )
     logging.info("THOUGHT %s", thought)
 
-    # Clean context if irrelevant
-    if not _is_relevant(last_tool_output, user_prompt):
-        last_tool_output = {}
-
     context_hint = ""
+    last_tool_output = get_session()["last_tool_output"]
     if last_tool_output:
         context_hint = f"\n\nLast tool result:\n{json.dumps(last_tool_output)[:1000]}"
 
     try:
-        actions = plan_actions(user_prompt + context_hint, selected_model)
+        with span("router.plan"):
+            actions = plan_actions(user_prompt + context_hint, selected_model)
     except Exception as e:
         return f"\u26a0\ufe0f Planning failed: {e}"
     logging.info("PLAN %s", actions)
@@ -409,8 +773,44 @@ def plan_then_answer(user_prompt: str, model: str | None = None):
     if actions == [{"type": "chat"}]:
         return "\u26a0\ufe0f I couldn't find any relevant action. Try rephrasing."
 
-    reflection = chat_completion(
-        selected_model,
+    if PLANNER_JSON_MODE:
+        with span("router.reflect"):
+            return _reflect_json(user_prompt, actions, selected_model)
+
+    with span("router.reflect"):
+        reflection = chat_completion(
+            selected_model,
+            [
+                {
+                    "role": "system",
+                    "content": "You are an assistant thinking about whether the planned actions make sense.",
+                },
+                {
+                    "role": "user",
+                    "content": f"User: {user_prompt}\nPlanned actions: {actions}\nRespond with either 'PROCEED' or suggest a better plan.",
+                },
+            ],
+        )
+    if reflection.lower().startswith("<think"):
+        reflection = "PROCEED"
+    if "suggest" in reflection.lower():
+        with span("router.replan"):
+            revised = plan_actions(reflection, selected_model)
+        if revised:
+            actions = revised
+
+    return actions
+
+
+def _reflect_json(user_prompt: str, actions: list[dict], model: str) -> list[dict]:
+    """Ask the model to confirm ``actions`` or return a revised plan in one call."""
+    schema = {
+        "type": "object",
+        "properties": {"proceed": {"type": "boolean"}, "actions": _actions_schema()},
+        "required": ["proceed"],
+    }
+    response = chat_completion(
+        model,
         [
             {
                 "role": "system",
@@ -418,63 +818,203 @@ def plan_then_answer(user_prompt: str, model: str | None = None):
             },
             {
                 "role": "user",
-                "content": f"User: {user_prompt}\nPlanned actions: {actions}\nRespond with either 'PROCEED' or suggest a better plan.",
+                "content": (
+                    f"User: {user_prompt}\nPlanned actions: {json.dumps(actions)}\n"
+                    'Reply {"proceed": true} if the plan is right, otherwise '
+                    '{"proceed": false, "actions": [...]} with a better plan.'
+                ),
             },
         ],
+        options={"temperature": 0},
+        format=schema,
     )
-    if reflection.lower().startswith("<think"):
-        reflection = "PROCEED"
-    if "suggest" in reflection.lower():
-        revised = plan_actions(reflection, selected_model)
-        if revised:
-            actions = revised
+    try:
+        verdict = json.loads(response)
+    except ValueError:
+        tracing.count("planner_reflect_total", result="unparsable")
+        return actions
+    if not isinstance(verdict, dict) or verdict.get("proceed", True):
+        tracing.count("planner_reflect_total", result="proceed")
+        return actions
+    revised, errors = validate_actions(verdict.get("actions"))
+    if revised and not errors:
+        tracing.count("planner_reflect_total", result="revised")
+        return revised
+    tracing.count("planner_reflect_total", result="invalid")
+    return actions
+
+
+def plan_then_answer(user_prompt: str, model: str | None = None, stream: bool = False):
+    """Plan actions for ``user_prompt`` then execute them.
+
+    With ``stream=True`` a plan consisting of a single ``chat`` action, or
+    of document searches only, is answered with an iterator of text
+    fragments; every other plan still returns a string.
+    """
+    session = get_session()
+    last_tool_output = session["last_tool_output"]
+    selected_model = get_selected_model()
+    prompt_clean = user_prompt.lower().strip()
+
+
+    FOLLOW = prompt_clean
+    if last_tool_output and FOLLOW in {"titles", "all of them", "entire week"}:
+        if "email" in last_tool_output:
+            emails = last_tool_output["email"]
+            if "titles" in FOLLOW:
+                return "\n".join(e["subject"] for e in emails)
+            return summarize_text(emails)
+        if "calendar" in last_tool_output:
+            events = last_tool_output["calendar"]
+            return summarize_text(events)
+
+    if last_tool_output and prompt_clean.startswith(("summarize", "summary")):
+        for key in ("email", "search_email", "calendar", "get_calendar"):
+            if key in last_tool_output:
+                return summarize_text(last_tool_output[key])
+        return "\u26a0\ufe0f Nothing to summarize."
+
+    # Casual conversation fallback
+    if prompt_clean in ["hi", "hello", "hey", "how are you", "yo", "what's up", "good afternoon"]:
+        messages = [{"role": "user", "content": user_prompt}]
+        if stream:
+            return stream_chat_completion(selected_model, messages)
+        return chat_completion(selected_model, messages, cache=True)
+
+    # Clean context if irrelevant
+    if not _is_relevant(last_tool_output, user_prompt):
+        session["last_tool_output"] = {}
+
+    with span("router.intent"):
+        actions, confidence = match_intent(user_prompt)
+    if actions and confidence >= INTENT_THRESHOLD:
+        logging.info("FAST PATH %s (confidence %.2f)", actions, confidence)
+    else:
+        actions = _plan_with_llm(user_prompt, selected_model)
+        if isinstance(actions, str):
+            return actions
 
     if not actions:
         return "\u26a0\ufe0f I couldn't determine what action to take."
 
-    results = {}
+    if stream and len(actions) == 1 and actions[0].get("type") == "chat":
+        action = actions[0]
+        action.setdefault("prompt", user_prompt)
+        action["model"] = selected_model
+        return _stream_chat(action)
 
     for action in actions:
         if action.get("type") == "chat":
             action.setdefault("prompt", user_prompt)
-        t = action.get("type")
         action["model"] = selected_model
-        if t not in TOOL_REGISTRY:
-            results[t] = f"\u26a0\ufe0f Unknown tool '{t}'"
-            continue
-        try:
-            out = TOOL_REGISTRY[t](action)
-            results[t] = out
-
-            # store unified aliases for follow-ups
-            if t == "search_email":
-                results["email"] = out
-            if t in {"get_calendar", "get_calendar_range"}:
-                results["calendar"] = out
-        except Exception as e:
-            results[t] = f"\u26a0\ufe0f {t} error: {e}"
+    with span("router.tools"):
+        results = run_actions(actions)
 
     logging.info("RESULT KEYS %s", list(results.keys()))
 
-    last_tool_output = results
-    reply_text = format_results(results)
+    session["last_tool_output"] = results
+    excerpts = results.get("search_documents")
+    if isinstance(excerpts, list) and all(a.get("type") == "search_documents" for a in actions):
+        with span("router.answer"):
+            return _answer_from_documents(user_prompt, excerpts, selected_model, stream)
+    with span("router.format"):
+        reply_text = format_results(results)
     if not reply_text:
         reply_text = "\u2139\ufe0f No data returned."
     return reply_text
 
 
+def _call_tool(action: dict):
+    t = action.get("type")
+    if t not in TOOL_REGISTRY:
+        return f"\u26a0\ufe0f Unknown tool '{t}'"
+    try:
+        with span(f"tool.{t}"):
+            return TOOL_REGISTRY[t](action)
+    except Exception as e:
+        return f"\u26a0\ufe0f {t} error: {e}"
+
+
+def _merge_result(results: dict, t: str, out) -> None:
+    results[t] = out
+    # store unified aliases for follow-ups
+    if t == "search_email":
+        results["email"] = out
+    if t in {"get_calendar", "get_calendar_range"}:
+        results["calendar"] = out
+
+
+def _await_tool(fut, action: dict, deadline: float):
+    """Return ``fut``'s result, or a warning once ``deadline`` has passed.
+
+    A tool that is already running cannot be stopped; its thread is left to
+    finish in the background and its result is discarded.
+    """
+    try:
+        return fut.result(timeout=max(deadline - time.monotonic(), 0))
+    except concurrent.futures.TimeoutError:
+        fut.cancel()
+        t = action.get("type")
+        logging.error("tool %s timed out after %ss", t, TOOL_TIMEOUT)
+        return f"\u26a0\ufe0f {t} timed out"
+
+
+def run_actions(actions: list[dict]) -> dict:
+    """Execute planned ``actions`` and merge their outputs in plan order.
+
+    Independent actions run concurrently on a bounded thread pool and each
+    one is given ``TOOL_TIMEOUT`` seconds before it is reported as timed
+    out. Actions in ``DEPENDENT_TOOLS`` run afterwards, in plan order, and
+    see the results gathered so far this turn; each of them also gets
+    ``TOOL_TIMEOUT`` seconds. Timed-out tools keep running in the
+    background until they return, which is why the pool is sized at twice
+    ``TOOL_WORKERS``.
+    """
+    outputs: dict[int, object] = {}
+    futures = {
+        i: _tool_pool.submit(contextvars.copy_context().run, _call_tool, a)
+        for i, a in enumerate(actions)
+        if a.get("type") not in DEPENDENT_TOOLS
+    }
+    deadline = time.monotonic() + TOOL_TIMEOUT
+    for i, fut in futures.items():
+        outputs[i] = _await_tool(fut, actions[i], deadline)
+
+    gathered: dict = {}
+    for i in sorted(outputs):
+        _merge_result(gathered, actions[i].get("type"), outputs[i])
+    for i, action in enumerate(actions):
+        if i not in outputs:
+            fut = _tool_pool.submit(
+                contextvars.copy_context().run,
+                _call_tool,
+                {**action, "_results": dict(gathered)},
+            )
+            outputs[i] = _await_tool(fut, action, time.monotonic() + TOOL_TIMEOUT)
+            _merge_result(gathered, action.get("type"), outputs[i])
+
+    results: dict = {}
+    for i, action in enumerate(actions):
+        _merge_result(results, action.get("type"), outputs[i])
+    return results
+
+
+def _format_item(item: dict) -> str:
+    if "path" in item:
+        # search_documents excerpt
+        return f"\u2022 {item.get('name', '')} ({item['path']})\n  {item.get('text', '')}"
+    subj = item.get("subject") or item.get("title", "")
+    when = item.get("start", "")[:16]
+    return f"\u2022 {subj} {when}"
+
+
 def format_results(res):
     out = []
     for k, v in res.items():
         if isinstance(v, list):
-            for item in v:
-                subj = item.get("subject") or item.get("title", "")
-                when = item.get("start", "")[:16]
-                out.append(f"\u2022 {subj} {when}")
+            out.extend(_format_item(item) for item in v)
         elif isinstance(v, dict):
-            subj = v.get("subject") or v.get("title", "")
-            when = v.get("start", "")[:16]
-            out.append(f"\u2022 {subj} {when}")
+            out.append(_format_item(v))
         else:
             out.append(str(v))
     return "\n".join(out)
@@ -494,18 +1034,28 @@ def _extract_minutes(text: str) -> Optional[int]:
     return None
 
 
-def route(query: str) -> str:
+def _strip_think(query: str) -> tuple[str, bool]:
+    """Remove a ``/think`` marker and report whether it was present."""
+    if "/think" in query.lower():
+        return query.replace("/think", "").strip(), True
+    return query, False
+
+
+def _dispatch(query: str, cot_mode: bool = False, stream: bool = False) -> str | Iterator[str]:
+    """Return the reply for ``query`` without saving it to memory.
+
+    LLM-backed replies are returned as iterators when ``stream`` is set.
+    """
     selected_model = _load_model()
-    cot_mode = False
     q = query.lower()
-    if "/think" in q:
-        cot_mode = True
-        query = query.replace("/think", "").strip()
-        q = query.lower()
     reply = ''
 
     if q in ["hi", "hello", "hey", "how are you", "yo", "what's up", "good afternoon"]:
-        reply = chat_completion(selected_model, [{"role": "user", "content": query}])
+        messages = [{"role": "user", "content": query}]
+        if stream:
+            reply = stream_chat_completion(selected_model, messages)
+        else:
+            reply = chat_completion(selected_model, messages, cache=True)
     elif 'remind me' in q or q.startswith('remind'):
         reply = schedule_reminder(query)
     elif 'air quality' in q:
@@ -570,6 +1120,42 @@ def route(query: str) -> str:
                 "\"What's on my calendar this week?\")"
             )
         else:
-            reply = plan_then_answer(query)
+            reply = plan_then_answer(query, stream=stream)
+    return reply
+
+
+def route(query: str) -> str:
+    query, cot_mode = _strip_think(query)
+    with span("router.route"):
+        reply = _dispatch(query, cot_mode)
     save_message(query, reply)
+    record_turn(query, reply)
     return reply
+
+
+def route_stream(query: str) -> Iterator[str]:
+    """Yield the reply to ``query`` as it is generated.
+
+    The full reply is saved to memory once the stream finishes, or with
+    whatever was produced if the client goes away early. The
+    ``router.route`` span covers dispatch and the whole stream, so it is
+    comparable with :func:`route`.
+    """
+    query, cot_mode = _strip_think(query)
+    parts: list[str] = []
+    try:
+        with span("router.route"):
+            reply = _dispatch(query, cot_mode, stream=True)
+            if isinstance(reply, str):
+                reply = iter([reply])
+            try:
+                for chunk in reply:
+                    parts.append(chunk)
+                    yield chunk
+            except GeneratorExit:
+                # The client went away; that is not a routing error.
+                return
+    finally:
+        reply = "".join(parts)
+        save_message(query, reply)
+        record_turn(query, reply)
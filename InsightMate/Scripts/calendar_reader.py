@@ -1,10 +1,23 @@
+import concurrent.futures
+import contextvars
 import datetime
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator
 from zoneinfo import ZoneInfo
-from googleapiclient.discovery import build
 
-from google_auth import get_credentials
-from dateparser.search import search_dates
-from dateparser import parse as parse_date
+import calendar_store
+import tracing
+from date_utils import find_datetime, parse_when, resolve_date
+from google_auth import google_service
+from interval_index import IntervalIndex
+from memory_db import event_timestamp
+from tracing import traced
 
 CREATE_EVENT_PREFIXES = (
     'add event',
@@ -26,14 +39,202 @@ FILLER_WORDS = (
 # Use Pacific time for all calendar operations
 PACIFIC_TZ = ZoneInfo("America/Los_Angeles")
 
+# Events per events.list page (the API allows up to 2500)
+PAGE_SIZE = int(os.getenv("CALENDAR_PAGE_SIZE", "250"))
+# Only the parts of each event the assistant reads
+EVENT_FIELDS = "nextPageToken,items(id,summary,start,end)"
+# Read every selected calendar instead of just "primary"
+MULTI_CALENDAR = os.getenv("CALENDAR_MULTI", "0") not in {"0", "false", "no"}
+# Explicit calendar ids for multi-calendar mode (default: the calendar list)
+CALENDAR_IDS = [c.strip() for c in os.getenv("CALENDAR_IDS", "").split(",") if c.strip()]
+CALENDAR_LIST_TTL = float(os.getenv("CALENDAR_LIST_TTL", "3600"))
+# Seconds each calendar gets before it is left out of a reply
+CALENDAR_TIMEOUT = float(os.getenv("CALENDAR_TIMEOUT", "5"))
+CALENDAR_WORKERS = int(os.getenv("CALENDAR_WORKERS", "4"))
+# Inserts per Google batch request (the Calendar API allows 50)
+INSERT_BATCH_SIZE = int(os.getenv("CALENDAR_BATCH_SIZE", "50"))
+# Smallest run of matching events sent as one recurring event
+RECURRENCE_MIN = int(os.getenv("CALENDAR_RECURRENCE_MIN", "3"))
+RRULE_DAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+# Hours searched by find_free_time when none are given
+WORKDAY_START = os.getenv("CALENDAR_WORKDAY_START", "09:00")
+WORKDAY_END = os.getenv("CALENDAR_WORKDAY_END", "17:00")
 
-def list_events_for_day(day: int | str) -> list[dict]:
+_calendar_pool = ThreadPoolExecutor(max_workers=CALENDAR_WORKERS, thread_name_prefix="calendar")
+_calendar_list: tuple[float, list[str]] = (0.0, [])
+_calendar_list_lock = threading.Lock()
+
+
+def _simplify(e: dict) -> dict:
+    start_time = e["start"].get("dateTime", e["start"].get("date"))
+    end_time = e["end"].get("dateTime", e["end"].get("date"))
+    return {"id": e.get("id"), "title": e.get("summary", ""), "start": start_time, "end": end_time}
+
+
+def _unique(events: Iterable[dict]) -> Iterator[dict]:
+    """Drop repeated (title, start) pairs from start-ordered ``events``.
+
+    Duplicates share a start time, so only titles seen at the current start
+    are remembered and memory stays bounded however long the range is.
+    """
+    current = None
+    seen: set[str] = set()
+    for ev in events:
+        if ev["start"] != current:
+            current = ev["start"]
+            seen.clear()
+        if ev["title"] not in seen:
+            seen.add(ev["title"])
+            yield ev
+
+
+def iter_events(
+    start: datetime.datetime,
+    end: datetime.datetime,
+    query: str | None = None,
+    calendar_id: str = "primary",
+    page_size: int = PAGE_SIZE,
+) -> Iterator[dict]:
+    """Yield events in ``[start, end)`` in start order, one page at a time.
+
+    Follows ``nextPageToken`` and asks only for the fields the assistant
+    uses. The pooled service is returned between pages, so a caller that
+    stops early holds no connection.
+    """
+    params = dict(
+        calendarId=calendar_id,
+        timeMin=start.isoformat(),
+        timeMax=end.isoformat(),
+        singleEvents=True,
+        orderBy="startTime",
+        maxResults=page_size,
+        fields=EVENT_FIELDS,
+    )
+    if query:
+        params["q"] = query
+    page = None
+    while True:
+        with google_service('calendar', 'v3') as service:
+            resp = service.events().list(pageToken=page, **params).execute()
+        for e in resp.get("items", []):
+            yield _simplify(e)
+        page = resp.get("nextPageToken")
+        if not page:
+            return
+
+
+def calendar_ids() -> list[str]:
+    """Return the calendars to read.
+
+    ``primary`` unless ``CALENDAR_MULTI`` is on, in which case the
+    ``CALENDAR_IDS`` list or every selected calendar in the user's
+    calendar list (cached for ``CALENDAR_LIST_TTL`` seconds) is used.
+    """
+    global _calendar_list
+    if not MULTI_CALENDAR:
+        return ["primary"]
+    if CALENDAR_IDS:
+        return CALENDAR_IDS
+    with _calendar_list_lock:
+        expires, ids = _calendar_list
+        if time.monotonic() < expires:
+            return ids
+        try:
+            ids = _fetch_calendar_list()
+        except Exception as e:
+            logging.error("calendar: calendarList failed: %s", e)
+            return ids or ["primary"]
+        _calendar_list = (time.monotonic() + CALENDAR_LIST_TTL, ids)
+        return ids
+
+
+@traced("calendar.calendar_list")
+def _fetch_calendar_list() -> list[str]:
+    ids: list[str] = []
+    page = None
+    while True:
+        with google_service('calendar', 'v3') as service:
+            resp = service.calendarList().list(
+                pageToken=page,
+                fields="nextPageToken,items(id,primary,selected,hidden)",
+            ).execute()
+        for item in resp.get("items", []):
+            if item.get("primary"):
+                ids.insert(0, "primary")
+            elif item.get("selected", True) and not item.get("hidden"):
+                ids.append(item["id"])
+        page = resp.get("nextPageToken")
+        if not page:
+            break
+    return list(dict.fromkeys(ids)) or ["primary"]
+
+
+def _fan_out(fetch: Callable[[str], list[dict]], ids: list[str]) -> list[list[dict]]:
+    """Run ``fetch`` for each calendar concurrently.
+
+    Calendars that fail or take longer than ``CALENDAR_TIMEOUT`` seconds
+    are logged and left out so one slow calendar cannot hold up the reply.
+    """
+    if len(ids) == 1:
+        return [fetch(ids[0])]
+    futures = {
+        cid: _calendar_pool.submit(contextvars.copy_context().run, fetch, cid) for cid in ids
+    }
+    deadline = time.monotonic() + CALENDAR_TIMEOUT
+    results = []
+    for cid, fut in futures.items():
+        try:
+            results.append(fut.result(timeout=max(deadline - time.monotonic(), 0)))
+        except concurrent.futures.TimeoutError:
+            fut.cancel()
+            logging.error("calendar %s timed out after %ss", cid, CALENDAR_TIMEOUT)
+            tracing.count("calendar_fanout_errors_total", reason="timeout")
+        except Exception as e:
+            logging.error("calendar %s failed: %s", cid, e)
+            tracing.count("calendar_fanout_errors_total", reason="error")
+    return results
+
+
+def _merge(per_calendar: list[list[dict]]) -> Iterator[dict]:
+    """Merge start-ordered event lists, dropping events seen in another calendar."""
+    merged = heapq.merge(*per_calendar, key=lambda e: event_timestamp(e["start"]) or 0)
+    current = None
+    seen: set[str] = set()
+    for ev in merged:
+        if ev["start"] != current:
+            current = ev["start"]
+            seen.clear()
+        key = ev.get("id") or ev["title"]
+        if key not in seen:
+            seen.add(key)
+            yield ev
+
+
+def _public(events: Iterable[dict]) -> list[dict]:
+    return [{k: v for k, v in ev.items() if k != "id"} for ev in events]
+
+
+def _collect(start: datetime.datetime, end: datetime.datetime, fresh: bool) -> list[dict]:
+    """Return events in ``[start, end)`` from every calendar, in start order."""
+
+    def fetch(calendar_id: str) -> list[dict]:
+        if not fresh:
+            cached = calendar_store.events_between(start, end, calendar_id)
+            if cached is not None:
+                return cached
+        return list(iter_events(start, end, calendar_id=calendar_id))
+
+    return list(_unique(_merge(_fan_out(fetch, calendar_ids()))))
+
+
+@traced("calendar.list_day")
+def list_events_for_day(day: int | str, fresh: bool = False) -> list[dict]:
     """Return calendar events for the given day.
 
     ``day`` may be an integer offset from today or an ISO ``YYYY-MM-DD`` string.
+    Events come from the local cache unless ``fresh`` is set or the day is
+    outside the cached window.
     """
-    creds = get_credentials()
-    service = build('calendar', 'v3', credentials=creds)
     if isinstance(day, int):
         start = (
             datetime.datetime.now(PACIFIC_TZ)
@@ -41,83 +242,26 @@ def list_events_for_day(day: int | str) -> list[dict]:
             + datetime.timedelta(days=day)
         )
     else:
-        parsed = parse_date(str(day))
+        parsed = resolve_date(str(day))
         if not parsed:
             return []
-        if parsed.tzinfo is None:
-            parsed = parsed.replace(tzinfo=PACIFIC_TZ)
-        else:
-            parsed = parsed.astimezone(PACIFIC_TZ)
-        start = parsed.replace(hour=0, minute=0, second=0, microsecond=0)
+        start = datetime.datetime.combine(parsed, datetime.time(), PACIFIC_TZ)
     end = start + datetime.timedelta(days=1)
-    events_result = (
-        service.events()
-        .list(
-            calendarId="primary",
-            timeMin=start.isoformat(),
-            timeMax=end.isoformat(),
-            singleEvents=True,
-            orderBy="startTime",
-        )
-        .execute()
-    )
-    events = events_result.get("items", [])
-    output = []
-    for e in events:
-        start_time = e["start"].get("dateTime", e["start"].get("date"))
-        end_time = e["end"].get("dateTime", e["end"].get("date"))
-        output.append({"title": e.get("summary", ""), "start": start_time, "end": end_time})
-    unique: list[dict] = []
-    seen: set[tuple[str, str]] = set()
-    for ev in output:
-        key = (ev["title"], ev["start"])
-        if key not in seen:
-            unique.append(ev)
-            seen.add(key)
-    return unique
+    return _public(_collect(start, end, fresh))
 
 
-def list_events_for_range(start_date: str, end_date: str) -> list[dict]:
+@traced("calendar.list_range")
+def list_events_for_range(start_date: str, end_date: str, fresh: bool = False) -> list[dict]:
     """Return events for the given date range (inclusive)."""
-    creds = get_credentials()
-    service = build("calendar", "v3", credentials=creds)
-    start = parse_date(start_date)
-    end = parse_date(end_date)
-    if not start or not end:
+    first = resolve_date(start_date)
+    last = resolve_date(end_date)
+    if not first or not last:
         return []
-    if start.tzinfo is None:
-        start = start.replace(tzinfo=PACIFIC_TZ)
-    else:
-        start = start.astimezone(PACIFIC_TZ)
-    if end.tzinfo is None:
-        end = end.replace(tzinfo=PACIFIC_TZ)
-    else:
-        end = end.astimezone(PACIFIC_TZ)
-    events_result = (
-        service.events()
-        .list(
-            calendarId="primary",
-            timeMin=start.isoformat(),
-            timeMax=end.isoformat(),
-            singleEvents=True,
-            orderBy="startTime",
-        )
-        .execute()
+    start = datetime.datetime.combine(first, datetime.time(), PACIFIC_TZ)
+    end = datetime.datetime.combine(
+        last + datetime.timedelta(days=1), datetime.time(), PACIFIC_TZ
     )
-    events = events_result.get("items", [])
-    output = []
-    for e in events:
-        start_time = e["start"].get("dateTime", e["start"].get("date"))
-        end_time = e["end"].get("dateTime", e["end"].get("date"))
-        output.append({"title": e.get("summary", ""), "start": start_time, "end": end_time})
-    unique: list[dict] = []
-    seen: set[tuple[str, str]] = set()
-    for ev in output:
-        key = (ev["title"], ev["start"])
-        if key not in seen:
-            unique.append(ev)
-            seen.add(key)
-    return unique
+    return _public(_collect(start, end, fresh))
 
 
 def list_today_events() -> list[dict]:
@@ -125,52 +269,97 @@ def list_today_events() -> list[dict]:
     return list_events_for_day(0)
 
 
-def search_events(query: str, days: int = 30, limit: int = 10):
+@traced("calendar.search")
+def search_events(query: str, days: int = 30, limit: int = 10, fresh: bool = False):
     """Search upcoming calendar events for the given text."""
-    creds = get_credentials()
-    service = build('calendar', 'v3', credentials=creds)
     start = datetime.datetime.now(PACIFIC_TZ)
     end = start + datetime.timedelta(days=days)
-    events_result = service.events().list(
-        calendarId='primary',
-        timeMin=start.isoformat(),
-        timeMax=end.isoformat(),
-        singleEvents=True,
-        orderBy='startTime',
-        q=query,
-        maxResults=limit,
-    ).execute()
-    events = events_result.get('items', [])
-    output = []
-    for e in events:
-        start_time = e['start'].get('dateTime', e['start'].get('date'))
-        end_time = e['end'].get('dateTime', e['end'].get('date'))
-        output.append({'title': e.get('summary', ''), 'start': start_time, 'end': end_time})
-    return output
 
+    def fetch(calendar_id: str) -> list[dict]:
+        if not fresh:
+            cached = calendar_store.search(query, start, end, limit, calendar_id)
+            if cached is not None:
+                return cached
+        events = iter_events(
+            start, end, query=query, calendar_id=calendar_id, page_size=min(limit, PAGE_SIZE)
+        )
+        return list(itertools.islice(events, limit))
 
-def create_event(text: str) -> str:
-    """Create a calendar event from ``text``.
+    merged = _merge(_fan_out(fetch, calendar_ids()))
+    return _public(itertools.islice(merged, limit))
 
-    The first recognizable date in ``text`` is used as the start time and the
-    remainder becomes the title. A one hour duration is assumed.
+
+def _build_index(events: Iterable[dict]) -> IntervalIndex:
+    spans = ((event_timestamp(e["start"]), event_timestamp(e["end"]), e) for e in events)
+    return IntervalIndex((s, e, ev) for s, e, ev in spans if s is not None and e is not None)
+
+
+def _busy_index(
+    start: datetime.datetime,
+    end: datetime.datetime,
+    events: list[dict] | None = None,
+    fresh: bool = False,
+) -> IntervalIndex:
+    """Return an interval index covering ``[start, end)``.
+
+    Uses ``events`` when given, otherwise the calendar cache, otherwise a
+    live listing of just that span. With several calendars the index is
+    built from their merged events.
     """
-    matches = search_dates(
-        text,
-        settings={'PREFER_DATES_FROM': 'future'},
-        languages=['en'],
-    )
-    if not matches:
-        return 'Could not parse time.'
+    if events is not None:
+        return _build_index(events)
+    if not fresh and calendar_ids() == ["primary"]:
+        index = calendar_store.interval_index(start, end)
+        if index is not None:
+            return index
+    return _build_index(_collect(start, end, fresh))
 
-    phrase, when = matches[0]
-    if when.tzinfo is None:
-        when = when.replace(tzinfo=PACIFIC_TZ)
-    else:
-        when = when.astimezone(PACIFIC_TZ)
-    start = when
-    end = start + datetime.timedelta(hours=1)
 
+def _at(day: datetime.date, when: str) -> datetime.datetime | None:
+    return parse_when(f"{day.isoformat()} {when}")
+
+
+@traced("calendar.free_time")
+def find_free_time(
+    day: datetime.date,
+    start_time: str = WORKDAY_START,
+    end_time: str = WORKDAY_END,
+    min_minutes: int = 30,
+    events: list[dict] | None = None,
+    fresh: bool = False,
+) -> list[dict]:
+    """Return free slots of at least ``min_minutes`` on ``day``.
+
+    Only the hours between ``start_time`` and ``end_time`` are searched.
+    Each slot is a dict with ``start``/``end`` ISO strings and ``minutes``.
+    """
+    start, end = _at(day, start_time), _at(day, end_time)
+    if not start or not end or end <= start:
+        return []
+    index = _busy_index(start, end, events, fresh)
+    return [
+        {
+            "start": datetime.datetime.fromtimestamp(s, PACIFIC_TZ).isoformat(),
+            "end": datetime.datetime.fromtimestamp(e, PACIFIC_TZ).isoformat(),
+            "minutes": int((e - s) // 60),
+        }
+        for s, e in index.free_slots(start.timestamp(), end.timestamp(), min_minutes * 60)
+    ]
+
+
+@traced("calendar.conflicts")
+def check_conflicts(
+    start: datetime.datetime,
+    end: datetime.datetime,
+    events: list[dict] | None = None,
+    fresh: bool = False,
+) -> list[dict]:
+    """Return the events that overlap ``[start, end)``."""
+    index = _busy_index(start, end, events, fresh)
+    return _public(index.conflicts(start.timestamp(), end.timestamp()))
+
+
+def _title_from(text: str, phrase: str) -> str:
     title = text.replace(phrase, '').strip()
     for p in CREATE_EVENT_PREFIXES:
         if title.lower().startswith(p):
@@ -180,18 +369,200 @@ def create_event(text: str) -> str:
         if title.lower().startswith(word + ' '):
             title = title[len(word) + 1:].strip()
             break
-    if not title:
-        title = 'New Event'
+    return title or 'New Event'
+
 
-    creds = get_credentials()
-    service = build('calendar', 'v3', credentials=creds)
+def _recurrence(events: list[dict]) -> str | None:
+    """Return an RRULE covering ``events`` exactly, or ``None``.
+
+    Applies when at least ``RECURRENCE_MIN`` events share a title, time of
+    day and length and fall on a fixed day interval or on the same weekdays
+    of consecutive weeks.
+    """
+    if len(events) < RECURRENCE_MIN:
+        return None
+    first = events[0]
+    length = first['end'] - first['start']
+    for ev in events:
+        if (ev['title'], ev['start'].time(), ev['end'] - ev['start']) != (
+            first['title'], first['start'].time(), length
+        ):
+            return None
+    days = [ev['start'].date() for ev in events]
+    if len(set(days)) != len(days):
+        return None
+    count = f"COUNT={len(days)}"
+    steps = {(b - a).days for a, b in zip(days, days[1:])}
+    if len(steps) == 1:
+        step = steps.pop()
+        if step % 7 == 0:
+            interval = f";INTERVAL={step // 7}" if step > 7 else ""
+            return f"RRULE:FREQ=WEEKLY{interval};{count}"
+        interval = f";INTERVAL={step}" if step > 1 else ""
+        return f"RRULE:FREQ=DAILY{interval};{count}"
+    weekdays = sorted({d.weekday() for d in days})
+    span = (days[-1] - days[0]).days + 1
+    expected = [
+        days[0] + datetime.timedelta(days=i)
+        for i in range(span)
+        if (days[0] + datetime.timedelta(days=i)).weekday() in weekdays
+    ]
+    if expected != days:
+        return None
+    byday = ','.join(RRULE_DAYS[d] for d in weekdays)
+    return f"RRULE:FREQ=WEEKLY;BYDAY={byday};{count}"
+
+
+def _event_body(ev: dict, recurrence: str | None = None) -> dict:
     body = {
-        'summary': title,
-        'start': {'dateTime': start.isoformat()},
-        'end': {'dateTime': end.isoformat()},
+        'summary': ev['title'],
+        'start': {'dateTime': ev['start'].isoformat()},
+        'end': {'dateTime': ev['end'].isoformat()},
     }
-    service.events().insert(calendarId='primary', body=body).execute()
-    return f"Event '{title}' added for {start.isoformat()}"
+    if recurrence:
+        # Recurring events need a named zone to expand across DST changes.
+        body['start']['timeZone'] = body['end']['timeZone'] = str(PACIFIC_TZ)
+        body['recurrence'] = [recurrence]
+    return body
+
+
+def _instances(created: dict, events: list[dict]) -> list[dict]:
+    """Expand a created recurring event into the instances Calendar will list."""
+    return [
+        {
+            'id': f"{created['id']}_{ev['start'].astimezone(datetime.timezone.utc):%Y%m%dT%H%M%SZ}",
+            'summary': ev['title'],
+            'start': {'dateTime': ev['start'].isoformat()},
+            'end': {'dateTime': ev['end'].isoformat()},
+        }
+        for ev in events
+    ]
+
+
+def _insert_batch(service, bodies: list[dict]) -> list[tuple[dict | None, str | None]]:
+    """Insert ``bodies`` with batch requests; return ``(event, error)`` per body.
+
+    Failed inserts are reported rather than retried, since a request that
+    timed out may still have created the event.
+    """
+    results: list[tuple[dict | None, str | None]] = [(None, 'not sent')] * len(bodies)
+
+    def _collect(request_id, response, exception):
+        i = int(request_id)
+        results[i] = (None, str(exception)) if exception is not None else (response, None)
+
+    for start in range(0, len(bodies), INSERT_BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=_collect)
+        for i in range(start, min(start + INSERT_BATCH_SIZE, len(bodies))):
+            batch.add(
+                service.events().insert(calendarId='primary', body=bodies[i]),
+                request_id=str(i),
+            )
+        try:
+            batch.execute()
+        except Exception as e:
+            for i in range(start, min(start + INSERT_BATCH_SIZE, len(bodies))):
+                results[i] = (None, str(e))
+    return results
+
+
+@traced("calendar.create_many")
+def create_events(events: list[dict]) -> list[dict]:
+    """Create many events in as few requests as possible.
+
+    Each event is a dict with ``title``, an aware ``start`` datetime and
+    optionally ``end`` or ``minutes`` (default 60). Events that form a
+    regular series become one recurring event; the rest are inserted with
+    Google batch requests. Returns one status dict per input event, in
+    order: ``title``, ``start``, ``status`` ("created" or "failed"), the
+    event ``id`` or an ``error``, and ``conflicts`` with existing events.
+    """
+    statuses: list[dict] = []
+    valid: list[tuple[int, dict]] = []
+    for ev in events:
+        start = ev.get('start')
+        title = ev.get('title') or 'New Event'
+        if not isinstance(start, datetime.datetime):
+            statuses.append({'title': title, 'start': str(start or ''), 'status': 'failed',
+                             'error': 'invalid time'})
+            continue
+        end = ev.get('end') or start + datetime.timedelta(minutes=int(ev.get('minutes') or 60))
+        statuses.append({'title': title, 'start': start.isoformat(), 'status': 'pending'})
+        valid.append((len(statuses) - 1, {'title': title, 'start': start, 'end': end}))
+    if not valid:
+        return statuses
+
+    try:
+        index = _busy_index(
+            min(ev['start'] for _, ev in valid), max(ev['end'] for _, ev in valid)
+        )
+        for i, ev in valid:
+            clashes = index.conflicts(ev['start'].timestamp(), ev['end'].timestamp())
+            if clashes:
+                statuses[i]['conflicts'] = _public(clashes)
+    except Exception as e:
+        logging.error("calendar: conflict check failed: %s", e)
+
+    ordered = sorted(valid, key=lambda item: item[1]['start'])
+    rule = _recurrence([ev for _, ev in ordered])
+    with google_service('calendar', 'v3') as service:
+        if rule:
+            try:
+                created = service.events().insert(
+                    calendarId='primary', body=_event_body(ordered[0][1], rule)
+                ).execute()
+                outcomes = [(created, None)] * len(ordered)
+                for instance in _instances(created, [ev for _, ev in ordered]):
+                    calendar_store.remember(instance)
+            except Exception as e:
+                outcomes = [(None, str(e))] * len(ordered)
+        elif len(ordered) == 1:
+            try:
+                outcomes = [(
+                    service.events().insert(
+                        calendarId='primary', body=_event_body(ordered[0][1])
+                    ).execute(),
+                    None,
+                )]
+            except Exception as e:
+                outcomes = [(None, str(e))]
+        else:
+            outcomes = _insert_batch(service, [_event_body(ev) for _, ev in ordered])
+    for (i, _), (created, error) in zip(ordered, outcomes):
+        if error is not None:
+            statuses[i].update(status='failed', error=error)
+            continue
+        statuses[i].update(status='created', id=(created or {}).get('id'))
+        if rule:
+            statuses[i]['recurrence'] = rule
+        else:
+            calendar_store.remember(created or {})
+    return statuses
+
+
+@traced("calendar.create")
+def create_event(text: str) -> str:
+    """Create a calendar event from ``text``.
+
+    The first recognizable date in ``text`` is used as the start time and the
+    remainder becomes the title. A one hour duration is assumed.
+    """
+    match = find_datetime(text)
+    if not match:
+        return 'Could not parse time.'
+
+    phrase, start = match
+    title = _title_from(text, phrase)
+    status = create_events([{'title': title, 'start': start}])[0]
+    if status['status'] != 'created':
+        raise RuntimeError(status['error'])
+    message = f"Event '{title}' added for {start.isoformat()}"
+    if status.get('conflicts'):
+        names = ', '.join(
+            f"{c['title']} ({c['start'][11:16] or c['start']})" for c in status['conflicts']
+        )
+        message += f"\n\u26a0\ufe0f Overlaps with {names}"
+    return message
 
 
 if __name__ == '__main__':
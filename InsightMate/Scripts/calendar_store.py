@@ -0,0 +1,279 @@
+"""Local calendar cache kept current with Calendar ``syncToken`` sync.
+
+Events from ``CALENDAR_CACHE_PAST_DAYS`` ago to ``CALENDAR_CACHE_DAYS``
+ahead are stored in the ``calendar_events`` table of ``memory.db``, upserted
+by event id and indexed on start/end time. After the first full listing,
+``events.list(syncToken=...)`` returns only what changed; a ``410 Gone``
+means the token expired and the cache is rebuilt.
+
+:func:`events_between` and :func:`search` return ``None`` whenever the cache
+cannot answer -- it is disabled, a sync failed, or the requested span lies
+outside the cached window -- and the caller queries the API instead.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import memory_db
+from date_utils import PT
+from google_auth import google_service, is_expired
+from interval_index import IntervalIndex
+from tracing import traced
+
+ENABLED = os.getenv("CALENDAR_CACHE", "1") not in {"0", "false", "no"}
+CACHE_PAST_DAYS = int(os.getenv("CALENDAR_CACHE_PAST_DAYS", "30"))
+CACHE_DAYS = int(os.getenv("CALENDAR_CACHE_DAYS", "180"))
+# Seconds between incremental syncs triggered by queries
+SYNC_INTERVAL = float(os.getenv("CALENDAR_SYNC_INTERVAL", "60"))
+
+CALENDAR_ID = "primary"
+SYNC_FIELDS = (
+    "nextPageToken,nextSyncToken,"
+    "items(id,status,summary,location,description,start,end)"
+)
+TOKEN_KEY = "calendar_sync_token:{}"
+WINDOW_KEY = "calendar_window:{}"
+SYNCED_KEY = "calendar_synced_at:{}"
+
+_sync_locks: dict[str, threading.Lock] = {}
+_initialized: set[str] = set()
+# Bumped whenever stored events change; cached interval indexes compare it.
+_version = 0
+_indexes: dict[tuple[str, str], tuple[int, IntervalIndex]] = {}
+
+
+def _connect() -> sqlite3.Connection:
+    if memory_db.DB_PATH not in _initialized:
+        memory_db.init_db()
+        _initialized.add(memory_db.DB_PATH)
+    return memory_db._connect()
+
+
+def _simplify(event: dict, calendar_id: str) -> dict:
+    start = event.get('start', {})
+    end = event.get('end', {})
+    details = ' '.join(filter(None, [event.get('location'), event.get('description')]))
+    return {
+        'id': event['id'],
+        'calendar_id': calendar_id,
+        'title': event.get('summary', ''),
+        'start': start.get('dateTime', start.get('date', '')),
+        'end': end.get('dateTime', end.get('date', '')),
+        'status': event.get('status', 'confirmed'),
+        'details': details,
+    }
+
+
+def _apply(events: list[dict], calendar_id: str) -> int:
+    global _version
+    _version += 1
+    live = [_simplify(e, calendar_id) for e in events if e.get('status') != 'cancelled']
+    cancelled = [(e['id'], calendar_id) for e in events if e.get('status') == 'cancelled']
+    memory_db.save_calendar_events(live)
+    if cancelled:
+        conn = _connect()
+        conn.executemany('DELETE FROM calendar_events WHERE event_id = ? AND calendar_id = ?', cancelled)
+        conn.commit()
+        conn.close()
+    return len(events)
+
+
+def _list_all(service, calendar_id: str, **params) -> tuple[list[dict], str | None]:
+    """Page through ``events.list`` and return the items and next sync token."""
+    items: list[dict] = []
+    page = None
+    while True:
+        resp = service.events().list(
+            calendarId=calendar_id,
+            singleEvents=True,
+            maxResults=2500,
+            pageToken=page,
+            fields=SYNC_FIELDS,
+            **params,
+        ).execute()
+        items.extend(resp.get('items', []))
+        page = resp.get('nextPageToken')
+        if not page:
+            return items, resp.get('nextSyncToken')
+
+
+@traced("calendar_store.full_sync")
+def full_sync(service=None, calendar_id: str = CALENDAR_ID) -> int:
+    """Reload the cached window of ``calendar_id`` and store a sync token."""
+    if service is None:
+        with google_service('calendar', 'v3') as service:
+            return full_sync(service, calendar_id)
+    now = datetime.now(PT).replace(hour=0, minute=0, second=0, microsecond=0)
+    start = now - timedelta(days=CACHE_PAST_DAYS)
+    end = now + timedelta(days=CACHE_DAYS)
+    items, token = _list_all(
+        service, calendar_id, timeMin=start.isoformat(), timeMax=end.isoformat()
+    )
+    conn = _connect()
+    conn.execute('DELETE FROM calendar_events WHERE calendar_id = ?', (calendar_id,))
+    conn.commit()
+    conn.close()
+    _apply(items, calendar_id)
+    memory_db.set_state(WINDOW_KEY.format(calendar_id), f"{start.timestamp()},{end.timestamp()}")
+    memory_db.set_state(TOKEN_KEY.format(calendar_id), token)
+    memory_db.set_state(SYNCED_KEY.format(calendar_id), time.time())
+    logging.info("calendar cache: full sync stored %d events", len(items))
+    return len(items)
+
+
+@traced("calendar_store.incremental_sync")
+def incremental_sync(service=None, calendar_id: str = CALENDAR_ID) -> int:
+    """Apply changes since the stored sync token; return events touched.
+
+    Falls back to :func:`full_sync` when no token is stored or Calendar
+    reports that it has expired.
+    """
+    if service is None:
+        with google_service('calendar', 'v3') as service:
+            return incremental_sync(service, calendar_id)
+    token = memory_db.get_state(TOKEN_KEY.format(calendar_id))
+    if not token:
+        return full_sync(service, calendar_id)
+    try:
+        items, next_token = _list_all(service, calendar_id, syncToken=token)
+    except Exception as e:
+        if is_expired(e, 410):
+            logging.info("calendar cache: sync token expired, resyncing")
+            return full_sync(service, calendar_id)
+        raise
+    touched = _apply(items, calendar_id)
+    memory_db.set_state(TOKEN_KEY.format(calendar_id), next_token or token)
+    memory_db.set_state(SYNCED_KEY.format(calendar_id), time.time())
+    return touched
+
+
+def _window(calendar_id: str) -> tuple[float, float] | None:
+    value = memory_db.get_state(WINDOW_KEY.format(calendar_id))
+    if not value:
+        return None
+    start, end = value.split(',')
+    return float(start), float(end)
+
+
+def ensure_fresh(calendar_id: str = CALENDAR_ID) -> bool:
+    """Sync if the cache is older than ``SYNC_INTERVAL``; return True when usable."""
+    window = _window(calendar_id)
+    synced = float(memory_db.get_state(SYNCED_KEY.format(calendar_id), '0'))
+    # Rebuild once half of the future window has been used up.
+    stale_window = window is None or window[1] - time.time() < CACHE_DAYS * 86400 / 2
+    if not stale_window and time.time() - synced < SYNC_INTERVAL:
+        return True
+    lock = _sync_locks.setdefault(calendar_id, threading.Lock())
+    if not lock.acquire(blocking=False):
+        # Another request is syncing; slightly stale data is fine.
+        return window is not None
+    try:
+        if stale_window:
+            full_sync(calendar_id=calendar_id)
+        else:
+            incremental_sync(calendar_id=calendar_id)
+    except Exception as e:
+        logging.error("calendar cache: sync failed: %s", e)
+        return False
+    finally:
+        lock.release()
+    return True
+
+
+def _rows(where: str, params: tuple, limit: int | None = None) -> list[dict]:
+    conn = _connect()
+    rows = conn.execute(
+        'SELECT event_id, title, start, end FROM calendar_events '
+        f"WHERE {where} AND status != 'cancelled' ORDER BY start_ts"
+        + (' LIMIT ?' if limit else ''),
+        params + ((limit,) if limit else ()),
+    ).fetchall()
+    conn.close()
+    return [
+        {'id': event_id, 'title': title, 'start': start, 'end': end}
+        for event_id, title, start, end in rows
+    ]
+
+
+@traced("calendar_store.between")
+def events_between(
+    start: datetime, end: datetime, calendar_id: str = CALENDAR_ID
+) -> list[dict] | None:
+    """Return cached events overlapping ``[start, end)``, or ``None`` to go live."""
+    if not ENABLED or not ensure_fresh(calendar_id):
+        return None
+    window = _window(calendar_id)
+    if not window or start.timestamp() < window[0] or end.timestamp() > window[1]:
+        return None
+    return _rows(
+        'calendar_id = ? AND start_ts < ? AND end_ts > ?',
+        (calendar_id, end.timestamp(), start.timestamp()),
+    )
+
+
+@traced("calendar_store.search")
+def search(
+    query: str, start: datetime, end: datetime, limit: int = 10,
+    calendar_id: str = CALENDAR_ID,
+) -> list[dict] | None:
+    """Return cached events in ``[start, end)`` whose title, location or
+    description contain ``query``, or ``None`` to go live.
+
+    An empty local result also returns ``None``: the API matches attendee
+    names too, which the cache does not store.
+    """
+    if not ENABLED or not ensure_fresh(calendar_id):
+        return None
+    window = _window(calendar_id)
+    if not window or start.timestamp() < window[0] or end.timestamp() > window[1]:
+        return None
+    pattern = f"%{query}%"
+    found = _rows(
+        'calendar_id = ? AND start_ts < ? AND end_ts > ? AND (title LIKE ? OR details LIKE ?)',
+        (calendar_id, end.timestamp(), start.timestamp(), pattern, pattern),
+        limit,
+    )
+    return found or None
+
+
+@traced("calendar_store.interval_index")
+def interval_index(
+    start: datetime, end: datetime, calendar_id: str = CALENDAR_ID
+) -> IntervalIndex | None:
+    """Return an :class:`IntervalIndex` of the cached window, or ``None`` to go live.
+
+    The index is rebuilt only after stored events change, so repeated
+    free/busy questions cost a tree lookup each.
+    """
+    if not ENABLED or not ensure_fresh(calendar_id):
+        return None
+    window = _window(calendar_id)
+    if not window or start.timestamp() < window[0] or end.timestamp() > window[1]:
+        return None
+    key = (memory_db.DB_PATH, calendar_id)
+    version = _version
+    cached = _indexes.get(key)
+    if cached and cached[0] == version:
+        return cached[1]
+    conn = _connect()
+    rows = conn.execute(
+        'SELECT start_ts, end_ts, event_id, title, start, end FROM calendar_events '
+        "WHERE calendar_id = ? AND status != 'cancelled' AND start_ts IS NOT NULL",
+        (calendar_id,),
+    ).fetchall()
+    conn.close()
+    index = IntervalIndex(
+        (s, e, {'id': event_id, 'title': title, 'start': st, 'end': en})
+        for s, e, event_id, title, st, en in rows
+    )
+    _indexes[key] = (version, index)
+    return index
+
+
+def remember(event: dict, calendar_id: str = CALENDAR_ID) -> None:
+    """Store an event the assistant just created so it is visible at once."""
+    if ENABLED and event.get('id'):
+        _apply([event], calendar_id)
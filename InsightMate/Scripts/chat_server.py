@@ -28,5 +28,10 @@ if __name__ == "__main__":
         requests.get(BASE_URL, timeout=3)
     except Exception:
         print("\u26a0\ufe0f Ollama/Qwen3 not reachable at", BASE_URL)
+    import onedrive_reader
+    if onedrive_reader.WATCH:
+        onedrive_reader.start_watcher()
     # Listen on all interfaces so the web client can connect locally.
-    app.run(host="0.0.0.0", port=5000)
+    # Conversation state is kept per session, so requests can be served
+    # from several threads at once.
+    app.run(host="0.0.0.0", port=5000, threaded=True)
@@ -0,0 +1,145 @@
+"""Token-budgeted conversation history for LLM prompts.
+
+Each session keeps its recent turns in memory, seeded once from its own
+messages in ``memory.db`` and then updated as replies are saved. When the turns no
+longer fit the model's token budget the oldest ones are folded into a
+rolling summary, so the prompt sent with every ``gpt()`` call stays
+roughly the same size however long the conversation gets.
+
+Budgets come from ``CONTEXT_BUDGETS`` per model, with
+``CONTEXT_TOKEN_BUDGET`` as the default for everything else.
+"""
+import os
+import threading
+from collections import deque
+
+from llm_client import chat_completion
+from memory_db import get_recent_messages
+from session_store import current_session_id, get_session
+
+DEFAULT_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2048"))
+CONTEXT_BUDGETS = {
+    "gpt-4o": 8000,
+    "gpt-4": 4000,
+    "o4-mini": 8000,
+    "o4-mini-high": 8000,
+}
+# Number of the session's stored turns used to seed its window
+SEED_TURNS = 20
+# Hard cap on turns kept per session between prompts
+MAX_TURNS = 100
+# Share of the history budget the rolling summary may take up
+SUMMARY_SHARE = 0.25
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+_generation = 0
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def budget_for(model: str | None) -> int:
+    return CONTEXT_BUDGETS.get((model or "").lower(), DEFAULT_BUDGET)
+
+
+def _turn(user: str, assistant: str) -> tuple[str, str, int]:
+    return user, assistant, estimate_tokens(user) + estimate_tokens(assistant)
+
+
+def _window() -> dict:
+    """Return the current session's window, loading it on first use."""
+    session = get_session()
+    window = session.get("window")
+    if window is None or window["generation"] != _generation:
+        rows = reversed(get_recent_messages(SEED_TURNS, session=current_session_id()))
+        window = {
+            "turns": deque(
+                (_turn(m["user"], m["assistant"]) for m in rows), maxlen=MAX_TURNS
+            ),
+            "summary": "",
+            "generation": _generation,
+            "lock": threading.Lock(),
+        }
+        session["window"] = window
+    return window
+
+
+def record_turn(user: str, assistant: str) -> None:
+    """Append a finished turn to the current session's window.
+
+    Call after the turn has been saved: a window that is loaded here for the
+    first time already contains it.
+    """
+    session = get_session()
+    if session.get("window") is None:
+        _window()
+        return
+    window = _window()
+    with window["lock"]:
+        window["turns"].append(_turn(user, assistant))
+
+
+def reset() -> None:
+    """Invalidate every session's window, e.g. after memory was cleared."""
+    global _generation
+    _generation += 1
+
+
+def _summarize(summary: str, turns: list[tuple[str, str, int]], model: str, limit: int) -> str:
+    transcript = "\n".join(f"User: {u}\nAssistant: {a}" for u, a, _ in turns)
+    prompt = (
+        "Update the running summary of this conversation with the new turns. "
+        f"Keep it under {limit * 3} words and keep names, dates and decisions.\n\n"
+        f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"
+    )
+    text = chat_completion(model, [{"role": "user", "content": prompt}])
+    if not text or text.startswith("\u26a0\ufe0f"):
+        # Keep something useful if the model is unavailable.
+        text = (summary + "\n" + transcript).strip()
+    return text[-limit * 4:]
+
+
+def _fit(window: dict, available: int, model: str) -> None:
+    """Fold the oldest turns into the summary until the window fits."""
+    turns = window["turns"]
+    summary_limit = max(int(available * SUMMARY_SHARE), 32)
+    used = sum(t[2] for t in turns) + estimate_tokens(SUMMARY_PREFIX + window["summary"])
+    if used <= available:
+        return
+    # Trim below the budget so the summary is not rebuilt on every turn.
+    target = int(available * 0.75)
+    evicted = []
+    while turns and len(turns) > 1 and used > target:
+        turn = turns.popleft()
+        evicted.append(turn)
+        used -= turn[2]
+    if evicted:
+        window["summary"] = _summarize(window["summary"], evicted, model, summary_limit)
+    if len(turns) == 1 and used > available:
+        # A single oversized turn: keep the end of the reply that fits.
+        user, assistant, _ = turns[0]
+        keep = max(available - estimate_tokens(user), 0) * 4
+        turns[0] = _turn(user, assistant[-keep:] if keep else "")
+
+
+def build_messages(system_prompt: str, prompt: str, model: str) -> list[dict]:
+    """Return chat messages for ``prompt`` with history fitted to ``model``."""
+    available = budget_for(model) - estimate_tokens(system_prompt) - estimate_tokens(prompt)
+    window = _window()
+    with window["lock"]:
+        _fit(window, max(available, 0), model)
+        summary = window["summary"]
+        turns = list(window["turns"])
+    messages = [{"role": "system", "content": system_prompt}]
+    if summary:
+        messages.append(
+            {"role": "system", "content": SUMMARY_PREFIX + summary}
+        )
+    for user, assistant, _ in turns:
+        messages.append({"role": "user", "content": user})
+        messages.append({"role": "assistant", "content": assistant})
+    messages.append({"role": "user", "content": prompt})
+    return messages
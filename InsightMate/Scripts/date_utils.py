@@ -1,9 +1,66 @@
-from datetime import datetime, timedelta, timezone
+"""Natural-language date resolution shared by the router, readers and scheduler.
 
-PT = timezone(timedelta(hours=-7))  # Pacific Time
+Everything is resolved in Pacific Time (``America/Los_Angeles``, so
+daylight saving is handled). Common phrases -- today, yesterday, tomorrow,
+weekdays, ISO dates, ``+Nd``, "last N days", "next week", "next month",
+"in N minutes" and clock times such as ``17:30`` or ``5 pm`` -- take a
+regex fast path. Anything else goes to dateparser, whose results are
+memoized per ``(text, day)`` in a bounded LRU cache so repeated phrases
+cost nothing.
+
+Phrases that depend on the current time of day ("in 2 hours", "now") are
+never cached.
+"""
+import os
+import re
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from tracing import span
+
+PT = ZoneInfo("America/Los_Angeles")  # Pacific Time
+DATE_CACHE_SIZE = int(os.getenv("DATE_CACHE_SIZE", "512"))
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+_DATEPARSER_SETTINGS = {
+    "TIMEZONE": "America/Los_Angeles",
+    "RETURN_AS_TIMEZONE_AWARE": True,
+}
+
+_DAY_RE = re.compile(
+    r"\b(?:(today|tonight)|(yesterday)|(tomorrow)"
+    r"|(?:(next|last|this)\s+)?(" + "|".join(WEEKDAYS) + r")"
+    r"|(\d{4}-\d{2}-\d{2}))\b"
+)
+# Calendar dates the fast path does not understand ("may 3", "5/3")
+_MONTH_RE = re.compile(
+    r"\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s+\d|\b\d{1,2}/\d{1,2}\b"
+)
+_OFFSET_RE = re.compile(r"^\+(\d+)\s*d(?:ays?)?$")
+_TIME_RE = re.compile(
+    r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b|\b(\d{1,2}):(\d{2})\b|\b(noon|midnight)\b"
+)
+_IN_RE = re.compile(r"^in\s+(\d+)\s+(minute|min|hour|hr|day|week)s?$")
+_LAST_N_RE = re.compile(r"\b(?:last|past)\s+(\d+)\s+days?\b")
+_NEXT_N_RE = re.compile(r"\bnext\s+(\d+)\s+days?\b")
+_LAST_WEEK_RE = re.compile(r"\b(?:last|past)\s+week\b")
+_WEEK_RE = re.compile(r"\b(this|next)\s+week\b")
+_MONTH_SPAN_RE = re.compile(r"\b(last|this|next)\s+month\b")
+_RANGE_RE = re.compile(r"(?:from|between)\s+([^\n]+?)\s+(?:to|and)\s+([^\n]+)")
+# Words whose meaning depends on the current time of day
+_VOLATILE_RE = re.compile(r"\b(?:now|ago|hours?|hrs?|minutes?|mins?|seconds?|secs?)\b")
+_FILLER_RE = re.compile(r"\b(?:on|at|the)\b")
+
+
+def now_pt() -> datetime:
+    return datetime.now(PT)
+
+
+def today_pt() -> date:
+    return now_pt().date()
 
-def today_pt():
-    return datetime.now(PT).date()
 
 def date_keyword(word: str):
     base = today_pt()
@@ -14,3 +71,243 @@ def date_keyword(word: str):
     if word == "tomorrow":
         return base + timedelta(days=1)
     return None
+
+
+def weekday_date(qualifier: str | None, name: str, base: date | None = None) -> date:
+    """Return the date of weekday ``name`` relative to ``base``.
+
+    Without a qualifier (or with "this") the next occurrence including
+    today is used; "next" skips today and "last" looks backwards.
+    """
+    base = base or today_pt()
+    target = WEEKDAYS.index(name)
+    delta = (target - base.weekday()) % 7
+    if qualifier == "last":
+        return base - timedelta(days=(base.weekday() - target) % 7 or 7)
+    if qualifier == "next" and delta == 0:
+        delta = 7
+    return base + timedelta(days=delta)
+
+
+def _day_from_match(m: re.Match, base: date) -> date:
+    today, yesterday, tomorrow, qualifier, weekday, iso = m.groups()
+    if today:
+        return base
+    if yesterday:
+        return base - timedelta(days=1)
+    if tomorrow:
+        return base + timedelta(days=1)
+    if weekday:
+        return weekday_date(qualifier, weekday, base)
+    return date.fromisoformat(iso)
+
+
+def _time_from_match(m: re.Match) -> time:
+    hour, minute, meridiem, hour24, minute24, word = m.groups()
+    if word:
+        return time(12, 0) if word == "noon" else time(0, 0)
+    if meridiem:
+        h = int(hour) % 12 + (12 if meridiem == "pm" else 0)
+        return time(h, int(minute or 0))
+    return time(int(hour24), int(minute24))
+
+
+def _only(text: str, *matches: re.Match) -> bool:
+    """Return True if ``text`` holds nothing but ``matches`` and filler words."""
+    rest = text
+    for m in matches:
+        rest = rest.replace(m.group(0), " ")
+    return not _FILLER_RE.sub(" ", rest).strip()
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_cached(text: str, base_day: date, prefer_future: bool) -> datetime | None:
+    return _dateparser_parse(text, datetime.combine(base_day, time()), prefer_future)
+
+
+def _dateparser_parse(text: str, base: datetime, prefer_future: bool) -> datetime | None:
+    from dateparser import parse
+
+    settings = dict(_DATEPARSER_SETTINGS, RELATIVE_BASE=base.replace(tzinfo=None))
+    if prefer_future:
+        settings["PREFER_DATES_FROM"] = "future"
+    with span("dates.dateparser"):
+        parsed = parse(text, settings=settings)
+    return parsed.astimezone(PT) if parsed else None
+
+
+def _fast_parse(text: str, base: date) -> datetime | None:
+    offset = _OFFSET_RE.match(text)
+    if offset:
+        return datetime.combine(base + timedelta(days=int(offset.group(1))), time(), PT)
+    day = _DAY_RE.search(text)
+    clock = _TIME_RE.search(text)
+    matches = [m for m in (day, clock) if m]
+    if not matches or not _only(text, *matches):
+        return None
+    try:
+        day_value = _day_from_match(day, base) if day else base
+        clock_value = _time_from_match(clock) if clock else time()
+    except ValueError:  # e.g. 2024-13-40 or 25:00
+        return None
+    return datetime.combine(day_value, clock_value, PT)
+
+
+def parse_when(text: str, prefer_future: bool = False) -> datetime | None:
+    """Resolve ``text`` to a timezone-aware Pacific datetime.
+
+    Dates without a time of day resolve to midnight. "in N minutes/hours"
+    is taken relative to now.
+    """
+    text = (text or "").strip().lower()
+    if not text:
+        return None
+    now = now_pt()
+    rel = _IN_RE.match(text)
+    if rel:
+        n, unit = int(rel.group(1)), rel.group(2)
+        minutes = {"minute": 1, "min": 1, "hour": 60, "hr": 60, "day": 1440, "week": 10080}[unit]
+        return now + timedelta(minutes=n * minutes)
+    fast = _fast_parse(text, now.date())
+    if fast:
+        return fast
+    if _VOLATILE_RE.search(text):
+        return _dateparser_parse(text, now, prefer_future)
+    return _parse_cached(text, now.date(), prefer_future)
+
+
+def resolve_date(text: str, prefer_future: bool = False) -> date | None:
+    """Resolve ``text`` to a Pacific calendar date."""
+    when = parse_when(text, prefer_future)
+    return when.date() if when else None
+
+
+def _month_start(day: date, months: int = 0) -> date:
+    """Return the first day of the month ``months`` after ``day``'s month."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _span(m: re.Match, today: date) -> tuple[date, date]:
+    """Resolve a match of one of the ``_SPANS`` patterns."""
+    if m.re is _LAST_N_RE:
+        return today - timedelta(days=int(m.group(1))), today + timedelta(days=1)
+    if m.re is _NEXT_N_RE:
+        return today, today + timedelta(days=int(m.group(1)) + 1)
+    if m.re is _LAST_WEEK_RE:
+        return today - timedelta(days=7), today + timedelta(days=1)
+    if m.re is _WEEK_RE:
+        monday = today - timedelta(days=today.weekday())
+        if m.group(1) == "next":
+            monday += timedelta(days=7)
+        return monday, monday + timedelta(days=7)
+    offset = {"last": -1, "this": 0, "next": 1}[m.group(1)]
+    return _month_start(today, offset), _month_start(today, offset + 1)
+
+
+# Multi-day phrases, tried before single dates
+_SPANS = (_LAST_N_RE, _NEXT_N_RE, _LAST_WEEK_RE, _WEEK_RE, _MONTH_SPAN_RE)
+
+
+def find_range(text: str) -> tuple[re.Match, date, date] | None:
+    """Return the first date phrase in ``text`` with its ``(start, end)`` dates.
+
+    ``end`` is exclusive. Only the regex fast path is used -- multi-day
+    phrases as in :func:`resolve_range` and the single days :func:`parse_when`
+    knows without dateparser -- so this is cheap enough for intent matching.
+    The match lets callers cut the phrase out of ``text``.
+    """
+    text = text.lower()
+    today = today_pt()
+    for pattern in _SPANS:
+        m = pattern.search(text)
+        if m:
+            return (m, *_span(m, today))
+    m = _DAY_RE.search(text)
+    if m:
+        try:
+            day = _day_from_match(m, today)
+        except ValueError:  # e.g. 2024-13-40
+            return None
+        return m, day, day + timedelta(days=1)
+    return None
+
+
+def find_time(text: str) -> tuple[re.Match, time] | None:
+    """Return the first clock time in ``text`` ("5 pm", "17:30", "noon")."""
+    for m in _TIME_RE.finditer(text.lower()):
+        try:
+            return m, _time_from_match(m)
+        except ValueError:  # e.g. 25:00
+            continue
+    return None
+
+
+def resolve_range(text: str) -> tuple[date, date] | None:
+    """Return ``(start, end)`` dates for ``text`` with ``end`` exclusive.
+
+    Understands "last/past N days", "next N days", "last/past week" (the
+    seven days up to today), "this/next week" (Monday to Sunday),
+    "last/this/next month", "from X to Y", "between X and Y" and single
+    dates.
+    """
+    text = (text or "").strip().lower()
+    today = today_pt()
+    for pattern in _SPANS:
+        m = pattern.search(text)
+        if m:
+            return _span(m, today)
+    m = _RANGE_RE.search(text)
+    if m:
+        start, end = resolve_date(m.group(1)), resolve_date(m.group(2))
+        if start and end:
+            return start, end + timedelta(days=1)
+    day = resolve_date(text)
+    if day:
+        return day, day + timedelta(days=1)
+    return None
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _search_cached(text: str, base_day: date) -> tuple[tuple[str, datetime], ...]:
+    from dateparser.search import search_dates
+
+    settings = dict(
+        _DATEPARSER_SETTINGS,
+        PREFER_DATES_FROM="future",
+        RELATIVE_BASE=datetime.combine(base_day, time()),
+    )
+    with span("dates.dateparser_search"):
+        found = search_dates(text, settings=settings, languages=["en"]) or []
+    return tuple((phrase, when.astimezone(PT)) for phrase, when in found)
+
+
+def find_datetime(text: str) -> tuple[str, datetime] | None:
+    """Return the first date phrase in ``text`` and its Pacific datetime.
+
+    Used to split free text such as "dinner tomorrow at 5 pm" into a title
+    and a start time.
+    """
+    lowered = text.lower()
+    base = today_pt()
+    day = _DAY_RE.search(lowered)
+    clock = _TIME_RE.search(lowered)
+    if day or (clock and not _MONTH_RE.search(lowered)):
+        spans = [m.span() for m in (day, clock) if m]
+        start, end = min(s for s, _ in spans), max(e for _, e in spans)
+        phrase = text[start:end]
+        when = _fast_parse(lowered[start:end], base)
+        if when:
+            return phrase, when
+    found = _search_cached(text, base)
+    return found[0] if found else None
+
+
+def cache_info() -> dict[str, int]:
+    """Return hit/miss counts of the dateparser caches."""
+    parse_info, search_info = _parse_cached.cache_info(), _search_cached.cache_info()
+    return {
+        "hits": parse_info.hits + search_info.hits,
+        "misses": parse_info.misses + search_info.misses,
+        "size": parse_info.currsize + search_info.currsize,
+    }
@@ -0,0 +1,148 @@
+"""Bulk document text extraction on a process pool.
+
+PDF and DOCX parsing is CPU-bound and holds the GIL, so
+:func:`extract_many` runs it in worker processes instead of the request
+thread. Each file gets ``DOC_EXTRACT_TIMEOUT`` seconds; a worker that runs
+over is killed by restarting the pool (files that were in flight on other
+workers are resubmitted). On platforms with :mod:`resource` each worker's
+address space is capped at ``DOC_EXTRACT_MEMORY_MB`` so one huge file
+fails with ``MemoryError`` instead of exhausting the machine.
+
+Results are yielded as they arrive so the caller can stream them into the
+index. Throughput of the last run is kept in :data:`last_stats` and
+exported as the ``doc_extract_files_per_second`` and
+``doc_extract_mb_per_second`` gauges.
+"""
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from typing import Callable, Iterable, Iterator
+
+import tracing
+
+WORKERS = int(os.getenv("DOC_EXTRACT_WORKERS", str(min(os.cpu_count() or 1, 4))))
+TIMEOUT = float(os.getenv("DOC_EXTRACT_TIMEOUT", "60"))
+MEMORY_MB = int(os.getenv("DOC_EXTRACT_MEMORY_MB", "1024"))
+# Fewer files than this are extracted in-process; a pool costs more to start.
+PARALLEL_MIN = int(os.getenv("DOC_EXTRACT_PARALLEL_MIN", "4"))
+
+last_stats: dict[str, float] = {}
+
+
+def _limit_memory(memory_mb: int) -> None:
+    """Pool initializer: cap the worker's address space."""
+    if not memory_mb:
+        return
+    try:
+        import resource
+    except ImportError:  # Windows
+        return
+    limit = memory_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError) as e:
+        logging.warning("doc extract: could not set memory limit: %s", e)
+
+
+def _error(exc: BaseException) -> str:
+    if isinstance(exc, MemoryError):
+        return 'memory limit exceeded'
+    return f"{type(exc).__name__}: {exc}"
+
+
+def _serial(paths: list[str], extract: Callable[[str], str]) -> Iterator[tuple[str, str | None, str | None]]:
+    for path in paths:
+        try:
+            yield path, extract(path), None
+        except Exception as e:
+            yield path, None, _error(e)
+
+
+def _pooled(
+    paths: list[str], extract: Callable[[str], str], workers: int, timeout: float, memory_mb: int
+) -> Iterator[tuple[str, str | None, str | None]]:
+    pending = deque(paths)
+    # At most one task per worker is in flight, so each starts as soon as it
+    # is submitted and its deadline can be taken from the submit time.
+    inflight: deque = deque()
+    pool = multiprocessing.Pool(workers, initializer=_limit_memory, initargs=(memory_mb,))
+    try:
+        while pending or inflight:
+            while pending and len(inflight) < workers:
+                path = pending.popleft()
+                inflight.append((path, pool.apply_async(extract, (path,)), time.monotonic()))
+            path, result, submitted = inflight.popleft()
+            try:
+                text = result.get(max(submitted + timeout - time.monotonic(), 0))
+            except multiprocessing.TimeoutError:
+                logging.warning("doc extract: %s timed out after %.0fs", path, timeout)
+                pool.terminate()
+                pool.join()
+                # Everything else in flight died with the pool; run it again.
+                pending.extendleft(reversed([p for p, _, _ in inflight]))
+                inflight.clear()
+                pool = multiprocessing.Pool(workers, initializer=_limit_memory, initargs=(memory_mb,))
+                yield path, None, f"timed out after {timeout:g}s"
+            except Exception as e:
+                yield path, None, _error(e)
+            else:
+                yield path, text, None
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def extract_many(
+    paths: Iterable[str],
+    extract: Callable[[str], str],
+    workers: int | None = None,
+    timeout: float | None = None,
+    memory_mb: int | None = None,
+) -> Iterator[tuple[str, str | None, str | None]]:
+    """Yield ``(path, text, error)`` for every path as extraction finishes.
+
+    ``extract`` must be a module-level function (it is pickled to the
+    workers) that raises on failure. ``text`` is ``None`` exactly when
+    ``error`` is set. Results are not necessarily in input order.
+    """
+    paths = list(paths)
+    workers = WORKERS if workers is None else workers
+    timeout = TIMEOUT if timeout is None else timeout
+    memory_mb = MEMORY_MB if memory_mb is None else memory_mb
+    started = time.perf_counter()
+    files = total_bytes = failed = 0
+    if workers > 1 and len(paths) >= PARALLEL_MIN:
+        results = _pooled(paths, extract, min(workers, len(paths)), timeout, memory_mb)
+    else:
+        results = _serial(paths, extract)
+    with tracing.span("doc_extract.batch"):
+        for path, text, error in results:
+            files += 1
+            failed += error is not None
+            try:
+                total_bytes += os.path.getsize(path)
+            except OSError:
+                pass
+            yield path, text, error
+    seconds = max(time.perf_counter() - started, 1e-9)
+    last_stats.clear()
+    last_stats.update(
+        files=files,
+        failed=failed,
+        bytes=total_bytes,
+        seconds=round(seconds, 3),
+        files_per_s=round(files / seconds, 2),
+        mb_per_s=round(total_bytes / 1e6 / seconds, 2),
+    )
+    if files:
+        tracing.gauge("doc_extract_files_per_second", last_stats['files_per_s'])
+        tracing.gauge("doc_extract_mb_per_second", last_stats['mb_per_s'])
+        tracing.count("doc_extract_files_total", files - failed, result="ok")
+        if failed:
+            tracing.count("doc_extract_files_total", failed, result="failed")
+        logging.info(
+            "doc extract: %d files (%d failed) in %.1fs, %.1f files/s, %.2f MB/s",
+            files, failed, seconds, last_stats['files_per_s'], last_stats['mb_per_s'],
+        )
@@ -0,0 +1,219 @@
+"""Persistent full-text index of OneDrive documents.
+
+Extracted document text is stored in the ``documents`` table of
+``memory.db``, keyed by path, with an FTS5 index over file name and body.
+:func:`search` is a single index lookup: hits are ranked with BM25 (a match
+in the file name weighs more than one in the body) and come with a snippet
+cut from the stored text around the matched terms, so no document is opened
+or parsed at query time.
+
+``onedrive_reader`` decides what to (re)index, using :func:`stats` to spot
+changed files; this module only stores and queries. Files whose extraction
+timed out or failed are recorded in ``documents_quarantine`` so they are not
+retried until they change.
+"""
+import logging
+import re
+import sqlite3
+import time
+
+import memory_db
+from tracing import traced
+
+# BM25 weights for the name and body columns
+NAME_WEIGHT = 5.0
+BODY_WEIGHT = 1.0
+SNIPPET_TOKENS = 24
+
+_initialized: set[str] = set()
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _connect() -> sqlite3.Connection:
+    conn = memory_db._connect()
+    if memory_db.DB_PATH not in _initialized:
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS documents ('
+            'path TEXT PRIMARY KEY,'
+            'name TEXT,'
+            'size INTEGER,'
+            'mtime REAL,'
+            'body TEXT'
+            ')'
+        )
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS documents_quarantine ('
+            'path TEXT PRIMARY KEY,'
+            'size INTEGER,'
+            'mtime REAL,'
+            'reason TEXT,'
+            'at REAL'
+            ')'
+        )
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5("
+            "name, body, content='documents', content_rowid='rowid')"
+        )
+        conn.executescript(
+            """
+            CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN
+                INSERT INTO documents_fts(rowid, name, body)
+                VALUES (new.rowid, new.name, new.body);
+            END;
+            CREATE TRIGGER IF NOT EXISTS documents_ad AFTER DELETE ON documents BEGIN
+                INSERT INTO documents_fts(documents_fts, rowid, name, body)
+                VALUES ('delete', old.rowid, old.name, old.body);
+            END;
+            CREATE TRIGGER IF NOT EXISTS documents_au AFTER UPDATE ON documents BEGIN
+                INSERT INTO documents_fts(documents_fts, rowid, name, body)
+                VALUES ('delete', old.rowid, old.name, old.body);
+                INSERT INTO documents_fts(rowid, name, body)
+                VALUES (new.rowid, new.name, new.body);
+            END;
+            """
+        )
+        conn.commit()
+        _initialized.add(memory_db.DB_PATH)
+    return conn
+
+
+@traced("docindex.store")
+def store(documents: list[dict]) -> int:
+    """Insert or replace ``documents`` (``path``, ``name``, ``size``, ``mtime``, ``text``)."""
+    if not documents:
+        return 0
+    conn = _connect()
+    conn.executemany(
+        'INSERT INTO documents(path, name, size, mtime, body) VALUES (?, ?, ?, ?, ?) '
+        'ON CONFLICT(path) DO UPDATE SET name = excluded.name, size = excluded.size, '
+        'mtime = excluded.mtime, body = excluded.body',
+        [
+            (d['path'], d['name'], d.get('size', 0), d.get('mtime', 0.0), d.get('text', ''))
+            for d in documents
+        ],
+    )
+    conn.executemany(
+        'DELETE FROM documents_quarantine WHERE path = ?', [(d['path'],) for d in documents]
+    )
+    conn.commit()
+    conn.close()
+    return len(documents)
+
+
+def remove(paths: list[str]) -> int:
+    """Drop ``paths`` from the index."""
+    if not paths:
+        return 0
+    conn = _connect()
+    conn.executemany('DELETE FROM documents WHERE path = ?', [(p,) for p in paths])
+    conn.executemany('DELETE FROM documents_quarantine WHERE path = ?', [(p,) for p in paths])
+    conn.commit()
+    conn.close()
+    return len(paths)
+
+
+def clear() -> None:
+    conn = _connect()
+    conn.execute('DELETE FROM documents')
+    conn.execute('DELETE FROM documents_quarantine')
+    conn.commit()
+    conn.close()
+
+
+def stats() -> dict[str, tuple[int, float]]:
+    """Return ``{path: (size, mtime)}`` for every indexed document."""
+    conn = _connect()
+    rows = conn.execute('SELECT path, size, mtime FROM documents').fetchall()
+    conn.close()
+    return {path: (size, mtime) for path, size, mtime in rows}
+
+
+def texts(paths: list[str]) -> dict[str, tuple[str, str]]:
+    """Return ``{path: (name, text)}`` for the indexed ``paths``."""
+    conn = _connect()
+    out = {}
+    for path in paths:
+        row = conn.execute('SELECT name, body FROM documents WHERE path = ?', (path,)).fetchone()
+        if row:
+            out[path] = (row[0], row[1] or '')
+    conn.close()
+    return out
+
+
+def quarantine(entries: list[dict]) -> int:
+    """Record files whose extraction failed (``path``, ``size``, ``mtime``, ``reason``).
+
+    They are skipped until their size or mtime changes.
+    """
+    if not entries:
+        return 0
+    conn = _connect()
+    conn.executemany(
+        'INSERT OR REPLACE INTO documents_quarantine(path, size, mtime, reason, at) '
+        'VALUES (?, ?, ?, ?, ?)',
+        [(e['path'], e.get('size', 0), e.get('mtime', 0.0), e.get('reason', ''), time.time())
+         for e in entries],
+    )
+    conn.commit()
+    conn.close()
+    return len(entries)
+
+
+def quarantined() -> dict[str, tuple[int, float, str]]:
+    """Return ``{path: (size, mtime, reason)}`` for quarantined files."""
+    conn = _connect()
+    rows = conn.execute('SELECT path, size, mtime, reason FROM documents_quarantine').fetchall()
+    conn.close()
+    return {path: (size, mtime, reason) for path, size, mtime, reason in rows}
+
+
+def count() -> int:
+    conn = _connect()
+    (n,) = conn.execute('SELECT COUNT(*) FROM documents').fetchone()
+    conn.close()
+    return n
+
+
+def _match(query: str) -> str | None:
+    """Return an FTS5 query requiring every word of ``query``.
+
+    Each word is quoted so punctuation and FTS operators in user text are
+    taken literally; the last word also matches as a prefix.
+    """
+    words = _TOKEN_RE.findall(query)
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += '*'
+    return ' AND '.join(terms)
+
+
+@traced("docindex.search")
+def search(query: str, limit: int = 5) -> list[dict]:
+    """Return up to ``limit`` documents matching ``query``, best first.
+
+    Each hit has ``name``, ``path``, ``modified`` and ``snippet``.
+    """
+    match = _match(query)
+    if not match:
+        return []
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            'SELECT d.name, d.path, d.mtime, '
+            f"snippet(documents_fts, 1, '', '', '...', {SNIPPET_TOKENS}) "
+            'FROM documents_fts JOIN documents d ON d.rowid = documents_fts.rowid '
+            'WHERE documents_fts MATCH ? '
+            f'ORDER BY bm25(documents_fts, {NAME_WEIGHT}, {BODY_WEIGHT}) LIMIT ?',
+            (match, limit),
+        ).fetchall()
+    except sqlite3.OperationalError as e:
+        logging.error("doc index: query %r failed: %s", query, e)
+        return []
+    finally:
+        conn.close()
+    return [
+        {'name': name, 'path': path, 'modified': mtime, 'snippet': snippet or ''}
+        for name, path, mtime, snippet in rows
+    ]
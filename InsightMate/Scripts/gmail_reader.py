@@ -1,73 +1,30 @@
 from __future__ import print_function
 from email.header import decode_header, make_header
 from email.mime.text import MIMEText
-from googleapiclient.discovery import build
 import base64
 import os
 
-from google_auth import get_credentials
+from google_auth import google_service
+from tracing import traced
 
 # ------------- NEW HELPERS -------------
-from datetime import datetime, timedelta, timezone
-import re
-from dateparser import parse as parse_date
+from date_utils import resolve_range  # Always translate user keywords in Pacific Time
 
-# Always translate user keywords in Pacific Time (InsightMate standard)
-PT = timezone(timedelta(hours=-7))
+# Messages fetched per Gmail batch request (the API allows up to 100, but
+# large batches are more likely to be rate limited)
+BATCH_SIZE = int(os.getenv("GMAIL_BATCH_SIZE", "50"))
+# Headers requested when only metadata is needed
+METADATA_HEADERS = ['From', 'Subject']
 
+
+@traced("gmail.date_filter")
 def _date_filter(text: str) -> str:
     """Return Gmail after/before filters for natural-language date expressions."""
-    text = text.strip().lower()
-    today = datetime.now(PT).date()
-
-    # last N days / past N days
-    m = re.search(r"(?:last|past)\s+(\d+)\s+days?", text)
-    if m:
-        n = int(m.group(1))
-        start = today - timedelta(days=n)
-        end = today + timedelta(days=1)
-        return f"after:{start:%Y/%m/%d} before:{end:%Y/%m/%d}"
-
-    # next N days
-    m = re.search(r"next\s+(\d+)\s+days?", text)
-    if m:
-        n = int(m.group(1))
-        start = today
-        end = today + timedelta(days=n + 1)
-        return f"after:{start:%Y/%m/%d} before:{end:%Y/%m/%d}"
-
-    if "last week" in text or "past week" in text:
-        start = today - timedelta(days=7)
-        end = today + timedelta(days=1)
-        return f"after:{start:%Y/%m/%d} before:{end:%Y/%m/%d}"
-
-    if "next week" in text:
-        start = today + timedelta(days=1)
-        end = today + timedelta(days=8)
-        return f"after:{start:%Y/%m/%d} before:{end:%Y/%m/%d}"
-
-    # range expressions "from X to Y" / "between X and Y"
-    range_match = re.search(
-        r"(?:from|between)\s+([^\n]+?)\s+(?:to|and)\s+([^\n]+)",
-        text,
-    )
-    if range_match:
-        start_str, end_str = range_match.groups()
-        start_dt = parse_date(start_str, settings={"RELATIVE_BASE": datetime.now(PT)})
-        end_dt = parse_date(end_str, settings={"RELATIVE_BASE": datetime.now(PT)})
-        if start_dt and end_dt:
-            start = start_dt.date()
-            end = end_dt.date() + timedelta(days=1)
-            return f"after:{start:%Y/%m/%d} before:{end:%Y/%m/%d}"
-
-    # single date
-    parsed = parse_date(text, settings={"RELATIVE_BASE": datetime.now(PT)})
-    if parsed:
-        start = parsed.date()
-        end = start + timedelta(days=1)
-        return f"after:{start:%Y/%m/%d} before:{end:%Y/%m/%d}"
-
-    return text
+    span = resolve_range(text)
+    if not span:
+        return text.strip().lower()
+    start, end = span
+    return f"after:{start:%Y/%m/%d} before:{end:%Y/%m/%d}"
 # ---------------------------------------
 
 
@@ -88,13 +45,19 @@ def _get_body(msg: dict) -> str:
     return _walk(payload)
 
 
-def _msg_to_dict(service, msg_id, include_body: bool = False):
-    msg = service.users().messages().get(
-        userId='me', id=msg_id, format='full'
-    ).execute()
+def _get_request(service, msg_id, include_body: bool = False):
+    """Return a ``messages().get`` request, downloading the body only if needed."""
+    if include_body:
+        return service.users().messages().get(userId='me', id=msg_id, format='full')
+    return service.users().messages().get(
+        userId='me', id=msg_id, format='metadata', metadataHeaders=METADATA_HEADERS
+    )
+
+
+def _parse_message(msg: dict, include_body: bool = False) -> dict:
     headers = {
         h['name']: str(make_header(decode_header(h['value'])))
-        for h in msg['payload']['headers']
+        for h in msg.get('payload', {}).get('headers', [])
     }
     sender = headers.get('From', '')
     subject = headers.get('Subject', '')
@@ -105,43 +68,93 @@ def _msg_to_dict(service, msg_id, include_body: bool = False):
     return data
 
 
+def _msg_to_dict(service, msg_id, include_body: bool = False):
+    msg = _get_request(service, msg_id, include_body).execute()
+    return _parse_message(msg, include_body)
+
+
+def _fetch_raw(service, msg_ids: list[str], include_body: bool = False) -> list[dict]:
+    """Fetch ``msg_ids`` with batch requests and return them in the same order.
+
+    Up to ``BATCH_SIZE`` messages share one HTTP round trip. Messages whose
+    part of a batch failed (e.g. rate limited) are retried individually.
+    """
+    if len(msg_ids) == 1:
+        return [_get_request(service, msg_ids[0], include_body).execute()]
+    fetched: dict[str, dict] = {}
+    failed: list[str] = []
+
+    def _collect(request_id, response, exception):
+        if exception is not None:
+            failed.append(request_id)
+        else:
+            fetched[request_id] = response
+
+    for i in range(0, len(msg_ids), BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=_collect)
+        for msg_id in msg_ids[i:i + BATCH_SIZE]:
+            batch.add(_get_request(service, msg_id, include_body), request_id=msg_id)
+        batch.execute()
+    for msg_id in failed:
+        try:
+            fetched[msg_id] = _get_request(service, msg_id, include_body).execute()
+        except Exception as e:
+            print(f"\u26a0\ufe0f Could not fetch message {msg_id}: {e}")
+    return [fetched[msg_id] for msg_id in msg_ids if msg_id in fetched]
+
+
+def _fetch_messages(service, msg_ids: list[str], include_body: bool = False) -> list[dict]:
+    return [_parse_message(m, include_body) for m in _fetch_raw(service, msg_ids, include_body)]
+
+
+@traced("gmail.fetch_unread")
 def fetch_unread_email(include_body: bool = False):
-    creds = get_credentials()
-    service = build('gmail', 'v1', credentials=creds)
-    results = service.users().messages().list(userId='me', labelIds=['INBOX'], q='is:unread').execute()
-    messages = results.get('messages', [])
-    if not messages:
-        return None
-    msg_id = messages[0]['id']
-    data = _msg_to_dict(service, msg_id, include_body=include_body)
+    with google_service('gmail', 'v1') as service:
+        results = service.users().messages().list(userId='me', labelIds=['INBOX'], q='is:unread').execute()
+        messages = results.get('messages', [])
+        if not messages:
+            return None
+        msg_id = messages[0]['id']
+        data = _msg_to_dict(service, msg_id, include_body=include_body)
     return data
 
 
-def search_emails(query: str, limit: int = 5, include_body: bool = False):
-    """Return list of emails matching the Gmail search query."""
+@traced("gmail.search")
+def search_emails(query: str, limit: int = 5, include_body: bool = False, live: bool = False):
+    """Return list of emails matching the Gmail search query.
+
+    Queries are answered from the local mirror (see :mod:`mail_mirror`)
+    when it can; pass ``live=True`` to always ask the Gmail API.
+    """
     # 🔄 Normalise "today", "yesterday", etc.
     query = _date_filter(query.strip().lower())
 
-    creds = get_credentials()
-    service = build('gmail', 'v1', credentials=creds)
-    results = (
-        service.users()
-        .messages()
-        .list(userId='me', q=query, maxResults=limit)
-        .execute()
-    )
-    messages = results.get('messages', [])
-
-    output = []
-    seen: set[str] = set()
-    for m in messages:
-        msg_id = m.get('id')
-        if not msg_id or msg_id in seen:
-            continue
-        seen.add(msg_id)
-        output.append(_msg_to_dict(service, msg_id, include_body=include_body))
-
-    return output
+    if not live:
+        import mail_mirror
+        local = mail_mirror.search(query, limit=limit, include_body=include_body)
+        if local is not None:
+            return local
+
+    with google_service('gmail', 'v1') as service:
+        results = (
+            service.users()
+            .messages()
+            .list(userId='me', q=query, maxResults=limit)
+            .execute()
+        )
+        messages = results.get('messages', [])
+
+        msg_ids: list[str] = []
+        seen: set[str] = set()
+        for m in messages:
+            msg_id = m.get('id')
+            if not msg_id or msg_id in seen:
+                continue
+            seen.add(msg_id)
+            msg_ids.append(msg_id)
+        if not msg_ids:
+            return []
+        return _fetch_messages(service, msg_ids, include_body=include_body)
 
 
 def read_email(query: str) -> dict | None:
@@ -150,10 +163,9 @@ def read_email(query: str) -> dict | None:
     return results[0] if results else None
 
 
+@traced("gmail.send")
 def send_email(to: str, subject: str, body: str) -> str:
     """Send an email using the user's Gmail account."""
-    creds = get_credentials()
-    service = build('gmail', 'v1', credentials=creds)
     domain = os.getenv('EMAIL_DOMAIN', '')
     if '@' not in to:
         if domain:
@@ -164,7 +176,8 @@ def send_email(to: str, subject: str, body: str) -> str:
     msg['to'] = to
     msg['subject'] = subject
     raw = base64.urlsafe_b64encode(msg.as_bytes()).decode()
-    service.users().messages().send(userId='me', body={'raw': raw}).execute()
+    with google_service('gmail', 'v1') as service:
+        service.users().messages().send(userId='me', body={'raw': raw}).execute()
     return 'Email sent.'
 
 
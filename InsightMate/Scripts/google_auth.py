@@ -1,8 +1,12 @@
 from __future__ import annotations
+import datetime
 import os.path
+import threading
+from contextlib import contextmanager
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
+from googleapiclient.discovery import build
 
 SCOPES = [
     'https://www.googleapis.com/auth/gmail.readonly',
@@ -13,8 +17,20 @@ SCOPES = [
 TOKEN_FILE = os.path.join(os.path.dirname(__file__), "token.json")
 CREDENTIALS_FILE = "credentials.json"
 
-def get_credentials():
-    """Return authorized Google credentials for Gmail and Calendar."""
+# Refresh the access token this many seconds before it expires
+REFRESH_MARGIN = int(os.getenv("GOOGLE_REFRESH_MARGIN", "300"))
+# Idle service objects kept per API; each owns its own HTTP transport
+SERVICE_POOL_SIZE = int(os.getenv("GOOGLE_SERVICE_POOL", "4"))
+
+_creds_lock = threading.Lock()
+_creds = None
+_pool_lock = threading.Lock()
+_pools: dict[tuple[str, str], list] = {}
+_stats = {"credential_loads": 0, "refreshes": 0, "builds": 0, "reuses": 0}
+
+
+def _load_credentials():
+    """Read ``token.json``, refreshing or re-authorizing as needed."""
     creds = None
     token_path = TOKEN_FILE
     credentials_path = os.path.join(os.path.dirname(__file__), CREDENTIALS_FILE)
@@ -26,6 +42,105 @@ def get_credentials():
         else:
             flow = InstalledAppFlow.from_client_secrets_file(credentials_path, SCOPES)
             creds = flow.run_local_server(port=0)
-        with open(token_path, 'w') as token:
-            token.write(creds.to_json())
+        _save(creds)
     return creds
+
+
+def _save(creds) -> None:
+    with open(TOKEN_FILE, 'w') as token:
+        token.write(creds.to_json())
+
+
+def _expires_soon(creds) -> bool:
+    if not creds.valid:
+        return True
+    expiry = getattr(creds, 'expiry', None)
+    if expiry is None:
+        return False
+    # google-auth stores expiry as a naive UTC datetime
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    return expiry - now < datetime.timedelta(seconds=REFRESH_MARGIN)
+
+
+def get_credentials():
+    """Return authorized Google credentials for Gmail and Calendar.
+
+    The credentials are loaded once per process and refreshed only when the
+    access token is about to expire.
+    """
+    global _creds
+    with _creds_lock:
+        if _creds is None:
+            _creds = _load_credentials()
+            _stats["credential_loads"] += 1
+        elif _expires_soon(_creds):
+            if getattr(_creds, 'refresh_token', None):
+                _creds.refresh(Request())
+                _save(_creds)
+                _stats["refreshes"] += 1
+            else:
+                _creds = _load_credentials()
+                _stats["credential_loads"] += 1
+        return _creds
+
+
+@contextmanager
+def google_service(api: str, version: str):
+    """Check out a ``googleapiclient`` service for ``api``/``version``.
+
+    Service objects are not thread-safe, so each caller gets one to itself
+    for the ``with`` block. It is then returned to a small per-API pool and
+    reused, keeping its parsed discovery document and open connections.
+    """
+    creds = get_credentials()
+    key = (api, version)
+    service = None
+    with _pool_lock:
+        idle = _pools.setdefault(key, [])
+        while idle:
+            owner, candidate = idle.pop()
+            if owner is creds:
+                service = candidate
+                _stats["reuses"] += 1
+                break
+    if service is None:
+        service = build(api, version, credentials=creds, cache_discovery=False)
+        with _pool_lock:
+            _stats["builds"] += 1
+    try:
+        yield service
+    except Exception:
+        # Don't hand a transport in an unknown state to the next caller.
+        raise
+    else:
+        with _pool_lock:
+            idle = _pools.setdefault(key, [])
+            if len(idle) < SERVICE_POOL_SIZE:
+                idle.append((creds, service))
+
+
+def is_expired(exc: Exception, status: int) -> bool:
+    """Return True if ``exc`` is the HTTP ``status`` an API sends for a stale sync cursor.
+
+    Gmail answers an old ``historyId`` with 404 and Calendar an old
+    ``syncToken`` with 410; callers pass the one their API uses.
+    """
+    code = getattr(getattr(exc, 'resp', None), 'status', None)
+    return str(code) == str(status) or getattr(exc, 'status_code', None) == status
+
+
+def service_stats() -> dict[str, int]:
+    """Return credential and service cache counters."""
+    with _pool_lock:
+        data = dict(_stats)
+        data["idle_services"] = sum(len(v) for v in _pools.values())
+    return data
+
+
+def clear_cache() -> None:
+    """Forget cached credentials and pooled services."""
+    global _creds
+    with _creds_lock:
+        _creds = None
+    with _pool_lock:
+        _pools.clear()
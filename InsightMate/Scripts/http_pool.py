@@ -0,0 +1,141 @@
+"""Shared keep-alive HTTP sessions for Ollama, OpenAI and n8n.
+
+Each backend gets one ``requests.Session`` (or one OpenAI client) that is
+created lazily and reused by every caller, so repeated LLM and workflow
+calls within a turn share TCP connections instead of opening new ones.
+Pool sizes and timeouts are read from the environment:
+
+``HTTP_POOL_SIZE``        connections kept per host (default 10)
+``HTTP_CONNECT_TIMEOUT``  seconds to wait for a connection (default 5)
+``OLLAMA_TIMEOUT``        read timeout for Ollama calls (default 120)
+``OPENAI_TIMEOUT``        request timeout for OpenAI calls (default 120)
+``N8N_TIMEOUT``           read timeout for n8n calls (default 30)
+"""
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUTS = {
+    "ollama": float(os.getenv("OLLAMA_TIMEOUT", "120")),
+    "openai": float(os.getenv("OPENAI_TIMEOUT", "120")),
+    "n8n": float(os.getenv("N8N_TIMEOUT", "30")),
+}
+
+_lock = threading.Lock()
+_sessions: dict[str, requests.Session] = {}
+_openai_clients: dict[str, object] = {}
+_requests: dict[str, int] = {}
+
+
+def timeout(name: str) -> tuple[float, float]:
+    """Return the ``(connect, read)`` timeout pair for backend ``name``."""
+    return CONNECT_TIMEOUT, READ_TIMEOUTS.get(name, 60.0)
+
+
+def _count(name: str):
+    def hook(response, *args, **kwargs):
+        with _lock:
+            _requests[name] = _requests.get(name, 0) + 1
+        return response
+    return hook
+
+
+def get_session(name: str, pool_size: int | None = None) -> requests.Session:
+    """Return the shared keep-alive session for backend ``name``.
+
+    ``requests.Session`` and the underlying urllib3 pools are safe to share
+    between threads for plain request/response use; the lock only guards
+    creation so concurrent first calls do not build two sessions.
+    """
+    session = _sessions.get(name)
+    if session is not None:
+        return session
+    with _lock:
+        session = _sessions.get(name)
+        if session is None:
+            size = pool_size or POOL_SIZE
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=size, pool_maxsize=size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.hooks["response"].append(_count(name))
+            _sessions[name] = session
+    return session
+
+
+def get_openai_client(api_key: str | None = None):
+    """Return a cached ``openai.OpenAI`` client for ``api_key``.
+
+    The OpenAI SDK keeps its own connection pool per client, so reusing the
+    client is what makes connections persist between calls.
+    """
+    import openai
+
+    key = api_key or getattr(openai, "api_key", None) or os.getenv("OPENAI_API_KEY", "")
+    client = _openai_clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        client = _openai_clients.get(key)
+        if client is None:
+            kwargs = {"timeout": READ_TIMEOUTS["openai"]}
+            if key:
+                kwargs["api_key"] = key
+            try:
+                import httpx
+                kwargs["http_client"] = openai.DefaultHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=POOL_SIZE,
+                        max_keepalive_connections=POOL_SIZE,
+                    ),
+                    timeout=httpx.Timeout(READ_TIMEOUTS["openai"], connect=CONNECT_TIMEOUT),
+                )
+            except Exception:
+                pass
+            client = openai.OpenAI(**kwargs)
+            _openai_clients[key] = client
+    return client
+
+
+def pool_stats() -> dict[str, dict[str, int]]:
+    """Return request and connection counts for each backend session.
+
+    ``reused`` is the number of requests that were served over an already
+    open connection.
+    """
+    stats = {}
+    with _lock:
+        sessions = dict(_sessions)
+        counts = dict(_requests)
+        openai_clients = len(_openai_clients)
+    for name, session in sessions.items():
+        connections = 0
+        for adapter in {id(a): a for a in session.adapters.values()}.values():
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+        total = counts.get(name, 0)
+        stats[name] = {
+            "requests": total,
+            "connections": connections,
+            "reused": max(total - connections, 0),
+        }
+    stats["openai"] = {"clients": openai_clients}
+    return stats
+
+
+def close_all() -> None:
+    """Close every pooled session and forget cached clients."""
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+        _openai_clients.clear()
+        _requests.clear()
+    for session in sessions:
+        session.close()
@@ -0,0 +1,256 @@
+"""Deterministic intent matching for common email and calendar requests.
+
+``match_intent`` turns phrases like "emails today", "calendar tomorrow" or
+"add 5 pm dinner" into the same action list the LLM planner would emit,
+together with a confidence score. ``plan_then_answer`` uses the actions
+directly when the score reaches ``INTENT_THRESHOLD`` and otherwise falls
+back to the LLM planner.
+"""
+import os
+import re
+from datetime import date, timedelta
+
+from date_utils import WEEKDAYS, find_range, find_time, today_pt
+
+INTENT_THRESHOLD = float(os.getenv("INTENT_THRESHOLD", "0.8"))
+
+EMAIL_WORDS = {"email", "emails", "e-mail", "e-mails", "mail", "mails", "inbox", "gmail"}
+CALENDAR_WORDS = {
+    "calendar", "event", "events", "meeting", "meetings", "agenda",
+    "appointment", "appointments", "schedule",
+}
+SUMMARY_WORDS = {"summarize", "summarise", "summary", "recap"}
+ADD_WORDS = {"add", "schedule", "create", "book"}
+# Words that make a sentence a question or a lookup rather than a request to
+# create an event ("schedule" questions, "new emails since 9 am").
+QUESTION_WORDS = {
+    "what", "what's", "whats", "when", "which", "who", "how", "why", "any",
+    "do", "does", "did", "is", "are", "show", "list", "read", "check", "get",
+    "find", "search", "since", "after", "before", "new", "latest", "unread",
+}
+# Title words accepted before each further word lowers the confidence
+TITLE_WORDS = 3
+FREE_WORDS = {"free", "available", "availability", "gap", "gaps", "slot", "slots"}
+CONFLICT_WORDS = {"conflict", "conflicts", "clash", "clashes", "overlap", "overlaps", "taken", "busy"}
+DAY_PARTS = {"morning": ("09:00", "12:00"), "afternoon": ("12:00", "17:00"), "evening": ("17:00", "21:00")}
+AVAILABILITY_FILLER = {"when", "am", "time", "be", "will", "anything", "else", "that", "at"}
+
+# Words that carry no intent of their own and never lower the confidence.
+FILLER = {
+    "a", "an", "the", "my", "me", "i", "i'm", "do", "did", "have", "has", "any",
+    "all", "what", "what's", "whats", "show", "list", "get", "check", "read",
+    "see", "tell", "give", "find", "on", "for", "in", "from", "of", "and", "&",
+    "is", "are", "there", "to", "up", "please", "can", "could", "you", "at",
+    "new", "latest", "recent", "unread", "received", "got", "this", "coming",
+    "upcoming", "events", "whats", "with", "about", "how", "does", "look",
+    "like", "it", "today's", "tomorrow's", "yesterday's", "was",
+}
+
+_EVERY_RE = re.compile(r"\bevery\s+(day|weekday|" + "|".join(WEEKDAYS) + r")s?\b")
+_BARE_HOUR_RE = re.compile(r"\bat\s+(\d{1,2})\b(?!\s*(?:am|pm|:))")
+_KEYWORD_RE = re.compile(r"\b(?:from|about|regarding|mentioning)\s+(.+)$")
+# Date words date_utils.find_range did not consume ("until june 5", "for 3
+# weeks"); a series whose title still holds one goes to the planner.
+DATE_WORDS = {
+    "day", "days", "week", "weeks", "weekend", "month", "months", "year", "years",
+    "until", "till", "through", "thru", "starting", "ending", "next", "last",
+    "january", "february", "march", "april", "may", "june", "july", "august",
+    "september", "october", "november", "december",
+    "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+}
+# Day keywords the tools accept as they are
+DAY_KEYWORDS = {"today": "today", "tonight": "today", "yesterday": "yesterday", "tomorrow": "tomorrow"}
+
+
+def _cut(text: str, m: re.Match) -> str:
+    """Remove the matched phrase, with a possessive "'s", from ``text``."""
+    end = m.end() + 2 if text.startswith("'s", m.end()) else m.end()
+    return text[: m.start()] + " " + text[end:]
+
+
+def _day(m: re.Match, start: date) -> str:
+    """Return the tool argument for a single-day match."""
+    return DAY_KEYWORDS.get(m.group(0), start.isoformat())
+
+
+def _clock(t) -> str:
+    return f"{t.hour:02d}:{t.minute:02d}"
+
+
+def _tokens(text: str) -> list[str]:
+    return [w for w in re.findall(r"[a-z0-9'&:-]+", text) if re.search(r"[a-z0-9]", w)]
+
+
+def _confidence(leftover: list[str]) -> float:
+    """Start fully confident and lose 0.25 per unexplained word."""
+    return max(0.0, 1.0 - 0.25 * len(leftover))
+
+
+def _is_request(words: list[str]) -> bool:
+    """Return True if ``words`` ask to create something rather than look it up."""
+    return not any(w in EMAIL_WORDS or w in QUESTION_WORDS for w in words)
+
+
+def _schedule_intent(text: str) -> tuple[list[dict], float]:
+    clock = find_time(text)
+    if not clock or not _is_request(_tokens(text)):
+        return [], 0.0
+    time_match, when = clock
+    rest = _cut(text, time_match)
+    action = {"type": "schedule_event", "time": _clock(when)}
+    span = find_range(rest)
+    if span:
+        m, start, _ = span
+        action["date"] = _day(m, start)
+        rest = _cut(rest, m)
+    words = [w for w in _tokens(rest) if w not in ADD_WORDS | CALENDAR_WORDS | FILLER]
+    if not words:
+        return [], 0.0
+    action["title"] = " ".join(words)
+    return [action], _confidence(words[TITLE_WORDS:])
+
+
+def _availability_intent(text: str, words: list[str]) -> tuple[list[dict], float]:
+    """Map "when am I free thursday afternoon" / "any conflicts at 3 pm"."""
+    wants_free = any(w in FREE_WORDS for w in words)
+    wants_conflicts = any(w in CONFLICT_WORDS for w in words)
+    if (not wants_free and not wants_conflicts) or any(w in EMAIL_WORDS for w in words):
+        return [], 0.0
+    rest = text
+    clock = find_time(rest)
+    if clock:
+        rest = _cut(rest, clock[0])
+    day = "today"
+    span = find_range(rest)
+    if span:
+        m, start, end = span
+        if end - start > timedelta(days=1):
+            # Multi-day ranges are left to the planner.
+            return [], 0.0
+        day = _day(m, start)
+        rest = _cut(rest, m)
+    part = next((p for p in DAY_PARTS if p in words), None)
+    if clock:
+        action = {"type": "check_conflicts", "date": day, "time": _clock(clock[1])}
+    elif wants_conflicts:
+        return [], 0.0
+    else:
+        action = {"type": "find_free_time", "date": day}
+        if part:
+            action["start"], action["end"] = DAY_PARTS[part]
+    vocab = FREE_WORDS | CONFLICT_WORDS | set(DAY_PARTS) | CALENDAR_WORDS | FILLER | AVAILABILITY_FILLER
+    return [action], _confidence([w for w in _tokens(rest) if w not in vocab])
+
+
+def _bare_hour(m: re.Match) -> str:
+    """Read "at 9" as 09:00 and "at 3" as 15:00 (office hours)."""
+    hour = int(m.group(1))
+    if 1 <= hour <= 6:
+        hour += 12
+    return f"{hour:02d}:00"
+
+
+def _series_intent(text: str) -> tuple[list[dict], float]:
+    """Map "add standup every weekday at 9 next week" to one schedule_events.
+
+    The series covers the range ``date_utils`` finds in the text, or the
+    week starting on a single day ("... tomorrow") or today.
+    """
+    every = _EVERY_RE.search(text)
+    if not every or not _is_request(_tokens(text)):
+        return [], 0.0
+    rest = _cut(text, every)
+    clock = find_time(rest)
+    if clock:
+        time_match, when = clock[0], _clock(clock[1])
+    else:
+        time_match = _BARE_HOUR_RE.search(rest)
+        if not time_match:
+            return [], 0.0
+        when = _bare_hour(time_match)
+    rest = _cut(rest, time_match)
+    first = today_pt()
+    stop = first + timedelta(days=7)
+    span = find_range(rest)
+    if span:
+        m, first, stop = span
+        if stop - first <= timedelta(days=1):
+            stop = first + timedelta(days=7)
+        rest = _cut(rest, m)
+    words = [w for w in _tokens(rest) if w not in ADD_WORDS | CALENDAR_WORDS | FILLER]
+    if any(w in DATE_WORDS or any(c.isdigit() for c in w) for w in words):
+        return [], 0.0
+    unit = every.group(1)
+    days = [first + timedelta(days=i) for i in range((stop - first).days)]
+    if unit == "weekday":
+        days = [d for d in days if d.weekday() < 5]
+    elif unit != "day":
+        days = [d for d in days if d.weekday() == WEEKDAYS.index(unit)]
+    if not days or not words:
+        return [], 0.0
+    title = " ".join(words)
+    events = [{"title": title, "date": d.isoformat(), "time": when} for d in days]
+    return [{"type": "schedule_events", "events": events}], _confidence(words[TITLE_WORDS:])
+
+
+def match_intent(text: str) -> tuple[list[dict], float]:
+    """Return planner-style actions for ``text`` and a confidence in [0, 1].
+
+    An empty action list means no rule applied.
+    """
+    text = text.strip().lower().rstrip("?!.")
+    words = _tokens(text)
+    if not words:
+        return [], 0.0
+
+    if words[0] in ADD_WORDS or text.startswith(("set appointment", "set meeting")):
+        if _EVERY_RE.search(text):
+            # A series the rule cannot read must not become a single event.
+            return _series_intent(text)
+        actions, confidence = _schedule_intent(text)
+        if actions:
+            return actions, confidence
+
+    actions, confidence = _availability_intent(text, words)
+    if actions:
+        return actions, confidence
+
+    wants_email = any(w in EMAIL_WORDS for w in words)
+    wants_calendar = any(w in CALENDAR_WORDS for w in words)
+    if not wants_email and not wants_calendar:
+        return [], 0.0
+
+    span = find_range(text)
+    remaining = _cut(text, span[0]) if span else text
+    vocab = EMAIL_WORDS | CALENDAR_WORDS | SUMMARY_WORDS | FILLER
+    leftover = [w for w in _tokens(remaining) if w not in vocab]
+
+    actions: list[dict] = []
+    if wants_email:
+        if span:
+            # gmail_reader resolves the phrase with the same date_utils rules.
+            query = span[0].group(0)
+        else:
+            # Only words introduced by "from"/"about" count as search terms.
+            m = _KEYWORD_RE.search(remaining)
+            keywords = [w for w in _tokens(m.group(1)) if w not in vocab] if m else []
+            leftover = [w for w in leftover if w not in keywords]
+            query = " ".join(keywords) or "today"
+        actions.append({"type": "search_email", "query": query})
+    if wants_calendar:
+        if not span:
+            actions.append({"type": "get_calendar", "date": "today"})
+        else:
+            m, start, end = span
+            if end - start > timedelta(days=1):
+                # get_calendar_range takes an inclusive end date
+                last = end - timedelta(days=1)
+                actions.append(
+                    {"type": "get_calendar_range", "start": start.isoformat(), "end": last.isoformat()}
+                )
+            else:
+                actions.append({"type": "get_calendar", "date": _day(m, start)})
+    if any(w in SUMMARY_WORDS for w in words):
+        source = "email" if wants_email else "calendar"
+        actions.append({"type": "summarize", "source": source})
+    return actions, _confidence(leftover)
@@ -0,0 +1,118 @@
+"""Static interval index for free/busy and conflict queries.
+
+:class:`IntervalIndex` stores half-open ``[start, end)`` intervals (epoch
+seconds for calendar events) with an arbitrary payload. Overlap queries
+walk a centered interval tree and cost ``O(log n + k)`` for ``k`` results;
+free-slot queries bisect a precomputed list of merged busy blocks, also in
+``O(log n + k)``. The index is immutable -- rebuild it when events change.
+Empty intervals (``end <= start``) occupy no time and are ignored.
+"""
+from bisect import bisect_right
+from typing import Any, Iterable, Iterator
+
+
+class _Node:
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, intervals: list[tuple[float, float, Any]]):
+        points = sorted(p for s, e, _ in intervals for p in (s, e))
+        self.center = points[len(points) // 2]
+        here, left, right = [], [], []
+        for item in intervals:
+            if item[1] <= self.center:
+                left.append(item)
+            elif item[0] > self.center:
+                right.append(item)
+            else:
+                here.append(item)
+        if not here:
+            # The median point is only an end point; centre on a start
+            # instead so this node holds at least one interval.
+            self.center = min(s for s, _, _ in intervals)
+            here = [i for i in intervals if i[0] <= self.center]
+            left = []
+            right = [i for i in intervals if i[0] > self.center]
+        self.by_start = sorted(here, key=lambda i: i[0])
+        self.by_end = sorted(here, key=lambda i: i[1], reverse=True)
+        self.left = _Node(left) if left else None
+        self.right = _Node(right) if right else None
+
+
+class IntervalIndex:
+    """Centered interval tree plus merged busy blocks."""
+
+    def __init__(self, intervals: Iterable[tuple[float, float, Any]] = ()):
+        items = [(float(s), float(e), p) for s, e, p in intervals if e > s]
+        self._root = _Node(items) if items else None
+        self._size = len(items)
+        starts: list[float] = []
+        ends: list[float] = []
+        for s, e, _ in sorted(items, key=lambda i: i[0]):
+            if ends and s <= ends[-1]:
+                ends[-1] = max(ends[-1], e)
+            else:
+                starts.append(s)
+                ends.append(e)
+        self._busy_starts = starts
+        self._busy_ends = ends
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _walk(self, start: float, end: float) -> Iterator[tuple[float, float, Any]]:
+        stack = [self._root] if self._root else []
+        while stack:
+            node = stack.pop()
+            if end <= node.center:
+                for item in node.by_start:
+                    if item[0] >= end:
+                        break
+                    yield item
+                if node.left:
+                    stack.append(node.left)
+            elif start > node.center:
+                for item in node.by_end:
+                    if item[1] <= start:
+                        break
+                    yield item
+                if node.right:
+                    stack.append(node.right)
+            else:
+                yield from node.by_start
+                if node.left:
+                    stack.append(node.left)
+                if node.right:
+                    stack.append(node.right)
+
+    def overlapping(self, start: float, end: float) -> list[tuple[float, float, Any]]:
+        """Return intervals overlapping ``[start, end)`` sorted by start."""
+        if end <= start:
+            return []
+        return sorted(self._walk(start, end), key=lambda i: (i[0], i[1]))
+
+    def conflicts(self, start: float, end: float) -> list[Any]:
+        """Return the payloads of intervals that overlap ``[start, end)``."""
+        return [p for _, _, p in self.overlapping(start, end)]
+
+    def busy(self, start: float, end: float) -> list[tuple[float, float]]:
+        """Return merged busy blocks clipped to ``[start, end)``."""
+        i = bisect_right(self._busy_ends, start)
+        out = []
+        while i < len(self._busy_starts) and self._busy_starts[i] < end:
+            out.append((max(self._busy_starts[i], start), min(self._busy_ends[i], end)))
+            i += 1
+        return out
+
+    def free_slots(
+        self, start: float, end: float, min_length: float = 0
+    ) -> list[tuple[float, float]]:
+        """Return gaps of at least ``min_length`` seconds in ``[start, end)``."""
+        slots = []
+        cursor = start
+        for s, e in self.busy(start, end):
+            if s - cursor >= max(min_length, 1e-9):
+                slots.append((cursor, s))
+            cursor = max(cursor, e)
+        if end - cursor >= max(min_length, 1e-9):
+            slots.append((cursor, end))
+        return slots
@@ -0,0 +1,138 @@
+"""Persistent cache of LLM replies keyed by model, messages and options.
+
+Replies live in ``llm_cache.db`` next to ``memory.db``. Entries older than
+``LLM_CACHE_TTL`` seconds are dropped and, once more than
+``LLM_CACHE_MAX_ENTRIES`` are stored, the least recently used ones are
+evicted. Set ``LLM_CACHE=0`` to disable the cache entirely.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from memory_db import DB_PATH as MEMORY_DB_PATH
+
+DB_PATH = os.path.join(os.path.dirname(MEMORY_DB_PATH), "llm_cache.db")
+ENABLED = os.getenv("LLM_CACHE", "1") not in {"0", "false", "no"}
+MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+TTL = float(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+
+_lock = threading.Lock()
+_counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+_initialized: set[str] = set()
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(DB_PATH, timeout=5)
+    if DB_PATH not in _initialized:
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS llm_cache ('
+            'key TEXT PRIMARY KEY,'
+            'model TEXT,'
+            'response TEXT NOT NULL,'
+            'created REAL NOT NULL,'
+            'last_used REAL NOT NULL'
+            ')'
+        )
+        conn.execute(
+            'CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache(last_used)'
+        )
+        conn.commit()
+        _initialized.add(DB_PATH)
+    return conn
+
+
+def _bump(name: str, amount: int = 1) -> None:
+    with _lock:
+        _counters[name] += amount
+
+
+def make_key(
+    model: str,
+    messages: list[dict],
+    options: dict | None = None,
+    format: dict | str | None = None,
+) -> str:
+    """Return a stable hash of the request that produced a reply."""
+    request = {"model": model, "messages": messages, "options": options or {}}
+    if format:
+        request["format"] = format
+    blob = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def get(key: str) -> str | None:
+    """Return the cached reply for ``key`` or ``None`` on a miss."""
+    now = time.time()
+    try:
+        conn = _connect()
+        row = conn.execute(
+            'SELECT response, created FROM llm_cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row and now - row[1] <= TTL:
+            conn.execute('UPDATE llm_cache SET last_used = ? WHERE key = ?', (now, key))
+            conn.commit()
+        elif row:
+            conn.execute('DELETE FROM llm_cache WHERE key = ?', (key,))
+            conn.commit()
+            row = None
+        conn.close()
+    except sqlite3.Error:
+        row = None
+    _bump("hits" if row else "misses")
+    return row[0] if row else None
+
+
+def put(key: str, model: str, response: str) -> None:
+    """Store ``response`` under ``key`` and apply age and size eviction."""
+    now = time.time()
+    try:
+        conn = _connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO llm_cache(key, model, response, created, last_used) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (key, model, response, now, now),
+        )
+        evicted = conn.execute(
+            'DELETE FROM llm_cache WHERE created < ?', (now - TTL,)
+        ).rowcount
+        count = conn.execute('SELECT COUNT(*) FROM llm_cache').fetchone()[0]
+        if count > MAX_ENTRIES:
+            evicted += conn.execute(
+                'DELETE FROM llm_cache WHERE key IN '
+                '(SELECT key FROM llm_cache ORDER BY last_used ASC, rowid ASC LIMIT ?)',
+                (count - MAX_ENTRIES,),
+            ).rowcount
+        conn.commit()
+        conn.close()
+    except sqlite3.Error:
+        return
+    _bump("stores")
+    if evicted:
+        _bump("evictions", evicted)
+
+
+def stats() -> dict[str, int]:
+    """Return hit/miss counters and the number of stored replies."""
+    with _lock:
+        data = dict(_counters)
+    try:
+        conn = _connect()
+        data["entries"] = conn.execute('SELECT COUNT(*) FROM llm_cache').fetchone()[0]
+        conn.close()
+    except sqlite3.Error:
+        data["entries"] = 0
+    return data
+
+
+def clear() -> None:
+    """Remove every cached reply and reset the counters."""
+    conn = _connect()
+    conn.execute('DELETE FROM llm_cache')
+    conn.commit()
+    conn.close()
+    with _lock:
+        for name in _counters:
+            _counters[name] = 0
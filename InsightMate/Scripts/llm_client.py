@@ -2,6 +2,12 @@ import os
 import json
 import requests
 import logging
+import time
+from typing import Iterator
+
+import llm_cache
+import tracing
+from http_pool import get_openai_client, get_session, timeout
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
@@ -18,24 +24,95 @@ except Exception:
 # Backwards compatibility
 OLLAMA_URL = BASE_URL
 
+# Ollama ``options`` that have a direct OpenAI equivalent
+OPENAI_OPTIONS = {"temperature", "top_p", "seed"}
+
 
 def gpt(prompt: str, model: str) -> str:
     """Return a chat completion for ``prompt`` using ``model``."""
     return chat_completion(model, [{"role": "user", "content": prompt}])
 
 
-def chat_completion(model: str, messages: list[dict]) -> str:
-    """Return a chat completion from Ollama or OpenAI."""
+def _openai_kwargs(options: dict | None, format: dict | str | None = None) -> dict:
+    kwargs = {k: v for k, v in (options or {}).items() if k in OPENAI_OPTIONS}
+    if isinstance(format, dict):
+        kwargs["response_format"] = {
+            "type": "json_schema",
+            "json_schema": {"name": "response", "schema": format},
+        }
+    elif format:
+        kwargs["response_format"] = {"type": "json_object"}
+    return kwargs
+
+
+def _cacheable(reply: str) -> bool:
+    return (
+        bool(reply)
+        and not reply.startswith("\u26a0\ufe0f")
+        and "\u26a0\ufe0f LLM error" not in reply
+    )
+
+
+def _record(model: str, messages: list[dict], reply: str, source: str) -> None:
+    """Count one LLM call with its prompt and reply sizes."""
+    prompt_bytes = sum(len(str(m.get("content", "")).encode()) for m in messages)
+    tracing.count("llm_requests_total", model=model, source=source)
+    tracing.count("llm_prompt_bytes_total", prompt_bytes, model=model)
+    tracing.count("llm_response_bytes_total", len(reply.encode()), model=model)
+    if not _cacheable(reply):
+        tracing.count("llm_errors_total", model=model)
+
+
+def chat_completion(
+    model: str,
+    messages: list[dict],
+    options: dict | None = None,
+    cache: bool = False,
+    format: dict | str | None = None,
+) -> str:
+    """Return a chat completion from Ollama or OpenAI.
+
+    ``options`` are passed to Ollama as model options (OpenAI receives the
+    ones it understands). ``format`` constrains the reply to JSON: ``"json"``
+    for any JSON object or a JSON schema dict, sent as Ollama's ``format``
+    or OpenAI's ``response_format``. With ``cache`` the reply is served
+    from and stored in :mod:`llm_cache`; only deterministic prompts (the
+    planner, canned greetings) should ask for it, since a cached reply is
+    replayed for up to ``LLM_CACHE_TTL``.
+    """
+    use_cache = cache and llm_cache.ENABLED
+    if use_cache:
+        key = llm_cache.make_key(model, messages, options, format)
+        cached = llm_cache.get(key)
+        if cached is not None:
+            _record(model, messages, cached, "cache")
+            return cached
+    with tracing.span("llm.chat"):
+        reply = _chat_completion(model, messages, options, format)
+    _record(model, messages, reply, "model")
+    if use_cache and _cacheable(reply):
+        llm_cache.put(key, model, reply)
+    return reply
+
+
+def _chat_completion(
+    model: str, messages: list[dict], options: dict | None, format: dict | str | None = None
+) -> str:
     if model.startswith("gpt-"):
-        import openai
-        client = openai.OpenAI()
-        resp = client.chat.completions.create(model=model, messages=messages)
+        client = get_openai_client()
+        resp = client.chat.completions.create(
+            model=model, messages=messages, **_openai_kwargs(options, format)
+        )
         return resp.choices[0].message.content.strip()
 
     payload = {"model": model, "messages": messages, "stream": False}
+    if options:
+        payload["options"] = options
+    if format:
+        payload["format"] = format
     try:
-        response = requests.post(
-            f"{BASE_URL}/api/chat", json=payload, stream=True, timeout=120
+        response = get_session("ollama").post(
+            f"{BASE_URL}/api/chat", json=payload, stream=True, timeout=timeout("ollama")
         )
         response.raise_for_status()
     except requests.HTTPError as e:
@@ -50,3 +127,100 @@ def chat_completion(model: str, messages: list[dict]) -> str:
             )
         return f"\u26a0\ufe0f LLM error: {e}"
     return response.json()["message"]["content"].strip()
+
+
+def stream_chat_completion(
+    model: str,
+    messages: list[dict],
+    options: dict | None = None,
+    cache: bool = True,
+) -> Iterator[str]:
+    """Yield a chat completion from Ollama or OpenAI piece by piece.
+
+    Ollama streams newline-delimited JSON objects and OpenAI streams delta
+    chunks; both are reduced to plain text fragments so callers can forward
+    them as soon as they arrive. Errors are yielded as a single warning
+    fragment, matching :func:`chat_completion`. A cached reply is yielded
+    whole, and a completed stream is stored in the cache.
+    """
+    use_cache = cache and llm_cache.ENABLED
+    if use_cache:
+        key = llm_cache.make_key(model, messages, options)
+        cached = llm_cache.get(key)
+        if cached is not None:
+            _record(model, messages, cached, "cache")
+            yield cached
+            return
+    parts: list[str] = []
+    start = time.perf_counter()
+    for chunk in _stream_chat_completion(model, messages, options):
+        if not parts:
+            tracing.observe("llm.first_token", time.perf_counter() - start)
+        parts.append(chunk)
+        yield chunk
+    tracing.observe("llm.stream", time.perf_counter() - start)
+    reply = "".join(parts).strip()
+    _record(model, messages, reply, "model")
+    if use_cache and _cacheable(reply):
+        llm_cache.put(key, model, reply)
+
+
+def _stream_chat_completion(
+    model: str, messages: list[dict], options: dict | None
+) -> Iterator[str]:
+    if model.startswith("gpt-"):
+        client = get_openai_client()
+        try:
+            stream = client.chat.completions.create(
+                model=model, messages=messages, stream=True, **_openai_kwargs(options)
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if text:
+                    yield text
+        except Exception as e:
+            logging.error("LLM stream failed: %s", e)
+            yield f"\u26a0\ufe0f LLM error: {e}"
+        return
+
+    payload = {"model": model, "messages": messages, "stream": True}
+    if options:
+        payload["options"] = options
+    try:
+        response = get_session("ollama").post(
+            f"{BASE_URL}/api/chat", json=payload, stream=True, timeout=timeout("ollama")
+        )
+        response.raise_for_status()
+    except requests.HTTPError as e:
+        logging.error("LLM %s", e)
+        if e.response is not None and e.response.status_code == 404:
+            yield (
+                f"\u26a0\ufe0f Model '{model}' not found. "
+                f"Run `ollama pull {model}` or choose another model in Settings."
+            )
+        else:
+            yield f"\u26a0\ufe0f LLM error: {e.response.status_code}"
+        return
+    except requests.exceptions.RequestException as e:
+        logging.error("LLM call failed: %s", e)
+        yield f"\u26a0\ufe0f LLM error: {e}"
+        return
+
+    with response:
+        for line in response.iter_lines():
+            if not line:
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError:
+                continue
+            if data.get("error"):
+                yield f"\u26a0\ufe0f LLM error: {data['error']}"
+                return
+            text = data.get("message", {}).get("content", "")
+            if text:
+                yield text
+            if data.get("done"):
+                return
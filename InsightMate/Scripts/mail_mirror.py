@@ -0,0 +1,338 @@
+"""Local Gmail mirror with incremental sync and full-text search.
+
+Recent messages (``GMAIL_MIRROR_DAYS``) are copied into ``memory.db`` with
+an FTS5 index over sender, subject, snippet and, with
+``GMAIL_MIRROR_BODIES=1``, the plain text body. After the first full sync
+the mirror is kept current with Gmail's ``history.list`` starting from the
+stored ``historyId``; if that id has expired the mirror is rebuilt.
+
+:func:`search` answers the queries produced by ``gmail_reader`` (keywords,
+``from:``, ``subject:``, ``is:unread`` and ``after:``/``before:`` dates)
+locally. It returns ``None`` whenever it cannot answer faithfully -- the
+mirror is not ready, the query uses another operator, it has free-text
+keywords but bodies are not mirrored (Gmail matches them against the whole
+message), or the date range reaches past the mirrored window without enough
+local matches -- and the caller falls back to the API.
+"""
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import gmail_reader
+import memory_db
+from date_utils import PT
+from google_auth import google_service, is_expired
+from tracing import traced
+
+ENABLED = os.getenv("GMAIL_MIRROR", "1") not in {"0", "false", "no"}
+MIRROR_DAYS = int(os.getenv("GMAIL_MIRROR_DAYS", "90"))
+MIRROR_BODIES = os.getenv("GMAIL_MIRROR_BODIES", "0") not in {"0", "false", "no"}
+# Seconds between incremental syncs triggered by searches
+SYNC_INTERVAL = float(os.getenv("GMAIL_MIRROR_INTERVAL", "60"))
+
+HISTORY_KEY = "gmail_history_id"
+SYNCED_KEY = "gmail_synced_at"
+HISTORY_TYPES = ["messageAdded", "messageDeleted", "labelAdded", "labelRemoved"]
+# Labels Gmail leaves out of searches unless asked for
+HIDDEN_LABELS = ("TRASH", "SPAM")
+
+_sync_lock = threading.Lock()
+_initialized: set[str] = set()
+_full_sync_thread: threading.Thread | None = None
+
+_TERM_RE = re.compile(r'(-?)(?:(\w+):)?("[^"]*"|\S+)')
+
+
+def _connect() -> sqlite3.Connection:
+    conn = memory_db._connect()
+    if memory_db.DB_PATH not in _initialized:
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS mail ('
+            'id TEXT PRIMARY KEY,'
+            'thread_id TEXT,'
+            'internal_date INTEGER,'
+            'sender TEXT,'
+            'subject TEXT,'
+            'snippet TEXT,'
+            'body TEXT,'
+            'labels TEXT'
+            ')'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS mail_date ON mail(internal_date)')
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS mail_fts USING fts5("
+            "sender, subject, snippet, body, content='mail', content_rowid='rowid')"
+        )
+        conn.executescript(
+            """
+            CREATE TRIGGER IF NOT EXISTS mail_ai AFTER INSERT ON mail BEGIN
+                INSERT INTO mail_fts(rowid, sender, subject, snippet, body)
+                VALUES (new.rowid, new.sender, new.subject, new.snippet, new.body);
+            END;
+            CREATE TRIGGER IF NOT EXISTS mail_ad AFTER DELETE ON mail BEGIN
+                INSERT INTO mail_fts(mail_fts, rowid, sender, subject, snippet, body)
+                VALUES ('delete', old.rowid, old.sender, old.subject, old.snippet, old.body);
+            END;
+            CREATE TRIGGER IF NOT EXISTS mail_au AFTER UPDATE ON mail BEGIN
+                INSERT INTO mail_fts(mail_fts, rowid, sender, subject, snippet, body)
+                VALUES ('delete', old.rowid, old.sender, old.subject, old.snippet, old.body);
+                INSERT INTO mail_fts(rowid, sender, subject, snippet, body)
+                VALUES (new.rowid, new.sender, new.subject, new.snippet, new.body);
+            END;
+            """
+        )
+        conn.commit()
+        _initialized.add(memory_db.DB_PATH)
+    return conn
+
+
+def _row(msg: dict) -> tuple:
+    parsed = gmail_reader._parse_message(msg, include_body=MIRROR_BODIES)
+    return (
+        msg['id'],
+        msg.get('threadId', ''),
+        int(msg.get('internalDate') or 0),
+        parsed['from'],
+        parsed['subject'],
+        parsed['snippet'],
+        parsed.get('body', ''),
+        ',' + ','.join(msg.get('labelIds', [])) + ',',
+    )
+
+
+def _store(conn: sqlite3.Connection, messages: list[dict]) -> None:
+    conn.executemany(
+        'INSERT INTO mail(id, thread_id, internal_date, sender, subject, snippet, body, labels) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+        'ON CONFLICT(id) DO UPDATE SET thread_id = excluded.thread_id, '
+        'internal_date = excluded.internal_date, sender = excluded.sender, '
+        'subject = excluded.subject, snippet = excluded.snippet, '
+        'body = excluded.body, labels = excluded.labels',
+        [_row(m) for m in messages],
+    )
+
+
+@traced("mirror.full_sync")
+def full_sync(service=None) -> int:
+    """Rebuild the mirror from the last ``MIRROR_DAYS`` days of mail."""
+    if service is None:
+        with google_service('gmail', 'v1') as service:
+            return full_sync(service)
+    # Take the history id first so changes made while listing are replayed.
+    history_id = service.users().getProfile(userId='me').execute()['historyId']
+    msg_ids: list[str] = []
+    page = None
+    while True:
+        resp = service.users().messages().list(
+            userId='me', q=f'newer_than:{MIRROR_DAYS}d', maxResults=500, pageToken=page
+        ).execute()
+        msg_ids.extend(m['id'] for m in resp.get('messages', []))
+        page = resp.get('nextPageToken')
+        if not page:
+            break
+    messages = gmail_reader._fetch_raw(service, msg_ids, include_body=MIRROR_BODIES) if msg_ids else []
+    conn = _connect()
+    conn.execute('DELETE FROM mail')
+    _store(conn, messages)
+    conn.commit()
+    conn.close()
+    memory_db.set_state(HISTORY_KEY, history_id)
+    memory_db.set_state(SYNCED_KEY, time.time())
+    logging.info("mail mirror: full sync stored %d messages", len(messages))
+    return len(messages)
+
+
+@traced("mirror.incremental_sync")
+def incremental_sync(service=None) -> int:
+    """Apply changes since the stored ``historyId``; return messages touched.
+
+    Falls back to :func:`full_sync` when no history id is stored or Gmail
+    reports that it has expired.
+    """
+    if service is None:
+        with google_service('gmail', 'v1') as service:
+            return incremental_sync(service)
+    history_id = memory_db.get_state(HISTORY_KEY)
+    if not history_id:
+        return full_sync(service)
+    changed: list[str] = []
+    deleted: set[str] = set()
+    page = None
+    latest = history_id
+    try:
+        while True:
+            resp = service.users().history().list(
+                userId='me',
+                startHistoryId=history_id,
+                historyTypes=HISTORY_TYPES,
+                pageToken=page,
+            ).execute()
+            for record in resp.get('history', []):
+                for key in ('messagesAdded', 'labelsAdded', 'labelsRemoved'):
+                    for item in record.get(key, []):
+                        changed.append(item['message']['id'])
+                for item in record.get('messagesDeleted', []):
+                    deleted.add(item['message']['id'])
+            latest = resp.get('historyId', latest)
+            page = resp.get('nextPageToken')
+            if not page:
+                break
+    except Exception as e:
+        if is_expired(e, 404):
+            logging.info("mail mirror: history id expired, resyncing")
+            return full_sync(service)
+        raise
+    fetch = list(dict.fromkeys(i for i in changed if i not in deleted))
+    messages = gmail_reader._fetch_raw(service, fetch, include_body=MIRROR_BODIES) if fetch else []
+    conn = _connect()
+    _store(conn, messages)
+    if deleted:
+        conn.executemany('DELETE FROM mail WHERE id = ?', [(i,) for i in deleted])
+    cutoff = int((time.time() - MIRROR_DAYS * 86400) * 1000)
+    conn.execute('DELETE FROM mail WHERE internal_date < ?', (cutoff,))
+    conn.commit()
+    conn.close()
+    memory_db.set_state(HISTORY_KEY, latest)
+    memory_db.set_state(SYNCED_KEY, time.time())
+    return len(messages) + len(deleted)
+
+
+def _start_full_sync() -> None:
+    """Build the mirror in the background so the first search is not blocked."""
+    global _full_sync_thread
+    if _full_sync_thread and _full_sync_thread.is_alive():
+        return
+
+    def _run():
+        with _sync_lock:
+            if memory_db.get_state(HISTORY_KEY):
+                return
+            try:
+                full_sync()
+            except Exception as e:
+                logging.error("mail mirror: full sync failed: %s", e)
+
+    _full_sync_thread = threading.Thread(target=_run, name="mail-mirror", daemon=True)
+    _full_sync_thread.start()
+
+
+def ensure_fresh() -> bool:
+    """Sync if the mirror is older than ``SYNC_INTERVAL``; return True when usable."""
+    if not memory_db.get_state(HISTORY_KEY):
+        _start_full_sync()
+        return False
+    synced = float(memory_db.get_state(SYNCED_KEY, '0'))
+    if time.time() - synced < SYNC_INTERVAL:
+        return True
+    if not _sync_lock.acquire(blocking=False):
+        # Another request is syncing; slightly stale data is fine.
+        return True
+    try:
+        incremental_sync()
+    except Exception as e:
+        logging.error("mail mirror: sync failed: %s", e)
+        return False
+    finally:
+        _sync_lock.release()
+    return True
+
+
+def _parse_day(value: str) -> int | None:
+    """Return a Gmail ``after:``/``before:`` value as epoch milliseconds."""
+    if value.isdigit():
+        return int(value) * 1000
+    for fmt in ('%Y/%m/%d', '%Y-%m-%d'):
+        try:
+            day = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        return int(day.replace(tzinfo=PT).timestamp() * 1000)
+    return None
+
+
+def _fts_phrase(text: str) -> str:
+    return '"' + text.strip('"').replace('"', '""') + '"'
+
+
+def _translate(query: str) -> tuple[str, list, bool] | None:
+    """Translate a Gmail query into SQL, or ``None`` if it is not supported.
+
+    Free-text keywords are only supported with ``MIRROR_BODIES``; without
+    the body a local search would miss messages that match only there.
+    The flag is True when the query's date range lies inside the mirrored
+    window, so the local result is complete.
+    """
+    where: list[str] = []
+    params: list = []
+    match: list[str] = []
+    after = None
+    for negate, op, value in _TERM_RE.findall(query):
+        op = op.lower()
+        if negate:
+            return None
+        if op in ('after', 'before'):
+            ms = _parse_day(value)
+            if ms is None:
+                return None
+            where.append('internal_date >= ?' if op == 'after' else 'internal_date < ?')
+            params.append(ms)
+            if op == 'after':
+                after = ms
+        elif op in ('from', 'subject'):
+            column = 'sender' if op == 'from' else 'subject'
+            match.append(f'{column} : {_fts_phrase(value)}')
+        elif op == 'is' and value.lower() in ('unread', 'read'):
+            where.append('labels %s LIKE ?' % ('' if value.lower() == 'unread' else 'NOT'))
+            params.append('%,UNREAD,%')
+        elif op or not MIRROR_BODIES:
+            return None
+        else:
+            match.append(_fts_phrase(value))
+    window_start = (time.time() - MIRROR_DAYS * 86400) * 1000
+    bounded = after is not None and after >= window_start
+    for label in HIDDEN_LABELS:
+        where.append('labels NOT LIKE ?')
+        params.append(f'%,{label},%')
+    if match:
+        where.append('mail.rowid IN (SELECT rowid FROM mail_fts WHERE mail_fts MATCH ?)')
+        params.append(' AND '.join(match))
+    return ' AND '.join(where) or '1', params, bounded
+
+
+@traced("mirror.search")
+def search(query: str, limit: int = 5, include_body: bool = False) -> list[dict] | None:
+    """Answer a Gmail search from the mirror, or return ``None`` to go live."""
+    if not ENABLED or (include_body and not MIRROR_BODIES):
+        return None
+    translated = _translate(query)
+    if translated is None:
+        return None
+    if not ensure_fresh():
+        return None
+    where, params, bounded = translated
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            f'SELECT sender, subject, snippet, body FROM mail WHERE {where} '
+            'ORDER BY internal_date DESC LIMIT ?',
+            (*params, limit),
+        ).fetchall()
+    except sqlite3.OperationalError as e:
+        logging.error("mail mirror: query %r failed: %s", query, e)
+        return None
+    finally:
+        conn.close()
+    if not bounded and len(rows) < limit:
+        # Older matches may exist upstream that the mirror does not hold.
+        return None
+    out = []
+    for sender, subject, snippet, body in rows:
+        data = {'from': sender, 'subject': subject, 'snippet': snippet}
+        if include_body:
+            data['body'] = body
+        out.append(data)
+    return out
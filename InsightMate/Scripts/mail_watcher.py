@@ -0,0 +1,76 @@
+"""Detect newly arrived unread mail between scheduled checks.
+
+Instead of listing every unread message on each tick, the watcher keeps a
+Gmail ``historyId`` cursor in ``sync_state`` and asks ``history.list`` only
+for messages added to the inbox since the previous tick. An idle inbox costs
+a single small request; new messages are fetched in one batch, recorded
+with ``memory_db.save_email`` and returned for notification.
+"""
+import logging
+
+import gmail_reader
+import memory_db
+from google_auth import google_service, is_expired
+from tracing import traced
+
+CURSOR_KEY = "gmail_watch_history_id"
+
+
+def _reset_cursor(service) -> None:
+    profile = service.users().getProfile(userId='me').execute()
+    memory_db.set_state(CURSOR_KEY, profile['historyId'])
+
+
+@traced("gmail.check_new_mail")
+def check_new_mail() -> list[dict]:
+    """Return unread inbox messages that arrived since the last call.
+
+    The first call only records the current position, so mail that was
+    already waiting is not reported as new.
+    """
+    with google_service('gmail', 'v1') as service:
+        cursor = memory_db.get_state(CURSOR_KEY)
+        if not cursor:
+            _reset_cursor(service)
+            return []
+        added: list[str] = []
+        page = None
+        latest = cursor
+        try:
+            while True:
+                resp = service.users().history().list(
+                    userId='me',
+                    startHistoryId=cursor,
+                    historyTypes=['messageAdded'],
+                    labelId='INBOX',
+                    pageToken=page,
+                ).execute()
+                for record in resp.get('history', []):
+                    for item in record.get('messagesAdded', []):
+                        msg = item['message']
+                        if 'UNREAD' in msg.get('labelIds', ['UNREAD']):
+                            added.append(msg['id'])
+                latest = resp.get('historyId', latest)
+                page = resp.get('nextPageToken')
+                if not page:
+                    break
+        except Exception as e:
+            if not is_expired(e, 404):
+                raise
+            logging.info("mail watcher: history cursor expired, starting over")
+            _reset_cursor(service)
+            return []
+        msg_ids = list(dict.fromkeys(added))
+        raw = gmail_reader._fetch_raw(service, msg_ids) if msg_ids else []
+    memory_db.set_state(CURSOR_KEY, latest)
+
+    new = []
+    for msg in raw:
+        # Skip anything read or archived before this tick ran.
+        labels = msg.get('labelIds')
+        if labels is not None and ('UNREAD' not in labels or 'INBOX' not in labels):
+            continue
+        email = gmail_reader._parse_message(msg)
+        memory_db.save_email(email)
+        new.append(email)
+    return new
@@ -1,5 +1,4 @@
 import json
-from dateparser import parse as parse_date
 
 from assistant_router import plan_actions
 from gmail_reader import search_emails
@@ -8,6 +7,7 @@ from imessage_reader import read_latest_imessage
 from onedrive_reader import list_recent_files
 from send_imessage import send_imessage
 from summarizer import summarize_text
+from date_utils import resolve_date
 from memory_db import init_db, save_message, get_recent_messages
 
 OUTPUT_FILE = '/tmp/insight_output.txt'
@@ -31,10 +31,9 @@ def main(prompt: str = "Summarize recent activity."):
             data["email"] = search_emails(action.get("query", ""))
         elif action.get("type") == "get_calendar":
             date_str = action.get("date", "today")
-            parsed = parse_date(date_str)
+            parsed = resolve_date(date_str)
             if parsed:
-                iso_date = parsed.strftime("%Y-%m-%d")
-                data["calendar"] = list_events_for_day(iso_date)
+                data["calendar"] = list_events_for_day(parsed.isoformat())
         elif action.get("type") == "read_imessage":
             data["imessage"] = read_latest_imessage()
         elif action.get("type") == "list_drive":
@@ -1,7 +1,12 @@
 import os
 import sqlite3
+from datetime import date, datetime, time
 from typing import List, Tuple, Dict
 
+from date_utils import PT
+from session_store import current_session_id
+from tracing import traced
+
 DB_PATH = os.path.join(os.path.dirname(__file__), "memory.db")
 
 
@@ -23,6 +28,7 @@ def init_db():
         )
         """
     )
+    _migrate_messages(c)
     c.execute(
         'CREATE TABLE IF NOT EXISTS emails ('
         'id INTEGER PRIMARY KEY AUTOINCREMENT,'
@@ -41,6 +47,7 @@ def init_db():
         'end TEXT'
         ')'
     )
+    _migrate_calendar_events(c)
     c.execute(
         'CREATE TABLE IF NOT EXISTS reminders ('
         'id INTEGER PRIMARY KEY AUTOINCREMENT,'
@@ -49,6 +56,12 @@ def init_db():
         'run_time TEXT'
         ')'
     )
+    c.execute(
+        'CREATE TABLE IF NOT EXISTS sync_state ('
+        'key TEXT PRIMARY KEY,'
+        'value TEXT'
+        ')'
+    )
     c.execute(
         'CREATE TABLE IF NOT EXISTS tasks ('
         'id INTEGER PRIMARY KEY AUTOINCREMENT,'
@@ -62,12 +75,56 @@ def init_db():
     conn.close()
 
 
-def save_message(user_input: str, ai_reply: str, limit: int = 100) -> None:
-    """Save a user/assistant message pair and prune old history."""
+def _migrate_messages(c: sqlite3.Cursor) -> None:
+    """Add the ``session`` column that ties each message to a chat session."""
+    existing = {row[1] for row in c.execute('PRAGMA table_info(messages)')}
+    if 'session' not in existing:
+        c.execute('ALTER TABLE messages ADD COLUMN session TEXT')
+    c.execute('CREATE INDEX IF NOT EXISTS messages_session ON messages(session, id)')
+
+
+# Columns added to calendar_events for the local calendar store
+CALENDAR_COLUMNS = {
+    'event_id': 'TEXT',
+    'calendar_id': 'TEXT',
+    'start_ts': 'REAL',
+    'end_ts': 'REAL',
+    'status': 'TEXT',
+    'details': 'TEXT',
+}
+
+
+def _migrate_calendar_events(c: sqlite3.Cursor) -> None:
+    """Add the calendar store columns and indexes to older databases."""
+    existing = {row[1] for row in c.execute('PRAGMA table_info(calendar_events)')}
+    for name, kind in CALENDAR_COLUMNS.items():
+        if name not in existing:
+            c.execute(f'ALTER TABLE calendar_events ADD COLUMN {name} {kind}')
+    # Events are unique per calendar: a shared event has the same id in each.
+    c.execute('DROP INDEX IF EXISTS calendar_events_event_id')
+    c.execute(
+        'CREATE UNIQUE INDEX IF NOT EXISTS calendar_events_key '
+        'ON calendar_events(calendar_id, event_id)'
+    )
+    c.execute(
+        'CREATE INDEX IF NOT EXISTS calendar_events_span '
+        'ON calendar_events(start_ts, end_ts)'
+    )
+
+
+@traced("db.save_message")
+def save_message(
+    user_input: str, ai_reply: str, limit: int = 100, session: str | None = None
+) -> None:
+    """Save a user/assistant message pair and prune old history.
+
+    The pair is tagged with ``session``, by default the session bound to
+    the current request.
+    """
     conn = _connect()
     conn.execute(
-        'INSERT INTO messages(user, assistant) VALUES (?, ?)',
-        (user_input, ai_reply),
+        'INSERT INTO messages(user, assistant, session) VALUES (?, ?, ?)',
+        (user_input, ai_reply, session or current_session_id()),
     )
     conn.commit()
     _prune(conn, limit)
@@ -87,6 +144,7 @@ def _prune(conn: sqlite3.Connection, limit: int) -> None:
     conn.commit()
 
 
+@traced("db.save_email")
 def save_email(email: Dict[str, str]) -> None:
     if not email:
         return
@@ -99,24 +157,73 @@ def save_email(email: Dict[str, str]) -> None:
     conn.close()
 
 
+def event_timestamp(value: str) -> float | None:
+    """Return epoch seconds for an ISO ``dateTime`` or all-day ``date``."""
+    if not value:
+        return None
+    try:
+        if 'T' not in value:
+            return datetime.combine(date.fromisoformat(value), time(), PT).timestamp()
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=PT)
+    return parsed.timestamp()
+
+
+@traced("db.save_events")
 def save_calendar_events(events: List[Dict[str, str]]) -> None:
+    """Insert or update events, keyed by calendar and event ``id``.
+
+    Events without an id are keyed by title and start time so saving the
+    same listing twice does not create duplicates.
+    """
     if not events:
         return
     conn = _connect()
-    for e in events:
-        conn.execute(
-            'INSERT INTO calendar_events(title, start, end) VALUES (?, ?, ?)',
-            (e.get('title', ''), e.get('start', ''), e.get('end', ''))
-        )
+    conn.executemany(
+        'INSERT INTO calendar_events'
+        '(event_id, calendar_id, title, start, end, start_ts, end_ts, status, details) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) '
+        'ON CONFLICT(calendar_id, event_id) DO UPDATE SET '
+        'title = excluded.title, start = excluded.start, end = excluded.end, '
+        'start_ts = excluded.start_ts, end_ts = excluded.end_ts, '
+        'status = excluded.status, details = excluded.details, ts = CURRENT_TIMESTAMP',
+        [
+            (
+                e.get('id') or f"{e.get('title', '')}@{e.get('start', '')}",
+                e.get('calendar_id', 'primary'),
+                e.get('title', ''),
+                e.get('start', ''),
+                e.get('end', ''),
+                event_timestamp(e.get('start', '')),
+                event_timestamp(e.get('end', '')),
+                e.get('status', 'confirmed'),
+                e.get('details', ''),
+            )
+            for e in events
+        ],
+    )
     conn.commit()
     conn.close()
 
 
-def get_recent_messages(limit: int = 10) -> List[Dict[str, str]]:
-    """Return the most recent message pairs in newest-first order."""
+@traced("db.recent_messages")
+def get_recent_messages(limit: int = 10, session: str | None = None) -> List[Dict[str, str]]:
+    """Return the most recent message pairs in newest-first order.
+
+    With ``session`` only that session's messages are returned.
+    """
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
-    c.execute('SELECT user, assistant FROM messages ORDER BY id DESC LIMIT ?', (limit,))
+    if session is None:
+        c.execute('SELECT user, assistant FROM messages ORDER BY id DESC LIMIT ?', (limit,))
+    else:
+        c.execute(
+            'SELECT user, assistant FROM messages WHERE session = ? ORDER BY id DESC LIMIT ?',
+            (session, limit),
+        )
     rows = c.fetchall()
     conn.close()
     return [{"user": row[0], "assistant": row[1]} for row in rows]
@@ -157,6 +264,29 @@ def list_tasks() -> List[Tuple[int, str, str, str]]:
     return rows
 
 
+def get_state(key: str, default: str | None = None) -> str | None:
+    """Return a stored sync cursor or setting."""
+    conn = _connect()
+    row = conn.execute('SELECT value FROM sync_state WHERE key = ?', (key,)).fetchone()
+    conn.close()
+    return row[0] if row else default
+
+
+def set_state(key: str, value: str | None) -> None:
+    """Store (or with ``None`` remove) a sync cursor or setting."""
+    conn = _connect()
+    if value is None:
+        conn.execute('DELETE FROM sync_state WHERE key = ?', (key,))
+    else:
+        conn.execute(
+            'INSERT INTO sync_state(key, value) VALUES (?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET value = excluded.value',
+            (key, str(value)),
+        )
+    conn.commit()
+    conn.close()
+
+
 def clear_memory() -> None:
     """Delete all chat messages from the local memory database."""
     conn = _connect()
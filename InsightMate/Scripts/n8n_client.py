@@ -1,7 +1,8 @@
 import os
-import requests
 import logging
 
+from http_pool import get_session, timeout
+
 BASE_URL = os.getenv("N8N_URL", "http://localhost:5678")
 API_KEY = os.getenv("N8N_API_KEY", "")
 
@@ -12,7 +13,9 @@ def _post(path: str, payload: dict | None = None):
     if API_KEY:
         headers["Authorization"] = f"Bearer {API_KEY}"
     try:
-        resp = requests.post(url, json=payload or {}, headers=headers, timeout=30)
+        resp = get_session("n8n").post(
+            url, json=payload or {}, headers=headers, timeout=timeout("n8n")
+        )
         resp.raise_for_status()
         data = resp.json()
         return data.get("data") or data
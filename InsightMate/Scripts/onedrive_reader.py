@@ -1,7 +1,17 @@
+import itertools
+import logging
 import os
+import threading
+import time
 from pathlib import Path
 from typing import List, Dict, Optional
 
+import doc_extract
+import doc_index
+import memory_db
+import text_cache
+from tracing import traced
+
 try:
     from docx import Document
 except Exception:
@@ -17,8 +27,25 @@ try:
 except Exception:
     textract = None
 
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except Exception:
+    Observer = None
+
 ONEDRIVE_DIR = os.path.join(os.path.expanduser('~'), 'OneDrive')
 DOC_EXTS = {'.txt', '.md', '.docx', '.pdf'}
+# Documents written to the index per transaction
+INDEX_BATCH = 100
+# Seconds between change scans triggered by searches
+INDEX_INTERVAL = float(os.getenv("ONEDRIVE_INDEX_INTERVAL", "60"))
+# Start the background watcher with the chat server
+WATCH = os.getenv("ONEDRIVE_WATCH", "0") not in {"0", "false", "no"}
+# Seconds between scans of the background watcher (a fallback when
+# watchdog reports changes as they happen)
+WATCH_INTERVAL = float(os.getenv("ONEDRIVE_WATCH_INTERVAL", "300"))
+
+INDEXED_KEY = "onedrive_indexed_at:{}"
 
 
 def _iter_files() -> List[Dict[str, str]]:
@@ -30,61 +57,202 @@ def _iter_files() -> List[Dict[str, str]]:
             ext = Path(name).suffix.lower()
             if ext in DOC_EXTS:
                 path = os.path.join(root, name)
+                stat = os.stat(path)
                 info = {
                     'name': name,
                     'path': path,
-                    'modified': os.path.getmtime(path)
+                    'size': stat.st_size,
+                    'modified': stat.st_mtime,
                 }
                 files.append(info)
     return files
 
 
-from functools import lru_cache
-
-
-@lru_cache(maxsize=1)
 def index_files() -> List[Dict[str, str]]:
-    """Return cached list of OneDrive documents with metadata."""
+    """Return OneDrive documents with metadata, newest first."""
     return sorted(_iter_files(), key=lambda f: f['modified'], reverse=True)
 
+def _extract(path: str) -> str:
+    """Extract plain text from ``path``; raises if the file cannot be parsed."""
+    ext = Path(path).suffix.lower()
+    if ext in {'.txt', '.md'}:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            return f.read()
+    if ext == '.docx' and Document:
+        doc = Document(path)
+        return '\n'.join(p.text for p in doc.paragraphs)
+    if ext == '.pdf' and PdfReader:
+        reader = PdfReader(path)
+        return '\n'.join(page.extract_text() or '' for page in reader.pages)
+    if textract:
+        return textract.process(path).decode('utf-8', errors='ignore')
+    return ''
 
 
+@traced("onedrive.extract")
 def extract_text(path: str) -> str:
-    """Best-effort plain text extraction."""
-    ext = Path(path).suffix.lower()
+    """Best-effort plain text extraction, served from ``text_cache`` when possible."""
     try:
-        if ext in {'.txt', '.md'}:
-            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                return f.read()
-        if ext == '.docx' and Document:
-            doc = Document(path)
-            return '\n'.join(p.text for p in doc.paragraphs)
-        if ext == '.pdf' and PdfReader:
-            reader = PdfReader(path)
-            return '\n'.join(page.extract_text() or '' for page in reader.pages)
-        if textract:
-            return textract.process(path).decode('utf-8', errors='ignore')
+        return text_cache.extract(path, _extract)
     except Exception:
-        pass
-    return ''
+        return ''
 
 
-def search(query: str, limit: int = 5) -> List[Dict[str, str]]:
-    """Search filenames and content for the query."""
-    results = []
-    q = query.lower()
-    for info in index_files():
-        if q in info['name'].lower():
-            results.append({**info, 'snippet': ''})
-        else:
-            text = extract_text(info['path']).lower()
-            if q in text:
-                snippet_start = max(text.find(q) - 40, 0)
-                snippet = text[snippet_start: snippet_start + 160]
-                results.append({**info, 'snippet': snippet})
-        if len(results) >= limit:
+_index_lock = threading.Lock()
+_watch_stop = threading.Event()
+_watch_wake = threading.Event()
+_watch_thread: threading.Thread | None = None
+_observer = None
+
+
+@traced("onedrive.refresh_index")
+def refresh_index() -> dict[str, int]:
+    """Bring the full-text index in line with the files on disk.
+
+    Files whose ``(size, mtime)`` differ from the stored entry are taken
+    from ``text_cache`` or re-extracted on the ``doc_extract`` process pool;
+    files that
+    disappeared are dropped; unchanged files are not opened. Files that fail
+    or time out are quarantined until they change. Returns counts of
+    ``added``, ``updated``, ``removed`` and ``quarantined`` documents.
+    """
+    known = doc_index.stats()
+    skipped = doc_index.quarantined()
+    files = _iter_files()
+    changed = {
+        f['path']: f for f in files
+        if known.get(f['path']) != (f['size'], f['modified'])
+        and skipped.get(f['path'], ())[:2] != (f['size'], f['modified'])
+    }
+    present = {f['path'] for f in files}
+    removed = [p for p in {**known, **skipped} if p not in present]
+    cached = {}
+    for path, info in changed.items():
+        text = text_cache.get(path, info['size'], info['modified'])
+        if text is not None:
+            cached[path] = text
+    extracted = doc_extract.extract_many([p for p in changed if p not in cached], _extract)
+    batch, failed = [], []
+    for path, text, error in itertools.chain(
+        ((p, t, None) for p, t in cached.items()), extracted
+    ):
+        info = changed[path]
+        if error is not None:
+            logging.warning("onedrive: quarantining %s: %s", path, error)
+            failed.append({'path': path, 'size': info['size'], 'mtime': info['modified'],
+                           'reason': error})
+            continue
+        if path not in cached:
+            text_cache.put(path, info['size'], info['modified'], text)
+        batch.append({
+            'path': path,
+            'name': info['name'],
+            'size': info['size'],
+            'mtime': info['modified'],
+            'text': text,
+        })
+        if len(batch) >= INDEX_BATCH:
+            doc_index.store(batch)
+            batch = []
+    doc_index.store(batch)
+    doc_index.remove(removed + [f['path'] for f in failed if f['path'] in known])
+    doc_index.quarantine(failed)
+    memory_db.set_state(INDEXED_KEY.format(ONEDRIVE_DIR), time.time())
+    failed_paths = {f['path'] for f in failed}
+    stored = [p for p in changed if p not in failed_paths]
+    added = sum(p not in known for p in stored)
+    counts = {
+        'added': added,
+        'updated': len(stored) - added,
+        'removed': sum(p in known for p in removed),
+        'quarantined': len(failed),
+    }
+    if changed or removed:
+        logging.info("onedrive: index refreshed %s", counts)
+    return counts
+
+
+def ensure_index() -> None:
+    """Rescan for changes if the last scan is older than ``INDEX_INTERVAL``.
+
+    Only the first scan against an empty index waits for another thread's
+    scan to finish; otherwise a slightly stale index is used.
+    """
+    indexed = memory_db.get_state(INDEXED_KEY.format(ONEDRIVE_DIR))
+    if indexed and time.time() - float(indexed) < INDEX_INTERVAL:
+        return
+    if not _index_lock.acquire(blocking=not indexed):
+        return
+    try:
+        refresh_index()
+    except Exception as e:
+        logging.error("onedrive: index refresh failed: %s", e)
+    finally:
+        _index_lock.release()
+
+
+def _watch_loop(interval: float) -> None:
+    while not _watch_stop.is_set():
+        _watch_wake.wait(interval)
+        if _watch_stop.is_set():
             break
-    return results
+        _watch_wake.clear()
+        with _index_lock:
+            try:
+                refresh_index()
+            except Exception as e:
+                logging.error("onedrive: index refresh failed: %s", e)
+
+
+def start_watcher(interval: float | None = None) -> None:
+    """Keep the index current in a background thread.
+
+    With ``watchdog`` installed, file system events trigger a rescan as soon
+    as files change; otherwise the folder is polled every ``interval``
+    seconds (``ONEDRIVE_WATCH_INTERVAL``).
+    """
+    global _watch_thread, _observer
+    if _watch_thread and _watch_thread.is_alive():
+        return
+    _watch_stop.clear()
+    _watch_wake.set()  # index once at startup
+    if Observer is not None and os.path.isdir(ONEDRIVE_DIR):
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if Path(str(event.src_path)).suffix.lower() in DOC_EXTS:
+                    _watch_wake.set()
+
+        _observer = Observer()
+        _observer.schedule(_Handler(), ONEDRIVE_DIR, recursive=True)
+        _observer.daemon = True
+        _observer.start()
+    _watch_thread = threading.Thread(
+        target=_watch_loop, args=(interval or WATCH_INTERVAL,), name="onedrive-watch", daemon=True
+    )
+    _watch_thread.start()
+
+
+def stop_watcher() -> None:
+    global _watch_thread, _observer
+    _watch_stop.set()
+    _watch_wake.set()
+    if _observer is not None:
+        _observer.stop()
+        _observer = None
+    if _watch_thread:
+        _watch_thread.join(timeout=5)
+        _watch_thread = None
+
+
+@traced("onedrive.search")
+def search(query: str, limit: int = 5) -> List[Dict[str, str]]:
+    """Search filenames and content for the query.
+
+    Answered from the full-text index: hits are BM25-ranked and carry a
+    snippet of the matching text.
+    """
+    ensure_index()
+    return doc_index.search(query, limit)
 
 
 def list_word_docs(limit: int = 20) -> List[str]:
@@ -92,6 +260,10 @@ def list_word_docs(limit: int = 20) -> List[str]:
 
 
 if __name__ == '__main__':
+    import sys
+    if '--reindex' in sys.argv:
+        print(refresh_index(), doc_extract.last_stats)
+        sys.exit()
     for item in search('test'):
         print(f"{item['name']} - {item['path']}")
 
@@ -1,6 +1,5 @@
 from datetime import datetime
 from apscheduler.schedulers.background import BackgroundScheduler
-from dateparser import parse
 from typing import List, Tuple
 import os
 import requests
@@ -11,7 +10,8 @@ from memory_db import (
     save_task,
     list_tasks as db_list_tasks,
 )
-from gmail_reader import fetch_unread_email
+from date_utils import parse_when
+from mail_watcher import check_new_mail
 from calendar_reader import list_today_events
 
 try:
@@ -34,7 +34,7 @@ def _notify(message: str):
         print(f"Reminder: {message}")
 
 def schedule(text: str) -> str:
-    when = parse(text, settings={'PREFER_DATES_FROM': 'future'})
+    when = parse_when(text, prefer_future=True)
     if not when:
         return 'Could not parse time.'
     scheduler.add_job(_notify, 'date', run_date=when, args=[text])
@@ -82,11 +82,14 @@ def _weather_job():
 
 
 def _email_job():
-    email = fetch_unread_email()
-    if email:
-        msg = f"Email from {email['from']}: {email['subject']}"
+    emails = check_new_mail()
+    if not emails:
+        return
+    if len(emails) == 1:
+        msg = f"Email from {emails[0]['from']}: {emails[0]['subject']}"
     else:
-        msg = 'No unread email.'
+        lines = [f"{e['from']}: {e['subject']}" for e in emails]
+        msg = f"{len(emails)} new emails:\n" + '\n'.join(lines)
     _notify(msg)
 
 
@@ -101,7 +104,7 @@ def _calendar_job():
 
 
 def schedule_air_quality(text: str) -> str:
-    when = parse(text, settings={'PREFER_DATES_FROM': 'future'})
+    when = parse_when(text, prefer_future=True)
     if not when:
         return 'Could not parse time.'
     scheduler.add_job(_air_quality_job, 'date', run_date=when)
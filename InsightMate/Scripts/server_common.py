@@ -1,6 +1,6 @@
 import os
 import json
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, Response, jsonify, request, current_app, stream_with_context
 
 MODEL_FILE = os.path.join(os.getcwd(), "model_config.json")
 
@@ -20,10 +20,17 @@ def _save_model(name: str) -> None:
     except Exception:
         pass
 
-from assistant_router import route
+from assistant_router import route, route_stream
 from user_settings import set_selected_model
+from session_store import use_session
 from reminder_scheduler import list_reminders, list_tasks
 from memory_db import get_recent_messages, clear_memory
+from conversation import reset as reset_conversation
+import llm_cache
+import text_cache
+import tracing
+from http_pool import pool_stats
+from google_auth import service_stats
 
 WEB_DIR = os.path.join(os.path.dirname(__file__), '..', 'web')
 
@@ -34,22 +41,85 @@ def index():
     """Serve the web interface."""
     return current_app.send_static_file('index.html')
 
+def _sse(payload: dict, event: str | None = None) -> str:
+    """Format ``payload`` as a server-sent event."""
+    head = f"event: {event}\n" if event else ''
+    return f"{head}data: {json.dumps(payload)}\n\n"
+
+
+def _session_id(data: dict | None = None) -> str | None:
+    """Return the client's session id from the body, header or query string."""
+    return (
+        (data or {}).get('session_id')
+        or request.headers.get('X-Session-Id')
+        or request.args.get('session_id')
+    )
+
+
+def _wants_stream(data: dict) -> bool:
+    if data.get('stream'):
+        return True
+    return 'text/event-stream' in request.headers.get('Accept', '')
+
+
 @common_bp.route('/chat', methods=['POST'])
 def chat_route():
-    """Process a chat message and return the assistant's reply as JSON."""
+    """Process a chat message and return the assistant's reply.
+
+    The reply is returned as JSON by default. When the request body sets
+    ``"stream": true`` (or the client accepts ``text/event-stream``) the
+    reply is sent as server-sent events: one ``{"token": ...}`` event per
+    fragment followed by a ``done`` event. Both forms carry a ``trace_id``
+    that can be looked up at ``/trace/<id>``.
+    """
     try:
         data = request.get_json() or {}
         message = data.get('message') or data.get('query') or ''
-        model = data.get('model')
-        if model:
-            set_selected_model(model)
-        reply = route(message)
-        return jsonify({'reply': reply})
+        session_id = _session_id(data)
+        if _wants_stream(data):
+            return _stream_reply(message, session_id, data.get('model'))
+        with use_session(session_id), tracing.start_trace() as trace:
+            model = data.get('model')
+            if model:
+                set_selected_model(model)
+            reply = route(message)
+        return jsonify({'reply': reply, 'trace_id': trace['id']})
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+
+def _stream_reply(message: str, session_id: str | None, model: str | None) -> Response:
+    # The generator runs after this view returns, so it binds the session
+    # itself rather than relying on the caller's context.
+    trace_id = tracing.new_trace_id()
+
+    def generate():
+        try:
+            with use_session(session_id), tracing.start_trace(trace_id):
+                if model:
+                    set_selected_model(model)
+                for token in route_stream(message):
+                    yield _sse({'token': token})
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            yield _sse({'error': str(e), 'trace_id': trace_id}, event='error')
+            return
+        yield _sse({'trace_id': trace_id}, event='done')
+
+    headers = {
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+        'X-Trace-Id': trace_id,
+    }
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers=headers,
+    )
+
 @common_bp.route('/model', methods=['GET', 'POST'])
 def model_route():
     """Get or update the currently selected LLM model."""
@@ -58,7 +128,8 @@ def model_route():
         name = data.get('model')
         if name:
             _save_model(name)
-            set_selected_model(name)
+            with use_session(_session_id(data)):
+                set_selected_model(name)
         return jsonify(ok=True)
     return jsonify({'model': _load_model()})
 
@@ -86,8 +157,36 @@ def memory_route():
 @common_bp.route('/memory/reset', methods=['POST'])
 def memory_reset_route():
     clear_memory()
+    reset_conversation()
     return jsonify({'status': 'ok'})
 
+@common_bp.route('/metrics', methods=['GET'])
+def metrics_route():
+    """Expose stage timings and counters in Prometheus text format."""
+    for name, values in pool_stats().items():
+        for key, value in values.items():
+            tracing.gauge(f'http_pool_{key}', value, backend=name)
+    for key, value in llm_cache.stats().items():
+        tracing.gauge(f'llm_cache_{key}', value)
+    for key, value in text_cache.stats().items():
+        tracing.gauge(f'text_cache_{key}', value)
+    for key, value in service_stats().items():
+        tracing.gauge(f'google_{key}', value)
+    return Response(
+        tracing.render_prometheus(),
+        mimetype='text/plain; version=0.0.4',
+    )
+
+
+@common_bp.route('/trace/<trace_id>', methods=['GET'])
+def trace_route(trace_id):
+    """Return the spans recorded for a recent ``/chat`` request."""
+    trace = tracing.get_trace(trace_id)
+    if trace is None:
+        return jsonify({'error': 'unknown trace'}), 404
+    return jsonify(trace)
+
+
 def register_common(app):
     """Register common routes and static file handling on the given app."""
     app.register_blueprint(common_bp)
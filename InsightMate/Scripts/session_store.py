@@ -0,0 +1,88 @@
+"""Per-client conversation state for concurrent chat requests.
+
+Each browser tab or device sends its own session id with ``/chat``. The
+state that used to live in module globals (the last tool output used for
+follow-ups and the selected model) is kept in a small dict per session
+instead. The active session for the current
+request is tracked with a context variable, so code deep inside the router
+can call :func:`get_session` without threading the id through every call.
+
+At most ``MAX_SESSIONS`` sessions are kept; the least recently used one is
+dropped beyond that, and sessions idle for ``SESSION_IDLE_TIMEOUT`` seconds
+are evicted.
+"""
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "100"))
+SESSION_IDLE_TIMEOUT = float(os.getenv("SESSION_IDLE_TIMEOUT", "3600"))
+DEFAULT_SESSION = "default"
+
+_lock = threading.Lock()
+_sessions: "OrderedDict[str, dict]" = OrderedDict()
+_current: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "session_id", default=DEFAULT_SESSION
+)
+
+
+def _new_session() -> dict:
+    return {
+        "last_tool_output": {},
+        "selected_model": None,
+        "last_seen": time.monotonic(),
+    }
+
+
+def _evict(now: float) -> None:
+    """Drop idle sessions and trim the store to ``MAX_SESSIONS``."""
+    while _sessions:
+        sid, session = next(iter(_sessions.items()))
+        if now - session["last_seen"] <= SESSION_IDLE_TIMEOUT and len(_sessions) <= MAX_SESSIONS:
+            break
+        _sessions.pop(sid)
+
+
+def current_session_id() -> str:
+    """Return the id of the session bound to the current context."""
+    return _current.get()
+
+
+def get_session(session_id: str | None = None) -> dict:
+    """Return the state dict for ``session_id`` or the current session."""
+    sid = session_id or _current.get()
+    now = time.monotonic()
+    with _lock:
+        session = _sessions.get(sid)
+        if session is None:
+            session = _new_session()
+            _sessions[sid] = session
+        else:
+            _sessions.move_to_end(sid)
+        session["last_seen"] = now
+        _evict(now)
+    return session
+
+
+@contextmanager
+def use_session(session_id: str | None):
+    """Bind ``session_id`` to the current context for the ``with`` block."""
+    token = _current.set(session_id or DEFAULT_SESSION)
+    try:
+        yield get_session()
+    finally:
+        _current.reset(token)
+
+
+def drop_session(session_id: str) -> None:
+    """Forget all state kept for ``session_id``."""
+    with _lock:
+        _sessions.pop(session_id, None)
+
+
+def session_count() -> int:
+    with _lock:
+        return len(_sessions)
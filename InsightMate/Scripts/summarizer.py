@@ -18,3 +18,17 @@ def summarize_text(obj):
         text = str(obj)
     prompt = "Summarize this:\n" + text
     return gpt(prompt, model=get_selected_model())
+
+
+def summarize_document(path, max_chars=8000):
+    """Summarize the document at ``path``.
+
+    The text comes from ``onedrive_reader.extract_text``, which shares the
+    extracted-text cache with document search.
+    """
+    from onedrive_reader import extract_text
+
+    text = extract_text(path)
+    if not text.strip():
+        return "\u26a0\ufe0f Could not read that document."
+    return summarize_text(text[:max_chars])
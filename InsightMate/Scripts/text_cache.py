@@ -0,0 +1,206 @@
+"""Compressed on-disk cache of text extracted from documents.
+
+Extracted text is stored zlib-compressed in ``text_cache.db`` next to
+``memory.db``, keyed by the SHA-256 of the file's contents, so identical
+files share one entry. A second table maps ``(path, size, mtime)`` to that
+hash: an unchanged file is answered without reading it at all, and a file
+that was only touched or copied costs one hash instead of a parse.
+
+Once the compressed text exceeds ``TEXT_CACHE_MAX_MB`` the least recently
+used entries are evicted. Set ``TEXT_CACHE=0`` to disable the cache.
+
+:func:`extract` is the entry point for document tools -- the OneDrive
+indexer, ``onedrive_reader.extract_text`` and the summarizer all go
+through it, so a document parsed for one of them is free for the others.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Callable
+
+from memory_db import DB_PATH as MEMORY_DB_PATH
+
+DB_PATH = os.path.join(os.path.dirname(MEMORY_DB_PATH), "text_cache.db")
+ENABLED = os.getenv("TEXT_CACHE", "1") not in {"0", "false", "no"}
+MAX_BYTES = int(float(os.getenv("TEXT_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+_lock = threading.Lock()
+_counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+_initialized: set[str] = set()
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(DB_PATH, timeout=5)
+    if DB_PATH not in _initialized:
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS text_blobs ('
+            'hash TEXT PRIMARY KEY,'
+            'data BLOB NOT NULL,'
+            'bytes INTEGER NOT NULL,'
+            'last_used REAL NOT NULL'
+            ')'
+        )
+        conn.execute(
+            'CREATE INDEX IF NOT EXISTS text_blobs_last_used ON text_blobs(last_used)'
+        )
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS text_files ('
+            'path TEXT PRIMARY KEY,'
+            'size INTEGER NOT NULL,'
+            'mtime REAL NOT NULL,'
+            'hash TEXT NOT NULL'
+            ')'
+        )
+        conn.commit()
+        _initialized.add(DB_PATH)
+    return conn
+
+
+def _bump(name: str, amount: int = 1) -> None:
+    with _lock:
+        _counters[name] += amount
+
+
+def file_hash(path: str) -> str:
+    """Return the SHA-256 hex digest of the file at ``path``."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _load(conn: sqlite3.Connection, digest: str) -> str | None:
+    row = conn.execute('SELECT data FROM text_blobs WHERE hash = ?', (digest,)).fetchone()
+    if not row:
+        return None
+    conn.execute('UPDATE text_blobs SET last_used = ? WHERE hash = ?', (time.time(), digest))
+    return zlib.decompress(row[0]).decode('utf-8')
+
+
+def _get(path: str, size: int, mtime: float, by_content: bool) -> tuple[str | None, str | None]:
+    """Return ``(text, content hash)``; the hash is set whenever it was computed."""
+    text = digest = None
+    try:
+        conn = _connect()
+        row = conn.execute(
+            'SELECT hash FROM text_files WHERE path = ? AND size = ? AND mtime = ?',
+            (path, size, mtime),
+        ).fetchone()
+        if row:
+            text = _load(conn, row[0])
+        elif by_content:
+            digest = file_hash(path)
+            text = _load(conn, digest)
+            if text is not None:
+                conn.execute(
+                    'INSERT OR REPLACE INTO text_files(path, size, mtime, hash) VALUES (?, ?, ?, ?)',
+                    (path, size, mtime, digest),
+                )
+        conn.commit()
+        conn.close()
+    except (sqlite3.Error, OSError, zlib.error):
+        text = None
+    _bump("hits" if text is not None else "misses")
+    return text, digest
+
+
+def get(path: str, size: int, mtime: float, by_content: bool = True) -> str | None:
+    """Return cached text for ``path`` at ``(size, mtime)``, or ``None``.
+
+    With ``by_content`` a stat mismatch falls back to hashing the file and
+    looking the contents up, which catches touched, copied and renamed
+    files.
+    """
+    if not ENABLED:
+        return None
+    return _get(path, size, mtime, by_content)[0]
+
+
+def put(path: str, size: int, mtime: float, text: str, digest: str | None = None) -> None:
+    """Store ``text`` extracted from ``path`` and evict past ``MAX_BYTES``."""
+    if not ENABLED:
+        return
+    try:
+        digest = digest or file_hash(path)
+        data = zlib.compress(text.encode('utf-8'), 6)
+        now = time.time()
+        conn = _connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO text_blobs(hash, data, bytes, last_used) VALUES (?, ?, ?, ?)',
+            (digest, data, len(data), now),
+        )
+        conn.execute(
+            'INSERT OR REPLACE INTO text_files(path, size, mtime, hash) VALUES (?, ?, ?, ?)',
+            (path, size, mtime, digest),
+        )
+        evicted = _evict(conn)
+        conn.commit()
+        conn.close()
+    except (sqlite3.Error, OSError):
+        return
+    _bump("stores")
+    if evicted:
+        _bump("evictions", evicted)
+
+
+def _evict(conn: sqlite3.Connection) -> int:
+    total = conn.execute('SELECT COALESCE(SUM(bytes), 0) FROM text_blobs').fetchone()[0]
+    if total <= MAX_BYTES:
+        return 0
+    evicted = 0
+    for digest, size in conn.execute(
+        'SELECT hash, bytes FROM text_blobs ORDER BY last_used ASC, rowid ASC'
+    ).fetchall():
+        if total <= MAX_BYTES:
+            break
+        conn.execute('DELETE FROM text_blobs WHERE hash = ?', (digest,))
+        conn.execute('DELETE FROM text_files WHERE hash = ?', (digest,))
+        total -= size
+        evicted += 1
+    return evicted
+
+
+def extract(path: str, extractor: Callable[[str], str]) -> str:
+    """Return the text of ``path``, calling ``extractor`` only on a cache miss.
+
+    Exceptions from ``extractor`` propagate and nothing is cached.
+    """
+    if not ENABLED:
+        return extractor(path)
+    stat = os.stat(path)
+    text, digest = _get(path, stat.st_size, stat.st_mtime, by_content=True)
+    if text is None:
+        text = extractor(path)
+        put(path, stat.st_size, stat.st_mtime, text, digest)
+    return text
+
+
+def stats() -> dict[str, int]:
+    """Return hit/miss counters, stored entries and compressed bytes."""
+    with _lock:
+        data = dict(_counters)
+    try:
+        conn = _connect()
+        data["entries"], data["bytes"] = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM text_blobs'
+        ).fetchone()
+        conn.close()
+    except sqlite3.Error:
+        data["entries"] = data["bytes"] = 0
+    return data
+
+
+def clear() -> None:
+    """Remove every cached text and reset the counters."""
+    conn = _connect()
+    conn.execute('DELETE FROM text_blobs')
+    conn.execute('DELETE FROM text_files')
+    conn.commit()
+    conn.close()
+    with _lock:
+        for name in _counters:
+            _counters[name] = 0
@@ -0,0 +1,182 @@
+"""Lightweight span timing, counters and Prometheus text export.
+
+Wrap a stage in ``with span("llm.chat"):`` or decorate a function with
+``@traced("gmail.search")`` to record how long it took and whether it
+raised. Durations go into a per-span histogram; ``count`` adds to labelled
+counters such as LLM prompt sizes. ``render_prometheus`` formats everything
+for the ``/metrics`` endpoint.
+
+A request can also open a trace with ``start_trace``: every span finished
+while it is active (including in tool threads that copy the context) is
+attached to it, and recent traces can be looked up by id.
+"""
+import contextvars
+import functools
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+PREFIX = "insightmate"
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+MAX_TRACES = 100
+
+_lock = threading.Lock()
+_histograms: dict[str, dict] = {}
+_errors: dict[str, int] = {}
+_counters: dict[tuple[str, tuple], float] = {}
+_gauges: dict[tuple[str, tuple], float] = {}
+_traces: "OrderedDict[str, dict]" = OrderedDict()
+_trace: contextvars.ContextVar[dict | None] = contextvars.ContextVar("trace", default=None)
+
+
+def observe(name: str, seconds: float, error: bool = False) -> None:
+    """Record one duration sample for span ``name``."""
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = {"count": 0, "sum": 0.0, "buckets": [0] * len(BUCKETS)}
+            _histograms[name] = hist
+        hist["count"] += 1
+        hist["sum"] += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist["buckets"][i] += 1
+        if error:
+            _errors[name] = _errors.get(name, 0) + 1
+    trace = _trace.get()
+    if trace is not None:
+        with _lock:
+            trace["spans"].append(
+                {"name": name, "ms": round(seconds * 1000, 2), "error": error}
+            )
+
+
+@contextmanager
+def span(name: str):
+    """Time the ``with`` block as span ``name``; exceptions count as errors."""
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        observe(name, time.perf_counter() - start, error)
+
+
+def traced(name: str):
+    """Decorator form of :func:`span`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name: str, value: float = 1, **labels) -> None:
+    """Add ``value`` to counter ``name`` with the given labels."""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def counter_values(name: str) -> dict[tuple, float]:
+    """Return every label set recorded for counter ``name``."""
+    with _lock:
+        return {labels: v for (n, labels), v in _counters.items() if n == name}
+
+
+def gauge(name: str, value: float, **labels) -> None:
+    """Set gauge ``name`` to ``value``."""
+    with _lock:
+        _gauges[(name, tuple(sorted(labels.items())))] = value
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+@contextmanager
+def start_trace(trace_id: str | None = None):
+    """Collect every span finished inside the block under one trace id."""
+    trace = {"id": trace_id or new_trace_id(), "spans": [], "started": time.time()}
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
+        with _lock:
+            _traces[trace["id"]] = trace
+            while len(_traces) > MAX_TRACES:
+                _traces.popitem(last=False)
+
+
+def current_trace_id() -> str | None:
+    trace = _trace.get()
+    return trace["id"] if trace else None
+
+
+def get_trace(trace_id: str) -> dict | None:
+    """Return a recently finished trace by id."""
+    with _lock:
+        trace = _traces.get(trace_id)
+        return {**trace, "spans": list(trace["spans"])} if trace else None
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    body = ",".join(
+        f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def render_prometheus() -> str:
+    """Return all metrics in the Prometheus text exposition format."""
+    with _lock:
+        histograms = {k: {**v, "buckets": list(v["buckets"])} for k, v in _histograms.items()}
+        errors = dict(_errors)
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+    lines = []
+    metric = f"{PREFIX}_span_duration_seconds"
+    lines.append(f"# HELP {metric} Time spent in each instrumented stage.")
+    lines.append(f"# TYPE {metric} histogram")
+    for name in sorted(histograms):
+        hist = histograms[name]
+        for bound, value in zip(BUCKETS, hist["buckets"]):
+            lines.append(f'{metric}_bucket{{span="{name}",le="{bound}"}} {value}')
+        lines.append(f'{metric}_bucket{{span="{name}",le="+Inf"}} {hist["count"]}')
+        lines.append(f'{metric}_sum{{span="{name}"}} {hist["sum"]:.6f}')
+        lines.append(f'{metric}_count{{span="{name}"}} {hist["count"]}')
+    metric = f"{PREFIX}_span_errors_total"
+    lines.append(f"# HELP {metric} Instrumented stages that raised.")
+    lines.append(f"# TYPE {metric} counter")
+    for name in sorted(histograms):
+        lines.append(f'{metric}{{span="{name}"}} {errors.get(name, 0)}')
+    for kind, values in (("counter", counters), ("gauge", gauges)):
+        seen = set()
+        for (name, labels), value in sorted(values.items()):
+            full = f"{PREFIX}_{name}"
+            if full not in seen:
+                lines.append(f"# TYPE {full} {kind}")
+                seen.add(full)
+            lines.append(f"{full}{_labels(labels)} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    """Clear all recorded metrics and traces."""
+    with _lock:
+        _histograms.clear()
+        _errors.clear()
+        _counters.clear()
+        _gauges.clear()
+        _traces.clear()
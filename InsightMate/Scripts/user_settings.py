@@ -1,17 +1,16 @@
-_selected_model = None
-
 from config import load_config, get_llm
+from session_store import get_session
 
 def set_selected_model(model: str) -> None:
-    """Store the currently selected LLM model."""
-    global _selected_model
+    """Store the LLM model selected by the current session."""
     if model:
-        _selected_model = model
+        get_session()["selected_model"] = model
 
 
 def get_selected_model() -> str:
-    """Return the selected LLM model, falling back to config."""
-    if _selected_model:
-        return _selected_model
+    """Return the session's selected LLM model, falling back to config."""
+    selected = get_session()["selected_model"]
+    if selected:
+        return selected
     cfg = load_config()
     return get_llm(cfg)
@@ -0,0 +1,382 @@
+"""Semantic search over OneDrive documents with a NumPy vector index.
+
+Indexed document text (from ``doc_index``) is split into overlapping
+chunks of about ``VECTOR_CHUNK_CHARS`` characters, embedded with Ollama's
+``/api/embed`` endpoint (``EMBED_MODEL``) and stored as unit-length
+float32 rows in ``doc_vectors.f32`` next to ``memory.db``. The file is
+opened as a memory-mapped matrix, so only the pages a query touches are
+read. Chunk text and the row each chunk occupies live in the
+``vector_chunks`` table; ``vector_docs`` records the ``(size, mtime)`` each
+document was embedded at, so only new or changed documents are re-embedded.
+
+Cosine similarity is a matrix product against the normalized rows, done in
+blocks of ``SCORE_BLOCK`` rows and for several queries at once
+(:func:`search_many`). Rows of deleted chunks stay in the file and are
+masked out; once they outnumber the live rows by more than a thousand the
+file is compacted.
+
+Embedding runs in a background thread started by :func:`ensure_fresh`, so a
+query never waits for the corpus to be embedded: it searches whatever is
+already indexed, and before the first batch lands callers fall back to
+keyword search.
+
+NumPy is optional: without it (or with ``VECTOR_SEARCH=0``) :func:`search`
+returns ``None`` and callers fall back to keyword search.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import doc_index
+import memory_db
+from http_pool import get_session, timeout
+from tracing import traced
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+EMBED_MODEL = os.getenv("EMBED_MODEL", "nomic-embed-text")
+ENABLED = np is not None and os.getenv("VECTOR_SEARCH", "1") not in {"0", "false", "no"}
+CHUNK_CHARS = int(os.getenv("VECTOR_CHUNK_CHARS", "1200"))
+CHUNK_OVERLAP = int(os.getenv("VECTOR_CHUNK_OVERLAP", "200"))
+# Texts sent to /api/embed per request
+EMBED_BATCH = int(os.getenv("VECTOR_EMBED_BATCH", "32"))
+# Seconds between checks for documents that need embedding
+SYNC_INTERVAL = float(os.getenv("VECTOR_SYNC_INTERVAL", "60"))
+# Matrix rows scored per block, bounding the memory a query needs
+SCORE_BLOCK = 65536
+
+MODEL_KEY = "vector_model"
+DIM_KEY = "vector_dim"
+SYNCED_KEY = "vector_synced_at"
+
+# Serializes writers (refresh, compact)
+_lock = threading.Lock()
+# Held by readers and while the matrix file is replaced or its rows renumbered
+_file_lock = threading.Lock()
+_initialized: set[str] = set()
+_refresh_thread: threading.Thread | None = None
+# Guards starting the refresh thread so concurrent queries start only one
+_refresh_start_lock = threading.Lock()
+# Bumped on every write; the cached live-row mask compares it.
+_version = 0
+_masks: dict[str, tuple[int, "np.ndarray"]] = {}
+
+
+def _connect() -> sqlite3.Connection:
+    conn = memory_db._connect()
+    if memory_db.DB_PATH not in _initialized:
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS vector_chunks ('
+            'row INTEGER PRIMARY KEY,'
+            'path TEXT,'
+            'seq INTEGER,'
+            'text TEXT'
+            ')'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS vector_chunks_path ON vector_chunks(path)')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS vector_docs ('
+            'path TEXT PRIMARY KEY,'
+            'size INTEGER,'
+            'mtime REAL'
+            ')'
+        )
+        conn.commit()
+        _initialized.add(memory_db.DB_PATH)
+    return conn
+
+
+def vectors_path() -> str:
+    return os.path.join(os.path.dirname(memory_db.DB_PATH), "doc_vectors.f32")
+
+
+def chunk_text(text: str, size: int | None = None, overlap: int | None = None) -> list[str]:
+    """Split ``text`` into chunks of about ``size`` characters.
+
+    Consecutive chunks share roughly ``overlap`` characters and break at
+    whitespace where possible, so a sentence cut at one edge appears whole
+    in the neighbouring chunk.
+    """
+    size = size or CHUNK_CHARS
+    overlap = CHUNK_OVERLAP if overlap is None else overlap
+    text = ' '.join(text.split())
+    chunks: list[str] = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            cut = text.rfind(' ', start + size // 2, end)
+            if cut > start:
+                end = cut
+        chunks.append(text[start:end])
+        if end >= len(text):
+            break
+        next_start = max(end - overlap, start + 1)
+        space = text.find(' ', next_start, end)
+        start = space + 1 if space != -1 else next_start
+    return chunks
+
+
+def _post_embed(texts: list[str]) -> list[list[float]]:
+    resp = get_session("ollama").post(
+        f"{OLLAMA_URL}/api/embed",
+        json={"model": EMBED_MODEL, "input": texts},
+        timeout=timeout("ollama"),
+    )
+    resp.raise_for_status()
+    return resp.json()["embeddings"]
+
+
+@traced("vector.embed")
+def embed(texts: list[str]) -> "np.ndarray":
+    """Return unit-length float32 embeddings of ``texts``, one row each."""
+    rows: list[list[float]] = []
+    for i in range(0, len(texts), EMBED_BATCH):
+        rows.extend(_post_embed(texts[i:i + EMBED_BATCH]))
+    vectors = np.asarray(rows, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _dim() -> int | None:
+    value = memory_db.get_state(DIM_KEY)
+    return int(value) if value else None
+
+
+def _rows_on_disk(dim: int | None) -> int:
+    path = vectors_path()
+    if not dim or not os.path.exists(path):
+        return 0
+    return os.path.getsize(path) // (dim * 4)
+
+
+def _reset(conn: sqlite3.Connection) -> None:
+    """Forget every vector, e.g. after the embedding model changed."""
+    global _version
+    _version += 1
+    with _file_lock:
+        conn.execute('DELETE FROM vector_chunks')
+        conn.execute('DELETE FROM vector_docs')
+        conn.commit()
+        if os.path.exists(vectors_path()):
+            os.remove(vectors_path())
+        memory_db.set_state(DIM_KEY, '')
+    memory_db.set_state(MODEL_KEY, EMBED_MODEL)
+
+
+def _append(conn: sqlite3.Connection, docs: list[tuple[str, int, float, list[str]]]) -> int:
+    """Embed the chunks of ``docs`` and append them to the matrix."""
+    global _version
+    texts = [chunk for _, _, _, chunks in docs for chunk in chunks]
+    vectors = embed(texts) if texts else None
+    if vectors is not None:
+        dim = _dim()
+        if dim is None:
+            dim = vectors.shape[1]
+            memory_db.set_state(DIM_KEY, dim)
+        if vectors.shape[1] != dim:
+            raise ValueError(f"embedding size changed from {dim} to {vectors.shape[1]}")
+        first = _rows_on_disk(dim)
+        with open(vectors_path(), 'ab') as f:
+            f.write(vectors.tobytes())
+        rows = []
+        for path, _, _, chunks in docs:
+            for seq, chunk in enumerate(chunks):
+                rows.append((first + len(rows), path, seq, chunk))
+        conn.executemany(
+            'INSERT INTO vector_chunks(row, path, seq, text) VALUES (?, ?, ?, ?)', rows
+        )
+    conn.executemany(
+        'INSERT OR REPLACE INTO vector_docs(path, size, mtime) VALUES (?, ?, ?)',
+        [(path, size, mtime) for path, size, mtime, _ in docs],
+    )
+    conn.commit()
+    _version += 1
+    return len(texts)
+
+
+def _drop(conn: sqlite3.Connection, paths: list[str]) -> None:
+    global _version
+    if not paths:
+        return
+    conn.executemany('DELETE FROM vector_chunks WHERE path = ?', [(p,) for p in paths])
+    conn.executemany('DELETE FROM vector_docs WHERE path = ?', [(p,) for p in paths])
+    conn.commit()
+    _version += 1
+
+
+@traced("vector.compact")
+def compact() -> int:
+    """Rewrite the matrix without rows of deleted chunks; return rows kept."""
+    global _version
+    with _lock:
+        dim = _dim()
+        total = _rows_on_disk(dim)
+        if not total:
+            return 0
+        conn = _connect()
+        live = [r for (r,) in conn.execute('SELECT row FROM vector_chunks ORDER BY row')]
+        matrix = np.memmap(vectors_path(), dtype=np.float32, mode='r', shape=(total, dim))
+        tmp = vectors_path() + '.tmp'
+        with open(tmp, 'wb') as f:
+            for i in range(0, len(live), SCORE_BLOCK):
+                f.write(np.asarray(matrix[live[i:i + SCORE_BLOCK]]).tobytes())
+        del matrix
+        with _file_lock:
+            os.replace(tmp, vectors_path())
+            # Renumber in row order; new numbers never exceed the old ones.
+            conn.executemany(
+                'UPDATE vector_chunks SET row = ? WHERE row = ?',
+                [(new, old) for new, old in enumerate(live)],
+            )
+            conn.commit()
+            _version += 1
+        conn.close()
+        return len(live)
+
+
+@traced("vector.refresh")
+def refresh() -> int:
+    """Embed documents added or changed in ``doc_index``; return chunks added."""
+    with _lock:
+        conn = _connect()
+        if memory_db.get_state(MODEL_KEY) != EMBED_MODEL:
+            _reset(conn)
+        known = doc_index.stats()
+        embedded = {
+            path: (size, mtime)
+            for path, size, mtime in conn.execute('SELECT path, size, mtime FROM vector_docs')
+        }
+        changed = [p for p, stat in known.items() if embedded.get(p) != tuple(stat)]
+        _drop(conn, changed + [p for p in embedded if p not in known])
+        added = 0
+        pending: list[tuple[str, int, float, list[str]]] = []
+        for i in range(0, len(changed), EMBED_BATCH):
+            for path, (_name, text) in doc_index.texts(changed[i:i + EMBED_BATCH]).items():
+                size, mtime = known[path]
+                pending.append((path, size, mtime, chunk_text(text)))
+                if sum(len(c) for _, _, _, c in pending) >= EMBED_BATCH:
+                    added += _append(conn, pending)
+                    pending = []
+        added += _append(conn, pending)
+        (live,) = conn.execute('SELECT COUNT(*) FROM vector_chunks').fetchone()
+        conn.close()
+        memory_db.set_state(SYNCED_KEY, time.time())
+    if _rows_on_disk(_dim()) > 2 * live + 1000:
+        compact()
+    if added:
+        logging.info("vector index: embedded %d chunks", added)
+    return added
+
+
+def _refresh_in_background() -> None:
+    import onedrive_reader
+
+    try:
+        onedrive_reader.ensure_index()
+        refresh()
+    except Exception as e:
+        logging.error("vector index: refresh failed: %s", e)
+
+
+def _start_refresh() -> None:
+    """Bring the OneDrive index and the vectors up to date in the background."""
+    global _refresh_thread
+    with _refresh_start_lock:
+        if _refresh_thread and _refresh_thread.is_alive():
+            return
+        _refresh_thread = threading.Thread(
+            target=_refresh_in_background, name="vector-index", daemon=True
+        )
+        _refresh_thread.start()
+
+
+def ensure_fresh() -> bool:
+    """Start a background refresh if the last one is older than ``SYNC_INTERVAL``.
+
+    Returns True when the index holds vectors to answer queries with.
+    """
+    synced = float(memory_db.get_state(SYNCED_KEY, '0') or 0)
+    if time.time() - synced >= SYNC_INTERVAL:
+        _start_refresh()
+    return _rows_on_disk(_dim()) > 0
+
+
+def _live_mask(conn: sqlite3.Connection, rows: int) -> "np.ndarray":
+    key = vectors_path()
+    cached = _masks.get(key)
+    if cached and cached[0] == _version and len(cached[1]) == rows:
+        return cached[1]
+    mask = np.zeros(rows, dtype=bool)
+    live = [r for (r,) in conn.execute('SELECT row FROM vector_chunks')]
+    if live:
+        mask[np.asarray(live, dtype=np.int64)] = True
+    _masks[key] = (_version, mask)
+    return mask
+
+
+@traced("vector.search")
+def search_many(queries: list[str], k: int = 8) -> list[list[dict]] | None:
+    """Return the ``k`` chunks most similar to each query, best first.
+
+    Each hit has ``path``, ``name``, ``text``, ``seq`` (chunk number) and
+    ``score`` (cosine similarity). Returns ``None`` when vector search is
+    unavailable.
+    """
+    if not ENABLED or not queries or not ensure_fresh():
+        return None
+    q = embed(queries)
+    with _file_lock:
+        dim = _dim()
+        rows = _rows_on_disk(dim)
+        if not rows:
+            return [[] for _ in queries]
+        if q.shape[1] != dim:
+            logging.error("vector index: query embedding has %d dims, index %d", q.shape[1], dim)
+            return None
+        matrix = np.memmap(vectors_path(), dtype=np.float32, mode='r', shape=(rows, dim))
+        scores = np.empty((len(queries), rows), dtype=np.float32)
+        for start in range(0, rows, SCORE_BLOCK):
+            block = matrix[start:start + SCORE_BLOCK]
+            scores[:, start:start + len(block)] = q @ block.T
+        del matrix
+        conn = _connect()
+        scores[:, ~_live_mask(conn, rows)] = -np.inf
+        k = min(k, rows)
+        results = []
+        for row_scores in scores:
+            top = np.argpartition(-row_scores, k - 1)[:k]
+            top = top[np.argsort(-row_scores[top])]
+            top = [int(r) for r in top if np.isfinite(row_scores[r])]
+            found = {
+                r: (path, seq, text)
+                for r, path, seq, text in conn.execute(
+                    f"SELECT row, path, seq, text FROM vector_chunks WHERE row IN ({','.join('?' * len(top))})",
+                    top,
+                )
+            } if top else {}
+            results.append([
+                {
+                    'path': found[r][0],
+                    'name': os.path.basename(found[r][0]),
+                    'seq': found[r][1],
+                    'text': found[r][2],
+                    'score': round(float(row_scores[r]), 4),
+                }
+                for r in top if r in found
+            ])
+        conn.close()
+    return results
+
+
+def search(query: str, k: int = 8) -> list[dict] | None:
+    """Return the ``k`` chunks most similar to ``query``, or ``None``."""
+    results = search_many([query], k)
+    return results[0] if results is not None else None
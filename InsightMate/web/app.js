@@ -13,6 +13,19 @@ const settingsModal = new bootstrap.Modal(document.getElementById('settings-moda
 const themeSelect = document.getElementById('theme-select');
 const modelSelect = document.getElementById('model-select');
 
+// Each tab keeps its own conversation state on the server.
+function getSessionId() {
+  let id = sessionStorage.getItem('sessionId');
+  if (!id) {
+    id = (window.crypto && crypto.randomUUID)
+      ? crypto.randomUUID()
+      : `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+    sessionStorage.setItem('sessionId', id);
+  }
+  return id;
+}
+const sessionId = getSessionId();
+
 // Previously used for typewriter effect
 
 function processThought(text, durationSec) {
@@ -32,7 +45,7 @@ function processThought(text, durationSec) {
   return text;
 }
 
-function addMessage(sender, text, isError = false) {
+function createMessage(sender, isError = false) {
   const div = document.createElement('div');
   div.classList.add('message', sender === 'You' ? 'you' : 'assistant');
   if (isError) div.classList.add('error-banner');
@@ -40,11 +53,20 @@ function addMessage(sender, text, isError = false) {
   div.innerHTML = `<strong>${sender}:</strong> `;
   div.appendChild(span);
   messagesDiv.appendChild(div);
-  messagesDiv.scrollTop = messagesDiv.scrollHeight;
-  span.innerHTML = marked.parse(text);
+  return {div, span};
+}
+
+function logMessage(sender, text) {
   const log = JSON.parse(localStorage.getItem('chatlog') || '[]');
   log.push({sender, text});
   localStorage.setItem('chatlog', JSON.stringify(log));
+}
+
+function addMessage(sender, text, isError = false) {
+  const {div, span} = createMessage(sender, isError);
+  messagesDiv.scrollTop = messagesDiv.scrollHeight;
+  span.innerHTML = marked.parse(text);
+  logMessage(sender, text);
   return div;
 }
 
@@ -114,11 +136,78 @@ function saveSettings() {
   applyTheme(themeSelect.value);
   fetch('/model', {
     method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ model: modelSelect.value })
+    headers: { 'Content-Type': 'application/json', 'X-Session-Id': sessionId },
+    body: JSON.stringify({ model: modelSelect.value, session_id: sessionId })
   }).catch(() => {});
 }
 
+function showError(error) {
+  if (error && error.indexOf('LLM error') > -1) {
+    alert('⚠️ InsightMate backend LLM is offline. Start Ollama with:  `ollama serve` ');
+  }
+  addMessage('Error', error, true);
+}
+
+function finishReply(reply, start) {
+  const duration = (Date.now() - start) / 1000;
+  const msg = processThought(reply, duration);
+  const isErr = (reply || '').trim().startsWith('⚠️');
+  return {msg, isErr};
+}
+
+// Read server-sent events from the /chat response and render tokens as
+// they arrive. Resolves once the server reports the stream is done.
+async function readStream(res, start) {
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  const {div, span} = createMessage('Assistant');
+  let buffer = '';
+  let reply = '';
+  let pending = false;
+
+  const render = () => {
+    pending = false;
+    span.innerHTML = marked.parse(reply);
+    messagesDiv.scrollTop = messagesDiv.scrollHeight;
+  };
+
+  for (;;) {
+    const {value, done} = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, {stream: true});
+    let sep;
+    while ((sep = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      let event = 'message';
+      let data = '';
+      block.split('\n').forEach(line => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      });
+      const payload = data ? JSON.parse(data) : {};
+      if (event === 'error') {
+        div.remove();
+        showError(payload.error || 'Stream error');
+        return;
+      }
+      if (payload.token) {
+        reply += payload.token;
+        if (!pending) {
+          pending = true;
+          requestAnimationFrame(render);
+        }
+      }
+    }
+  }
+
+  const {msg, isErr} = finishReply(reply, start);
+  if (isErr) div.classList.add('error-banner');
+  span.innerHTML = marked.parse(msg);
+  messagesDiv.scrollTop = messagesDiv.scrollHeight;
+  logMessage('Assistant', msg);
+}
+
 function sendMessage() {
   const text = input.value.trim();
   if (!text) return;
@@ -127,22 +216,26 @@ function sendMessage() {
   const start = Date.now();
   fetch('/chat', {
     method: 'POST',
-    headers: {'Content-Type': 'application/json'},
-    body: JSON.stringify({query: text})
+    headers: {
+      'Content-Type': 'application/json',
+      'Accept': 'text/event-stream',
+      'X-Session-Id': sessionId
+    },
+    body: JSON.stringify({query: text, stream: true, session_id: sessionId})
   })
-  .then(res => res.json())
-  .then(data => {
-    const duration = (Date.now() - start) / 1000;
-    if (data.error) {
-      if (data.error && data.error.indexOf('LLM error') > -1) {
-        alert('⚠️ InsightMate backend LLM is offline. Start Ollama with:  `ollama serve` ');
-      }
-      addMessage('Error', data.error, true);
-      return;
+  .then(res => {
+    const type = res.headers.get('Content-Type') || '';
+    if (res.body && type.indexOf('text/event-stream') > -1) {
+      return readStream(res, start);
     }
-    const msg = processThought(data.reply, duration);
-    const isErr = (data.reply || '').trim().startsWith('⚠️');
-    addMessage('Assistant', msg, isErr);
+    return res.json().then(data => {
+      if (data.error) {
+        showError(data.error);
+        return;
+      }
+      const {msg, isErr} = finishReply(data.reply, start);
+      addMessage('Assistant', msg, isErr);
+    });
   })
   .catch(err => {
     addMessage('Error', err.toString(), true);
@@ -0,0 +1,334 @@
+"""Local stand-ins for Ollama, n8n and the Google API used by the benchmarks.
+
+``FakeOllama`` and ``FakeN8n`` are real HTTP servers on localhost so the
+benchmarks exercise the same ``requests`` code paths as production.
+``FakeGoogle.build`` replaces ``googleapiclient.discovery.build`` with an
+in-memory Gmail/Calendar service that also supports batch requests.
+"""
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Server:
+    """Run ``handler`` on an ephemeral localhost port in a daemon thread."""
+
+    def __init__(self, handler):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        handler.owner = self
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def record(self, received: int, sent: int) -> None:
+        with self.lock:
+            self.calls += 1
+            self.bytes_in += received
+            self.bytes_out += sent
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {"calls": self.calls, "bytes_in": self.bytes_in, "bytes_out": self.bytes_out}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    owner: _Server
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status: int, payload: bytes, content_type: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def _reply_for(messages: list[dict]) -> str:
+    """Pick a plausible reply for the kind of prompt the router sent."""
+    text = " ".join(str(m.get("content", "")) for m in messages)
+    if "tool-planning agent" in text or "Only output the JSON array" in text:
+        if "calendar" in text.lower():
+            return '[{"type": "get_calendar", "date": "today"}]'
+        if "email" in text.lower():
+            return '[{"type": "search_email", "query": "today"}]'
+        return '[{"type": "chat"}]'
+    if "Respond with either 'PROCEED'" in text or '{"proceed": true}' in text:
+        return "PROCEED"
+    if "reasoning internally" in text:
+        return "I will look up the requested information."
+    return ("Here is a short answer from the fake model. " * 4).strip()
+
+
+def _as_json(reply: str) -> str:
+    """Wrap a canned reply in the shape a schema-constrained call expects."""
+    if reply.startswith("["):
+        return json.dumps({"actions": json.loads(reply)})
+    if reply == "PROCEED":
+        return json.dumps({"proceed": True})
+    return json.dumps({"text": reply})
+
+
+class FakeOllama(_Server):
+    """Ollama ``/api/chat`` with a fixed delay before the first token and
+    a per-token delay after it."""
+
+    def __init__(self, first_token_latency: float = 0.05, token_latency: float = 0.005):
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        super().__init__(type("OllamaHandler", (_OllamaHandler,), {}))
+
+
+class _OllamaHandler(_Handler):
+    def do_GET(self):
+        self._send(200, b"Ollama is running", "text/plain")
+
+    def do_POST(self):
+        raw = self._body()
+        owner = self.owner
+        try:
+            payload = json.loads(raw or b"{}")
+        except ValueError:
+            payload = {}
+        reply = _reply_for(payload.get("messages", []))
+        if payload.get("format"):
+            reply = _as_json(reply)
+        tokens = reply.split(" ")
+        time.sleep(owner.first_token_latency)
+        if not payload.get("stream"):
+            time.sleep(owner.token_latency * len(tokens))
+            body = json.dumps({"message": {"role": "assistant", "content": reply}, "done": True}).encode()
+            self._send(200, body)
+            owner.record(len(raw), len(body))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        sent = 0
+        for i, token in enumerate(tokens):
+            piece = token if i == 0 else " " + token
+            line = json.dumps({"message": {"content": piece}, "done": False}).encode() + b"\n"
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+            self.wfile.flush()
+            sent += len(line)
+            time.sleep(owner.token_latency)
+        line = json.dumps({"message": {"content": ""}, "done": True}).encode() + b"\n"
+        self.wfile.write(b"%x\r\n%s\r\n0\r\n\r\n" % (len(line), line))
+        owner.record(len(raw), sent + len(line))
+
+
+class FakeN8n(_Server):
+    """n8n workflow execution endpoint returning canned email/calendar data."""
+
+    def __init__(self, latency: float = 0.02):
+        self.latency = latency
+        super().__init__(type("N8nHandler", (_N8nHandler,), {}))
+
+
+class _N8nHandler(_Handler):
+    def do_POST(self):
+        raw = self._body()
+        time.sleep(self.owner.latency)
+        if "email" in self.path:
+            data = sample_emails()
+        elif "create_event" in self.path:
+            data = "Event created"
+        else:
+            data = sample_events()
+        body = json.dumps({"data": data}).encode()
+        self._send(200, body)
+        self.owner.record(len(raw), len(body))
+
+
+def sample_emails(n: int = 5) -> list[dict]:
+    return [
+        {"from": f"sender{i}@example.com", "subject": f"Subject {i}", "snippet": "Lorem ipsum " * 5}
+        for i in range(n)
+    ]
+
+
+def sample_events(n: int = 4) -> list[dict]:
+    base = datetime.now(timezone.utc).replace(hour=16, minute=0, second=0, microsecond=0)
+    return [
+        {
+            "title": f"Event {i}",
+            "start": (base + timedelta(hours=i)).isoformat(),
+            "end": (base + timedelta(hours=i, minutes=30)).isoformat(),
+        }
+        for i in range(n)
+    ]
+
+
+class _Call:
+    def __init__(self, api: "FakeGoogle", result):
+        self.api = api
+        self.result = result
+
+    def execute(self, *args, **kwargs):
+        self.api.record()
+        return self.result() if callable(self.result) else self.result
+
+
+class _Resource:
+    def __init__(self, api, methods: dict):
+        self.api = api
+        self.methods = methods
+
+    def __getattr__(self, name):
+        if name not in self.methods:
+            raise AttributeError(name)
+        target = self.methods[name]
+        if isinstance(target, dict):
+            return lambda *a, **k: _Resource(self.api, target)
+        return lambda *a, **k: _Call(self.api, lambda: target(*a, **k))
+
+
+class _Batch:
+    """``BatchHttpRequest`` stand-in: one round trip for every added call."""
+
+    def __init__(self, api: "FakeGoogle", callback=None):
+        self.api = api
+        self.callback = callback
+        self.calls: list[tuple[str, _Call]] = []
+
+    def add(self, call: _Call, callback=None, request_id=None):
+        self.calls.append((request_id or str(len(self.calls)), call))
+
+    def execute(self, *args, **kwargs):
+        self.api.record()
+        for request_id, call in self.calls:
+            result = call.result() if callable(call.result) else call.result
+            if self.callback:
+                self.callback(request_id, result, None)
+
+
+class _Service(_Resource):
+    def new_batch_http_request(self, callback=None):
+        return _Batch(self.api, callback)
+
+
+class _FakeCredentials:
+    valid = True
+    expiry = None
+    refresh_token = None
+
+
+class FakeGoogle:
+    """Counts API round trips, ``build()`` calls and credential loads."""
+
+    def __init__(
+        self,
+        latency: float = 0.02,
+        build_cost: float = 0.01,
+        n_messages: int = 5,
+        creds_cost: float = 0.002,
+    ):
+        self.latency = latency
+        self.build_cost = build_cost
+        self.creds_cost = creds_cost
+        self.n_messages = n_messages
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.builds = 0
+        self.credential_loads = 0
+
+    def record(self):
+        time.sleep(self.latency)
+        with self.lock:
+            self.calls += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "calls": self.calls,
+                "builds": self.builds,
+                "credential_loads": self.credential_loads,
+            }
+
+    def _message(self, id, **kwargs):
+        i = int(id.split("-")[-1])
+        email = sample_emails(self.n_messages)[i]
+        return {
+            "id": id,
+            "threadId": id,
+            "internalDate": str(int(time.time() * 1000) - i * 3600_000),
+            "labelIds": ["INBOX", "UNREAD"],
+            "snippet": email["snippet"],
+            "payload": {
+                "headers": [
+                    {"name": "From", "value": email["from"]},
+                    {"name": "Subject", "value": email["subject"]},
+                ],
+                "mimeType": "text/plain",
+                "body": {},
+            },
+        }
+
+    def _events(self, **kwargs):
+        if kwargs.get("syncToken"):
+            # Nothing changes between turns in the benchmark.
+            return {"items": [], "nextSyncToken": "sync-1"}
+        return {
+            "nextSyncToken": "sync-1",
+            "items": [
+                {
+                    "id": f"evt-{i}",
+                    "summary": e["title"],
+                    "start": {"dateTime": e["start"]},
+                    "end": {"dateTime": e["end"]},
+                }
+                for i, e in enumerate(sample_events())
+            ]
+        }
+
+    def load_credentials(self):
+        """Drop-in for ``google_auth._load_credentials`` (reading token.json)."""
+        time.sleep(self.creds_cost)
+        with self.lock:
+            self.credential_loads += 1
+        return _FakeCredentials()
+
+    def build(self, api, version, *args, **kwargs):
+        """Drop-in for ``googleapiclient.discovery.build``."""
+        time.sleep(self.build_cost)
+        with self.lock:
+            self.builds += 1
+        messages = {
+            "list": lambda **k: {"messages": [{"id": f"msg-{i}"} for i in range(self.n_messages)]},
+            "get": self._message,
+            "send": lambda **k: {"id": "sent"},
+        }
+        service = {
+            "users": {
+                "messages": messages,
+                "getProfile": lambda **k: {"historyId": "1"},
+                "history": {"list": lambda **k: {"history": [], "historyId": "1"}},
+            },
+            "calendarList": {"list": lambda **k: {"items": [{"id": "me", "primary": True}]}},
+            "events": {"list": self._events, "insert": lambda **k: dict(k.get("body", {}), id="new")},
+        }
+        return _Service(self, service)
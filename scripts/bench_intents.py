@@ -0,0 +1,74 @@
+"""Measure how many sample queries the rule-based intent engine resolves.
+
+Every query in ``intent_corpus.json`` is run through
+``intent_rules.match_intent``. A query counts as resolved when the
+confidence reaches ``INTENT_THRESHOLD`` (those turns skip the THINK,
+planning and reflection LLM calls). Resolved queries are checked against
+the expected action types; ``expect: null`` marks queries that should be
+left to the LLM planner.
+
+    python scripts/bench_intents.py [--out results.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'InsightMate', 'Scripts'))
+
+from intent_rules import INTENT_THRESHOLD, match_intent
+
+CORPUS = os.path.join(os.path.dirname(__file__), 'intent_corpus.json')
+# THINK + plan_actions + reflection are skipped on every resolved turn
+LLM_CALLS_SAVED_PER_TURN = 3
+
+
+def run(corpus_path: str = CORPUS) -> dict:
+    with open(corpus_path) as f:
+        corpus = json.load(f)
+    resolved = correct = false_positive = 0
+    misses = []
+    start = time.perf_counter()
+    for item in corpus:
+        actions, confidence = match_intent(item['query'])
+        hit = bool(actions) and confidence >= INTENT_THRESHOLD
+        types = [a['type'] for a in actions]
+        expect = item['expect']
+        if hit:
+            resolved += 1
+            if expect is None:
+                false_positive += 1
+                misses.append({'query': item['query'], 'got': types, 'expect': expect})
+            elif types == expect:
+                correct += 1
+            else:
+                misses.append({'query': item['query'], 'got': types, 'expect': expect})
+        elif expect is not None:
+            misses.append({'query': item['query'], 'got': None, 'expect': expect})
+    elapsed = time.perf_counter() - start
+    total = len(corpus)
+    return {
+        'queries': total,
+        'resolved': resolved,
+        'resolved_pct': round(100.0 * resolved / total, 1) if total else 0.0,
+        'correct': correct,
+        'false_positives': false_positive,
+        'llm_calls_saved': resolved * LLM_CALLS_SAVED_PER_TURN,
+        'avg_match_us': round(1e6 * elapsed / total, 1) if total else 0.0,
+        'threshold': INTENT_THRESHOLD,
+        'misses': misses,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', default=CORPUS)
+    parser.add_argument('--out')
+    args = parser.parse_args()
+    report = run(args.corpus)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,287 @@
+"""Offline end-to-end latency benchmark for ``assistant_router.route()``.
+
+Runs a representative query mix through ``route()``, the JSON ``/chat``
+endpoint and the streaming ``/chat`` endpoint against local stand-ins (see
+``bench_fakes.py``): a fake Ollama server with configurable token latency,
+a fake Gmail/Calendar ``build()`` and, with ``--n8n``, a fake n8n server.
+
+Reports p50/p95/p99 latency, LLM calls and bytes sent per turn, Google API
+round trips, time to first token for streaming and how often the planner's
+reply parsed on the first attempt. Results are written as
+JSON so runs can be compared between commits:
+
+    python scripts/bench_route.py --out bench_before.json
+    python scripts/bench_route.py --out bench_after.json --compare bench_before.json
+
+``GOOGLE_SERVICE_POOL=0`` builds a new Google service for every call, which
+shows what the service cache saves.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import types
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SCRIPTS = os.path.join(ROOT, 'InsightMate', 'Scripts')
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, SCRIPTS)
+
+from bench_fakes import FakeGoogle, FakeN8n, FakeOllama
+
+# Query mix: (category, query, weight)
+QUERY_MIX = [
+    ('greeting', 'hello', 2),
+    ('email', 'emails today', 3),
+    ('email', 'show me emails from the last 3 days', 2),
+    ('calendar', 'calendar tomorrow', 3),
+    ('calendar', "what's on my calendar this week?", 2),
+    ('mixed', 'emails and calendar for this week', 2),
+    ('schedule', 'add 5 pm dinner', 1),
+    ('followup', 'summarize', 1),
+    ('planner', 'do I have anything from the bank I should look at', 2),
+    ('chat', 'explain the difference between tcp and udp', 2),
+    ('local', 'list reminders', 1),
+]
+
+
+def _stub_google() -> None:
+    """Install placeholder Google modules when the client libraries are absent."""
+    try:
+        import googleapiclient.discovery  # noqa: F401
+        import google.oauth2.credentials  # noqa: F401
+        return
+    except Exception:
+        pass
+    discovery = types.SimpleNamespace(build=lambda *a, **k: None)
+    sys.modules.setdefault('googleapiclient', types.SimpleNamespace(discovery=discovery))
+    sys.modules.setdefault('googleapiclient.discovery', discovery)
+    fake_google = types.SimpleNamespace(
+        oauth2=types.SimpleNamespace(credentials=types.SimpleNamespace(Credentials=object)),
+        auth=types.SimpleNamespace(transport=types.SimpleNamespace(requests=types.SimpleNamespace(Request=object))),
+    )
+    sys.modules.setdefault('google', fake_google)
+    sys.modules.setdefault('google.oauth2', fake_google.oauth2)
+    sys.modules.setdefault('google.oauth2.credentials', fake_google.oauth2.credentials)
+    sys.modules.setdefault('google_auth_oauthlib.flow', types.SimpleNamespace(InstalledAppFlow=object))
+    sys.modules.setdefault('google.auth', fake_google.auth)
+    sys.modules.setdefault('google.auth.transport', fake_google.auth.transport)
+    sys.modules.setdefault('google.auth.transport.requests', fake_google.auth.transport.requests)
+
+
+def _percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pct(p):
+        k = (len(ordered) - 1) * p / 100
+        lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+        return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+    return {
+        'n': len(ordered),
+        'mean_ms': round(1000 * statistics.fmean(ordered), 2),
+        'p50_ms': round(1000 * pct(50), 2),
+        'p95_ms': round(1000 * pct(95), 2),
+        'p99_ms': round(1000 * pct(99), 2),
+    }
+
+
+def setup(args):
+    """Start the fakes, point the app at them and import the router."""
+    ollama = FakeOllama(args.first_token_ms / 1000, args.token_ms / 1000).start()
+    os.environ['OLLAMA_URL'] = ollama.url
+    os.environ.setdefault('LLM_CACHE', '1' if args.cache else '0')
+    n8n = None
+    if args.n8n:
+        n8n = FakeN8n(args.api_ms / 1000).start()
+        os.environ['N8N_URL'] = n8n.url
+    else:
+        os.environ.pop('N8N_URL', None)
+    _stub_google()
+
+    google = FakeGoogle(args.api_ms / 1000, args.build_ms / 1000, creds_cost=args.creds_ms / 1000)
+    tmp = tempfile.mkdtemp(prefix='insightmate-bench-')
+    os.chdir(tmp)
+
+    import memory_db
+    memory_db.DB_PATH = os.path.join(tmp, 'memory.db')
+    memory_db.init_db()
+    import llm_cache
+    llm_cache.DB_PATH = os.path.join(tmp, 'llm_cache.db')
+
+    import google_auth
+    google_auth.build = google.build
+    google_auth._load_credentials = google.load_credentials
+    google_auth.clear_cache()
+
+    import server_common
+    import assistant_router
+    from flask import Flask
+    app = Flask(__name__)
+    server_common.register_common(app)
+    return {
+        'ollama': ollama,
+        'n8n': n8n,
+        'google': google,
+        'router': assistant_router,
+        'client': app.test_client(),
+    }
+
+
+def _counters(env) -> dict:
+    snap = {
+        'llm': env['ollama'].snapshot(),
+        'google': env['google'].snapshot(),
+    }
+    if env['n8n']:
+        snap['n8n'] = env['n8n'].snapshot()
+    return snap
+
+
+def _delta(before: dict, after: dict) -> dict:
+    return {
+        name: {k: after[name][k] - before[name][k] for k in after[name]}
+        for name in after
+    }
+
+
+def _run_once(env, mode: str, query: str) -> tuple[float, float | None]:
+    """Return ``(latency, time_to_first_token)`` for one turn."""
+    start = time.perf_counter()
+    ttft = None
+    if mode == 'route':
+        env['router'].route(query)
+    elif mode == 'chat':
+        res = env['client'].post('/chat', json={'query': query, 'session_id': 'bench'})
+        res.get_json()
+    else:
+        res = env['client'].post(
+            '/chat', json={'query': query, 'stream': True, 'session_id': 'bench'}
+        )
+        for chunk in res.response:
+            if ttft is None and b'"token"' in chunk:
+                ttft = time.perf_counter() - start
+        res.close()
+    return time.perf_counter() - start, ttft
+
+
+def run(args) -> dict:
+    env = setup(args)
+    import tracing
+    mix = [(c, q) for c, q, w in QUERY_MIX for _ in range(w)]
+    report = {
+        'config': {
+            'iterations': args.iterations,
+            'first_token_ms': args.first_token_ms,
+            'token_ms': args.token_ms,
+            'api_ms': args.api_ms,
+            'build_ms': args.build_ms,
+            'creds_ms': args.creds_ms,
+            'n8n': args.n8n,
+            'cache': args.cache,
+        },
+        'modes': {},
+    }
+    try:
+        for mode in args.modes:
+            latencies, ttfts = [], []
+            by_category: dict[str, list[float]] = {}
+            totals = _delta(_counters(env), _counters(env))
+            turns = 0
+            for _ in range(args.iterations):
+                for category, query in mix:
+                    before = _counters(env)
+                    latency, ttft = _run_once(env, mode, query)
+                    delta = _delta(before, _counters(env))
+                    for name, values in delta.items():
+                        for k, v in values.items():
+                            totals[name][k] += v
+                    latencies.append(latency)
+                    by_category.setdefault(category, []).append(latency)
+                    if ttft is not None:
+                        ttfts.append(ttft)
+                    turns += 1
+            result = {
+                'latency': _percentiles(latencies),
+                'llm_calls_per_turn': round(totals['llm']['calls'] / turns, 2),
+                'llm_bytes_sent_per_turn': round(totals['llm']['bytes_in'] / turns, 1),
+                'google_calls_per_turn': round(totals['google']['calls'] / turns, 2),
+                'google_builds_per_turn': round(totals['google']['builds'] / turns, 2),
+                'google_credential_loads_per_turn': round(
+                    totals['google']['credential_loads'] / turns, 2
+                ),
+                'by_category': {c: _percentiles(v) for c, v in sorted(by_category.items())},
+            }
+            if 'n8n' in totals:
+                result['n8n_calls_per_turn'] = round(totals['n8n']['calls'] / turns, 2)
+                result['n8n_bytes_sent_per_turn'] = round(totals['n8n']['bytes_in'] / turns, 1)
+            if ttfts:
+                result['time_to_first_token'] = _percentiles(ttfts)
+            report['modes'][mode] = result
+        report['planner_parse'] = {
+            ','.join(f'{k}={v}' for k, v in labels): n
+            for labels, n in sorted(tracing.counter_values('planner_parse_total').items())
+        }
+    finally:
+        env['ollama'].stop()
+        if env['n8n']:
+            env['n8n'].stop()
+    return report
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    """Return the relative p50/p95 change per mode against ``baseline``."""
+    out = {}
+    for mode, result in report['modes'].items():
+        base = baseline.get('modes', {}).get(mode)
+        if not base:
+            continue
+        out[mode] = {}
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            old, new = base['latency'].get(key), result['latency'].get(key)
+            if old:
+                out[mode][key] = f"{100.0 * (new - old) / old:+.1f}%"
+        for key in ('llm_calls_per_turn', 'google_builds_per_turn'):
+            if key in base:
+                out[mode][key] = f"{base[key]} -> {result[key]}"
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=3)
+    parser.add_argument('--modes', nargs='+', default=['route', 'chat', 'stream'],
+                        choices=['route', 'chat', 'stream'])
+    parser.add_argument('--first-token-ms', type=float, default=50.0)
+    parser.add_argument('--token-ms', type=float, default=5.0)
+    parser.add_argument('--api-ms', type=float, default=20.0,
+                        help='latency of each Google/n8n round trip')
+    parser.add_argument('--build-ms', type=float, default=10.0,
+                        help='cost of each discovery build() call')
+    parser.add_argument('--creds-ms', type=float, default=2.0,
+                        help='cost of each token.json load')
+    parser.add_argument('--n8n', action='store_true', help='route tools through fake n8n')
+    parser.add_argument('--cache', action='store_true', help='enable the LLM reply cache')
+    parser.add_argument('--out', help='write the JSON report here')
+    parser.add_argument('--compare', help='previous JSON report to diff against')
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    if args.compare:
+        with open(args.compare) as f:
+            report['compared_to'] = {'file': args.compare, 'delta': compare(report, json.load(f))}
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text)
+    print(text)
+    return report
+
+
+if __name__ == '__main__':
+    main()
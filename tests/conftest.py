@@ -16,3 +16,31 @@ sys.modules.setdefault('google_auth_oauthlib.flow', types.SimpleNamespace(Instal
 sys.modules.setdefault('google.auth', fake_google.auth)
 sys.modules.setdefault('google.auth.transport', fake_google.auth.transport)
 sys.modules.setdefault('google.auth.transport.requests', fake_google.auth.transport.requests)
+
+# assistant_router and server_common import each other. server_common defines
+# _load_model before it imports the router, so loading it first lets any test
+# module import assistant_router on its own.
+import server_common  # noqa: E402,F401
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _isolated_storage(tmp_path, monkeypatch):
+    """Keep test data out of the real ``memory.db`` and the cache databases."""
+    import llm_cache
+    import memory_db
+    import text_cache
+    monkeypatch.setattr(llm_cache, 'DB_PATH', str(tmp_path / 'llm_cache.db'))
+    monkeypatch.setattr(text_cache, 'DB_PATH', str(tmp_path / 'text_cache.db'))
+    monkeypatch.setattr(memory_db, 'DB_PATH', str(tmp_path / 'memory.db'))
+    memory_db.init_db()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_google_services():
+    """Don't let pooled Google services leak between tests."""
+    import google_auth
+    google_auth.clear_cache()
+    yield
+    google_auth.clear_cache()
@@ -0,0 +1,101 @@
+import time
+
+import calendar_reader
+import google_auth
+
+
+class Call:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+
+class PagedCalendar:
+    """Three pages of two events each, with a repeated event on page two."""
+
+    def __init__(self):
+        self.requests = []
+        starts = ["2024-05-01T09:00:00-07:00", "2024-05-02T09:00:00-07:00", "2024-05-03T09:00:00-07:00"]
+        self.pages = [
+            [self.event("a", starts[0]), self.event("b", starts[1])],
+            [self.event("b", starts[1]), self.event("c", starts[2])],
+            [self.event("d", starts[2])],
+        ]
+
+    @staticmethod
+    def event(title, start):
+        return {"summary": title, "start": {"dateTime": start}, "end": {"dateTime": start}}
+
+    def events(self):
+        return self
+
+    def list(self, pageToken=None, **kwargs):
+        self.requests.append(kwargs)
+        index = int(pageToken or 0)
+        resp = {"items": self.pages[index]}
+        if index + 1 < len(self.pages):
+            resp["nextPageToken"] = str(index + 1)
+        return Call(resp)
+
+
+def test_range_follows_pages_with_field_filter(monkeypatch):
+    fake = PagedCalendar()
+    monkeypatch.setattr(google_auth, "build", lambda *a, **k: fake)
+    monkeypatch.setattr(google_auth, "get_credentials", lambda: None)
+    events = calendar_reader.list_events_for_range("2024-05-01", "2024-05-03", fresh=True)
+    assert [e["title"] for e in events] == ["a", "b", "c", "d"]
+    assert len(fake.requests) == 3
+    assert fake.requests[0]["fields"] == calendar_reader.EVENT_FIELDS
+
+    # Stopping early fetches no further pages
+    fake.requests.clear()
+    first = next(calendar_reader.iter_events(
+        calendar_reader.datetime.datetime(2024, 5, 1, tzinfo=calendar_reader.PACIFIC_TZ),
+        calendar_reader.datetime.datetime(2024, 5, 4, tzinfo=calendar_reader.PACIFIC_TZ),
+    ))
+    assert first["title"] == "a" and len(fake.requests) == 1
+
+
+class MultiCalendar:
+    """Calendars keyed by id; "slow" never answers within the test timeout."""
+
+    def __init__(self):
+        shared = {"id": "s1", "summary": "Offsite", "start": {"dateTime": "2024-05-01T08:00:00-07:00"},
+                  "end": {"dateTime": "2024-05-01T09:00:00-07:00"}}
+        self.items = {
+            "primary": [shared, {"id": "p1", "summary": "Standup", "start": {"dateTime": "2024-05-01T10:00:00-07:00"},
+                                 "end": {"dateTime": "2024-05-01T10:15:00-07:00"}}],
+            "family": [{"id": "f1", "summary": "School run", "start": {"dateTime": "2024-05-01T07:30:00-07:00"},
+                        "end": {"dateTime": "2024-05-01T08:00:00-07:00"}}, shared],
+            "slow": [],
+        }
+
+    def calendarList(self):
+        return self
+
+    def events(self):
+        return self
+
+    def list(self, calendarId=None, **kwargs):
+        if calendarId is None:
+            return Call({"items": [{"id": "me@example.com", "primary": True}, {"id": "family"},
+                                   {"id": "slow"}, {"id": "hidden", "hidden": True}]})
+        if calendarId == "slow":
+            time.sleep(0.5)
+        return Call({"items": self.items[calendarId]})
+
+
+def test_multi_calendar_fan_out(monkeypatch):
+    fake = MultiCalendar()
+    monkeypatch.setattr(google_auth, "build", lambda *a, **k: fake)
+    monkeypatch.setattr(google_auth, "get_credentials", lambda: None)
+    monkeypatch.setattr(calendar_reader, "MULTI_CALENDAR", True)
+    monkeypatch.setattr(calendar_reader, "CALENDAR_TIMEOUT", 0.2)
+    monkeypatch.setattr(calendar_reader, "_calendar_list", (0.0, []))
+    assert calendar_reader.calendar_ids() == ["primary", "family", "slow"]
+
+    events = calendar_reader.list_events_for_day("2024-05-01", fresh=True)
+    assert [e["title"] for e in events] == ["School run", "Offsite", "Standup"]
+    assert "id" not in events[0]
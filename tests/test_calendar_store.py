@@ -0,0 +1,182 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import calendar_reader
+import calendar_store
+import google_auth
+import memory_db
+from date_utils import PT
+
+
+class Gone(Exception):
+    status_code = 410
+
+
+class Call:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result() if callable(self.result) else self.result
+
+
+class FakeCalendar:
+    def __init__(self):
+        self.requests = []
+        self.inserted = []
+        self.batches = 0
+        self.changes = []
+        self.expired = False
+        today = datetime.now(PT).replace(hour=9, minute=0, second=0, microsecond=0)
+        self.items = [
+            self.event("e1", "Standup", today),
+            self.event("e2", "Dentist", today + timedelta(days=1)),
+        ]
+
+    @staticmethod
+    def event(event_id, title, start, status="confirmed"):
+        return {
+            "id": event_id,
+            "summary": title,
+            "status": status,
+            "start": {"dateTime": start.isoformat()},
+            "end": {"dateTime": (start + timedelta(hours=1)).isoformat()},
+        }
+
+    def events(self):
+        return self
+
+    def insert(self, calendarId, body):
+        self.inserted.append(body)
+        if body["summary"] == "fail":
+            def boom():
+                raise RuntimeError("rate limited")
+            return Call(boom)
+        return Call(dict(body, id=f"new{len(self.inserted)}"))
+
+    def new_batch_http_request(self, callback):
+        fake = self
+
+        class Batch:
+            def __init__(self):
+                self.calls = []
+
+            def add(self, call, request_id):
+                self.calls.append((request_id, call))
+
+            def execute(self):
+                fake.batches += 1
+                for request_id, call in self.calls:
+                    try:
+                        callback(request_id, call.execute(), None)
+                    except Exception as e:
+                        callback(request_id, None, e)
+
+        return Batch()
+
+    def list(self, **kwargs):
+        self.requests.append(kwargs)
+        if kwargs.get("syncToken"):
+            if self.expired:
+                def boom():
+                    raise Gone()
+                return Call(boom)
+            changes, self.changes = self.changes, []
+            return Call({"items": changes, "nextSyncToken": "t2"})
+        return Call({"items": self.items, "nextSyncToken": "t1"})
+
+
+@pytest.fixture
+def calendar(monkeypatch):
+    fake = FakeCalendar()
+    monkeypatch.setattr(google_auth, "build", lambda *a, **k: fake)
+    monkeypatch.setattr(google_auth, "get_credentials", lambda: None)
+    monkeypatch.setattr(calendar_store, "SYNC_INTERVAL", 0)
+    return fake
+
+
+def _titles(events):
+    return [e["title"] for e in events]
+
+
+def test_days_are_served_from_the_cache(calendar):
+    assert _titles(calendar_reader.list_events_for_day(0)) == ["Standup"]
+    assert _titles(calendar_reader.list_events_for_day(1)) == ["Dentist"]
+    # One full listing, then only sync-token checks
+    assert [bool(r.get("syncToken")) for r in calendar.requests] == [False, True]
+    assert calendar_reader.search_events("dent") == [calendar_reader.list_events_for_day(1)[0]]
+
+    # Far outside the cached window, or fresh=True: live API
+    calendar_reader.list_events_for_day("2001-01-01")
+    calendar_reader.list_events_for_day(0, fresh=True)
+    assert "timeMin" in calendar.requests[-1] and "syncToken" not in calendar.requests[-1]
+
+
+def test_changes_are_upserted_and_cancellations_removed(calendar):
+    calendar_reader.list_events_for_day(0)
+    start = datetime.now(PT).replace(hour=15, minute=0, second=0, microsecond=0)
+    calendar.changes = [
+        FakeCalendar.event("e1", "Standup (moved)", start),
+        FakeCalendar.event("e2", "", start, status="cancelled"),
+    ]
+    assert _titles(calendar_reader.list_events_for_day(0)) == ["Standup (moved)"]
+    assert calendar_reader.list_events_for_day(1) == []
+    conn = memory_db._connect()
+    assert conn.execute("SELECT COUNT(*) FROM calendar_events").fetchone() == (1,)
+    conn.close()
+
+
+def test_expired_sync_token_triggers_full_sync(calendar):
+    calendar_store.full_sync()
+    calendar.expired = True
+    calendar_store.incremental_sync()
+    assert memory_db.get_state(calendar_store.TOKEN_KEY.format("primary")) == "t1"
+
+
+def test_save_calendar_events_upserts():
+    event = {"id": "x", "title": "Lunch", "start": "2024-05-01T12:00:00-07:00", "end": ""}
+    memory_db.save_calendar_events([event, dict(event, title="Team lunch")])
+    memory_db.save_calendar_events([{"title": "No id", "start": "2024-05-02"}] * 2)
+    conn = memory_db._connect()
+    rows = conn.execute("SELECT title FROM calendar_events ORDER BY start").fetchall()
+    conn.close()
+    assert rows == [("Team lunch",), ("No id",)]
+
+
+def test_free_time_and_conflicts_use_the_index(calendar):
+    today = datetime.now(PT).date()
+    slots = calendar_reader.find_free_time(today, "08:00", "12:00")
+    assert [(s["start"][11:16], s["end"][11:16]) for s in slots] == [("08:00", "09:00"), ("10:00", "12:00")]
+    message = calendar_reader.create_event("review today at 9:30 am")
+    assert "Overlaps with Standup (09:00)" in message
+    # The new event is cached at once and shows up in the next lookup
+    start = datetime.now(PT).replace(hour=9, minute=45, second=0, microsecond=0)
+    clashes = calendar_reader.check_conflicts(start, start + timedelta(minutes=10))
+    assert sorted(c["title"] for c in clashes) == ["Standup", "review"]
+    assert sum(not r.get("syncToken") for r in calendar.requests) == 1
+
+
+def test_create_events_collapses_series_and_batches_the_rest(calendar):
+    today = datetime.now(PT).replace(hour=9, minute=0, second=0, microsecond=0)
+    monday = today + timedelta(days=14 - today.weekday())
+    # Two working weeks of standups
+    series = [{"title": "Standup", "start": monday + timedelta(days=i), "minutes": 15}
+              for i in range(12) if i % 7 < 5]
+    statuses = calendar_reader.create_events(series)
+    assert len(calendar.inserted) == 1 and calendar.batches == 0
+    assert calendar.inserted[0]["recurrence"] == ["RRULE:FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR;COUNT=10"]
+    assert {s["status"] for s in statuses} == {"created"}
+
+    calendar.inserted.clear()
+    statuses = calendar_reader.create_events([
+        {"title": "Dentist", "start": monday},
+        {"title": "fail", "start": monday + timedelta(days=2)},
+        {"title": "Lunch", "start": None},
+        {"title": "Call", "start": monday + timedelta(days=3, hours=5)},
+    ])
+    assert [s["status"] for s in statuses] == ["created", "failed", "failed", "created"]
+    assert statuses[1]["error"] == "rate limited"
+    assert statuses[0]["conflicts"] == [{"title": "Standup", "start": series[0]["start"].isoformat(),
+                                          "end": (series[0]["start"] + timedelta(minutes=15)).isoformat()}]
+    assert calendar.batches == 1 and len(calendar.inserted) == 3
@@ -0,0 +1,39 @@
+import conversation
+import session_store
+
+
+def test_history_fits_budget_with_rolling_summary(monkeypatch):
+    calls = []
+
+    def fake_summary(model, messages):
+        calls.append(messages)
+        return "summary"
+
+    monkeypatch.setattr(conversation, "chat_completion", fake_summary)
+    monkeypatch.setattr(conversation, "get_recent_messages", lambda limit, session=None: [])
+    monkeypatch.setattr(conversation, "DEFAULT_BUDGET", 200)
+    with session_store.use_session("conversation-test"):
+        sizes = []
+        for i in range(30):
+            conversation.record_turn(f"question {i} " + "x" * 80, f"answer {i} " + "y" * 80)
+            messages = conversation.build_messages("sys", "next?", "qwen3:30b-a3b")
+            sizes.append(sum(conversation.estimate_tokens(m["content"]) for m in messages))
+        assert max(sizes) <= 200
+        assert messages[1]["content"].endswith("summary")
+        assert messages[-1] == {"role": "user", "content": "next?"}
+        # Turns are folded in batches, not on every prompt.
+        assert 0 < len(calls) < 15
+
+
+def test_new_sessions_do_not_inherit_other_history():
+    import memory_db
+
+    with session_store.use_session("tab-a"):
+        memory_db.save_message("my secret plan", "noted")
+    with session_store.use_session("tab-b"):
+        messages = conversation.build_messages("sys", "hello", "qwen3:30b-a3b")
+        assert all("secret" not in m["content"] for m in messages)
+    session_store.drop_session("tab-a")
+    with session_store.use_session("tab-a"):
+        messages = conversation.build_messages("sys", "hello", "qwen3:30b-a3b")
+        assert any("secret" in m["content"] for m in messages)
@@ -0,0 +1,69 @@
+import datetime
+
+import date_utils
+import gmail_reader
+
+
+def test_keywords_skip_dateparser(monkeypatch):
+    monkeypatch.setattr(date_utils, "_dateparser_parse", lambda *a: 1 / 0)
+    today = date_utils.today_pt()
+    assert date_utils.resolve_date("today") == today
+    assert date_utils.resolve_date("Tomorrow") == today + datetime.timedelta(days=1)
+    assert date_utils.resolve_date("+3d") == today + datetime.timedelta(days=3)
+    assert date_utils.resolve_date("2024-05-01") == datetime.date(2024, 5, 1)
+    assert date_utils.resolve_date("next monday").weekday() == 0
+    when = date_utils.parse_when("tomorrow at 5 pm")
+    assert (when.hour, when.minute) == (17, 0)
+    assert when.tzinfo is date_utils.PT
+
+
+def test_dateparser_results_are_memoized(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        date_utils, "_dateparser_parse",
+        lambda text, base, future: calls.append(text) or datetime.datetime(2024, 5, 3, tzinfo=date_utils.PT),
+    )
+    date_utils._parse_cached.cache_clear()
+    for _ in range(3):
+        assert date_utils.resolve_date("may 3rd") == datetime.date(2024, 5, 3)
+    assert calls == ["may 3rd"]
+    # Time-of-day dependent phrases are never cached
+    date_utils.parse_when("2 hours ago")
+    date_utils.parse_when("2 hours ago")
+    assert calls[1:] == ["2 hours ago", "2 hours ago"]
+
+
+def test_pacific_time_follows_daylight_saving():
+    winter = datetime.datetime(2024, 1, 15, 12, tzinfo=date_utils.PT)
+    summer = datetime.datetime(2024, 7, 15, 12, tzinfo=date_utils.PT)
+    assert winter.utcoffset() == datetime.timedelta(hours=-8)
+    assert summer.utcoffset() == datetime.timedelta(hours=-7)
+
+
+def test_email_date_filter_ranges():
+    today = date_utils.today_pt()
+    fmt = lambda d: d.strftime("%Y/%m/%d")
+    assert gmail_reader._date_filter("last 3 days") == (
+        f"after:{fmt(today - datetime.timedelta(days=3))} before:{fmt(today + datetime.timedelta(days=1))}"
+    )
+    assert gmail_reader._date_filter("from 2024-05-01 to 2024-05-03") == (
+        "after:2024/05/01 before:2024/05/04"
+    )
+    assert gmail_reader._date_filter("invoice") == "invoice"
+
+
+def test_ranges_follow_calendar_weeks_and_months(monkeypatch):
+    monkeypatch.setattr(date_utils, "today_pt", lambda: datetime.date(2024, 5, 15))  # a Wednesday
+    d = datetime.date
+    assert date_utils.resolve_range("this week") == (d(2024, 5, 13), d(2024, 5, 20))
+    assert date_utils.resolve_range("next week") == (d(2024, 5, 20), d(2024, 5, 27))
+    assert date_utils.resolve_range("last week") == (d(2024, 5, 8), d(2024, 5, 16))
+    assert date_utils.resolve_range("next month") == (d(2024, 6, 1), d(2024, 7, 1))
+    assert date_utils.resolve_range("last month") == (d(2024, 4, 1), d(2024, 5, 1))
+    m, start, end = date_utils.find_range("review every friday next month")
+    assert (m.group(0), start, end) == ("next month", d(2024, 6, 1), d(2024, 7, 1))
+    m, start, end = date_utils.find_range("dentist tomorrow")
+    assert (m.group(0), start, end) == ("tomorrow", d(2024, 5, 16), d(2024, 5, 17))
+    assert date_utils.find_range("dinner with sam") is None
+    m, when = date_utils.find_time("lunch at noon")
+    assert (m.group(0), when) == ("noon", datetime.time(12, 0))
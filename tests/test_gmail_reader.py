@@ -0,0 +1,76 @@
+import gmail_reader
+import google_auth
+
+
+class FakeRequest:
+    def __init__(self, service, kwargs):
+        self.service = service
+        self.kwargs = kwargs
+
+    def execute(self):
+        self.service.round_trips += 1
+        return self.result()
+
+    def result(self):
+        i = int(self.kwargs["id"].split("-")[1])
+        return {
+            "snippet": f"snippet {i}",
+            "payload": {"headers": [
+                {"name": "From", "value": f"s{i}@example.com"},
+                {"name": "Subject", "value": f"Subject {i}"},
+            ]},
+        }
+
+
+class FakeBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id=None):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.service.round_trips += 1
+        self.service.batch_sizes.append(len(self.requests))
+        # Responses may arrive out of order
+        for request_id, request in reversed(self.requests):
+            self.callback(request_id, request.result(), None)
+
+
+class FakeService:
+    def __init__(self, n):
+        self.n = n
+        self.round_trips = 0
+        self.batch_sizes = []
+        self.formats = set()
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def list(self, **kwargs):
+        ids = [{"id": f"m-{i}"} for i in range(self.n)]
+        return type("L", (), {"execute": lambda _: {"messages": ids}})()
+
+    def get(self, **kwargs):
+        self.formats.add(kwargs["format"])
+        return FakeRequest(self, kwargs)
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self, callback)
+
+
+def test_search_batches_metadata_requests(monkeypatch):
+    service = FakeService(100)
+    monkeypatch.setattr(google_auth, "build", lambda *a, **k: service)
+    monkeypatch.setattr(google_auth, "get_credentials", lambda: None)
+    emails = gmail_reader.search_emails("invoice", limit=100, live=True)
+    assert [e["subject"] for e in emails] == [f"Subject {i}" for i in range(100)]
+    assert service.batch_sizes == [50, 50]
+    assert service.round_trips == 2
+    assert service.formats == {"metadata"}
+    assert "body" not in emails[0]
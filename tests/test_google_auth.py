@@ -0,0 +1,72 @@
+import datetime
+import threading
+
+import google_auth
+
+
+class FakeCreds:
+    valid = True
+    refresh_token = "r"
+
+    def __init__(self, expires_in):
+        self.expiry = datetime.datetime.utcnow() + datetime.timedelta(seconds=expires_in)
+        self.refreshes = 0
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.expiry = datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+
+    def to_json(self):
+        return "{}"
+
+
+def test_credentials_load_once_and_refresh_near_expiry(monkeypatch, tmp_path):
+    creds = FakeCreds(expires_in=3600)
+    loads = []
+    monkeypatch.setattr(google_auth, "_load_credentials", lambda: loads.append(1) or creds)
+    monkeypatch.setattr(google_auth, "Request", lambda: None)
+    monkeypatch.setattr(google_auth, "TOKEN_FILE", str(tmp_path / "token.json"))
+    for _ in range(3):
+        assert google_auth.get_credentials() is creds
+    assert loads == [1] and creds.refreshes == 0
+    creds.expiry = datetime.datetime.utcnow() + datetime.timedelta(seconds=60)
+    google_auth.get_credentials()
+    assert creds.refreshes == 1
+
+
+def test_services_are_pooled_and_not_shared(monkeypatch):
+    monkeypatch.setattr(google_auth, "get_credentials", lambda: "creds")
+    built = []
+    monkeypatch.setattr(google_auth, "build", lambda *a, **k: built.append(object()) or built[-1])
+
+    barrier = threading.Barrier(2)
+    seen = []
+
+    def worker():
+        with google_auth.google_service("gmail", "v1") as service:
+            seen.append(service)
+            barrier.wait(timeout=5)
+
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(built) == 2 and seen[0] is not seen[1]
+
+    reuses = google_auth.service_stats()["reuses"]
+    with google_auth.google_service("gmail", "v1") as service:
+        assert service in built
+    assert len(built) == 2
+    assert google_auth.service_stats()["reuses"] == reuses + 1
+
+
+def test_is_expired_matches_the_api_status():
+    class HttpError(Exception):
+        def __init__(self, status):
+            self.resp = type("Resp", (), {"status": status})()
+
+    assert google_auth.is_expired(HttpError(404), 404)
+    assert google_auth.is_expired(HttpError("410"), 410)
+    assert not google_auth.is_expired(HttpError(500), 410)
+    assert not google_auth.is_expired(ValueError("boom"), 404)
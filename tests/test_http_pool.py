@@ -0,0 +1,35 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import http_pool
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_session_reuses_connections():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+    try:
+        http_pool.close_all()
+        session = http_pool.get_session("test")
+        assert http_pool.get_session("test") is session
+        for _ in range(3):
+            assert session.get(url, timeout=http_pool.timeout("test")).text == "ok"
+        stats = http_pool.pool_stats()["test"]
+        assert stats == {"requests": 3, "connections": 1, "reused": 2}
+    finally:
+        http_pool.close_all()
+        server.shutdown()
@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+import assistant_router as ar
+import date_utils
+from intent_rules import INTENT_THRESHOLD, match_intent
+
+
+def test_fixed_planner_mappings():
+    assert match_intent("emails today") == ([{"type": "search_email", "query": "today"}], 1.0)
+    assert match_intent("list calendar") == ([{"type": "get_calendar", "date": "today"}], 1.0)
+
+
+def test_dates_resolve_like_date_utils():
+    start, end = date_utils.resolve_range("next week")
+    last = end - timedelta(days=1)
+    assert match_intent("calendar next week")[0] == [
+        {"type": "get_calendar_range", "start": start.isoformat(), "end": last.isoformat()}
+    ]
+    assert match_intent("emails last 3 days")[0] == [{"type": "search_email", "query": "last 3 days"}]
+    assert match_intent("today's meetings") == ([{"type": "get_calendar", "date": "today"}], 1.0)
+
+
+def test_schedule_event():
+    actions, confidence = match_intent("add event dentist at 9:30 am tomorrow")
+    assert actions == [
+        {"type": "schedule_event", "time": "09:30", "date": "tomorrow", "title": "dentist"}
+    ]
+    assert confidence >= INTENT_THRESHOLD
+
+
+def test_unexplained_words_fall_back():
+    _, confidence = match_intent("write a poem about email")
+    assert confidence < INTENT_THRESHOLD
+    assert match_intent("explain transformers") == ([], 0.0)
+
+
+def test_fast_path_skips_llm(monkeypatch):
+    def no_llm(*args, **kwargs):
+        raise AssertionError("LLM should not be called")
+
+    monkeypatch.setattr(ar, "chat_completion", no_llm)
+    monkeypatch.setattr(ar, "plan_actions", no_llm)
+    monkeypatch.setattr(ar, "get_selected_model", lambda: "m")
+    monkeypatch.setitem(ar.TOOL_REGISTRY, "search_email", lambda a: [{"subject": "Hi"}])
+    reply = ar.plan_then_answer("emails today")
+    assert "Hi" in reply
+
+
+def test_availability_questions():
+    actions, confidence = match_intent("when am I free tomorrow afternoon?")
+    assert actions == [
+        {"type": "find_free_time", "date": "tomorrow", "start": "12:00", "end": "17:00"}
+    ]
+    assert confidence >= INTENT_THRESHOLD
+    assert match_intent("any conflicts tomorrow at 3 pm")[0] == [
+        {"type": "check_conflicts", "date": "tomorrow", "time": "15:00"}
+    ]
+
+
+def test_repeating_event_becomes_one_batch_action():
+    actions, confidence = match_intent("add standup every weekday at 9 next week")
+    assert [a["type"] for a in actions] == ["schedule_events"]
+    events = actions[0]["events"]
+    assert len(events) == 5 and {e["time"] for e in events} == {"09:00"}
+    assert confidence >= INTENT_THRESHOLD
+
+
+def test_series_span_comes_from_date_utils():
+    start, end = date_utils.resolve_range("next month")
+    actions, confidence = match_intent("schedule review every friday at 3 next month")
+    events = actions[0]["events"]
+    assert {e["title"] for e in events} == {"review"}
+    assert all(start.isoformat() <= e["date"] < end.isoformat() for e in events)
+    assert len(events) in (4, 5) and confidence >= INTENT_THRESHOLD
+
+    tomorrow = date_utils.today_pt() + timedelta(days=1)
+    actions, confidence = match_intent("add standup every weekday at 9 tomorrow")
+    events = actions[0]["events"]
+    assert events[0]["date"] >= tomorrow.isoformat() and {e["title"] for e in events} == {"standup"}
+    assert len(events) == 5 and confidence >= INTENT_THRESHOLD
+
+
+def test_series_with_unresolved_dates_go_to_the_planner():
+    for text in ("add standup every weekday at 9 until june 5", "add gym every monday at 7 am for 3 weeks"):
+        assert match_intent(text) == ([], 0.0), text
+
+
+def test_lookups_never_create_events():
+    for text in (
+        "new emails since 9 am",
+        "new mail after 10:30",
+        "set alarm for 7 am",
+        "put the emails from 9 am in a summary",
+        "add up my meetings at 3 pm?",
+        "schedule any emails at 9 am",
+    ):
+        actions, _ = match_intent(text)
+        assert all(a["type"] not in {"schedule_event", "schedule_events"} for a in actions), text
+
+
+def test_long_titles_go_to_the_planner():
+    actions, confidence = match_intent("add dinner with sam and alex near the office at 7 pm")
+    assert actions[0]["type"] == "schedule_event"
+    assert confidence < INTENT_THRESHOLD
@@ -0,0 +1,27 @@
+import random
+
+from interval_index import IntervalIndex
+
+
+def test_matches_brute_force():
+    rng = random.Random(7)
+    intervals = []
+    for i in range(200):
+        start = rng.randint(0, 1000)
+        intervals.append((start, start + rng.randint(0, 60), i))
+    index = IntervalIndex(intervals)
+    for _ in range(200):
+        a = rng.randint(-10, 1050)
+        b = a + rng.randint(1, 80)
+        expected = sorted(p for s, e, p in intervals if e > s and s < b and e > a)
+        assert sorted(index.conflicts(a, b)) == expected
+        for lo, hi in index.free_slots(a, b):
+            assert not [p for s, e, p in intervals if s < hi and e > lo]
+
+
+def test_free_slots_merge_busy_blocks():
+    index = IntervalIndex([(9, 10, "a"), (9.5, 11, "b"), (13, 14, "c"), (14, 14, "empty")])
+    assert index.free_slots(8, 17) == [(8, 9), (11, 13), (14, 17)]
+    assert index.free_slots(8, 17, min_length=2) == [(11, 13), (14, 17)]
+    assert index.busy(10, 13.5) == [(10, 11), (13, 13.5)]
+    assert len(index) == 3
@@ -0,0 +1,40 @@
+import llm_cache
+import llm_client
+
+
+def test_chat_completion_uses_cache(monkeypatch):
+    calls = []
+
+    def fake(model, messages, options, format=None):
+        calls.append(model)
+        return 'reply'
+
+    monkeypatch.setattr(llm_client, '_chat_completion', fake)
+    msgs = [{'role': 'user', 'content': 'hi'}]
+    before = llm_cache.stats()
+    assert llm_client.chat_completion('m', msgs, cache=True) == 'reply'
+    assert llm_client.chat_completion('m', msgs, cache=True) == 'reply'
+    # Uncached by default: sampled answers must not be replayed
+    assert llm_client.chat_completion('m', msgs) == 'reply'
+    assert llm_client.chat_completion('m', msgs, options={'temperature': 0}, cache=True) == 'reply'
+    after = llm_cache.stats()
+    assert len(calls) == 3
+    assert after['hits'] - before['hits'] == 1
+    assert after['misses'] - before['misses'] == 2
+
+
+def test_errors_are_not_cached(monkeypatch):
+    monkeypatch.setattr(llm_client, '_chat_completion', lambda *a: '⚠️ LLM error: 500')
+    msgs = [{'role': 'user', 'content': 'boom'}]
+    llm_client.chat_completion('m', msgs, cache=True)
+    assert llm_cache.get(llm_cache.make_key('m', msgs)) is None
+
+
+def test_size_and_age_eviction(monkeypatch):
+    monkeypatch.setattr(llm_cache, 'MAX_ENTRIES', 2)
+    for i in range(3):
+        llm_cache.put(f'k{i}', 'm', f'r{i}')
+    assert llm_cache.get('k0') is None
+    assert llm_cache.get('k2') == 'r2'
+    monkeypatch.setattr(llm_cache, 'TTL', -1)
+    assert llm_cache.get('k2') is None
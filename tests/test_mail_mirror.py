@@ -0,0 +1,141 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import google_auth
+import mail_mirror
+from date_utils import PT
+
+
+class Expired(Exception):
+    status_code = 404
+
+
+class Call:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result() if callable(self.result) else self.result
+
+
+class FakeGmail:
+    def __init__(self):
+        now = int(time.time() * 1000)
+        self.mail = {}
+        self.records = []
+        self.history_id = 10
+        self.expired = False
+        for i, (sender, subject) in enumerate([
+            ("bank@example.com", "Your statement"),
+            ("alice@example.com", "Lunch plans"),
+            ("bank@example.com", "Payment received"),
+        ]):
+            self.add(f"m{i}", sender, subject, now - i * 3600_000)
+
+    def add(self, msg_id, sender, subject, ts, labels=("INBOX",)):
+        self.mail[msg_id] = {
+            "id": msg_id,
+            "internalDate": str(ts),
+            "labelIds": list(labels),
+            "snippet": f"{subject} snippet",
+            "payload": {"headers": [
+                {"name": "From", "value": sender},
+                {"name": "Subject", "value": subject},
+            ]},
+        }
+
+    # users() and messages() both return self
+    def users(self):
+        return self
+
+    messages = users
+
+    def history(self):
+        return HistoryResource(self)
+
+    def getProfile(self, **kwargs):
+        return Call({"historyId": str(self.history_id)})
+
+    def list(self, **kwargs):
+        return Call({"messages": [{"id": i} for i in self.mail]})
+
+    def get(self, id, **kwargs):
+        return Call(lambda: self.mail[id])
+
+    def new_batch_http_request(self, callback=None):
+        class Batch:
+            def __init__(self):
+                self.items = []
+
+            def add(self, call, request_id=None):
+                self.items.append((request_id, call))
+
+            def execute(self):
+                for request_id, call in self.items:
+                    callback(request_id, call.execute(), None)
+
+        return Batch()
+
+
+class HistoryResource:
+    def __init__(self, gmail):
+        self.gmail = gmail
+
+    def list(self, **kwargs):
+        if self.gmail.expired:
+            def boom():
+                raise Expired()
+            return Call(boom)
+        return Call({"history": self.gmail.records, "historyId": str(self.gmail.history_id)})
+
+
+@pytest.fixture
+def gmail(monkeypatch):
+    fake = FakeGmail()
+    monkeypatch.setattr(google_auth, "build", lambda *a, **k: fake)
+    monkeypatch.setattr(google_auth, "get_credentials", lambda: None)
+    mail_mirror.full_sync()
+    return fake
+
+
+def _subjects(results):
+    return [r["subject"] for r in results]
+
+
+def test_search_is_answered_locally(gmail):
+    today = datetime.now(PT).date()
+    query = f"after:{today - timedelta(days=1):%Y/%m/%d} before:{today + timedelta(days=1):%Y/%m/%d}"
+    assert len(mail_mirror.search(query, limit=10)) == 3
+    assert _subjects(mail_mirror.search("from:bank", limit=2)) == ["Your statement", "Payment received"]
+    # Unsupported operators and incomplete unbounded results go live
+    assert mail_mirror.search("has:attachment") is None
+    assert mail_mirror.search("lunch", limit=5) is None
+
+
+def test_incremental_sync_applies_history(gmail):
+    gmail.add("m9", "carol@example.com", "New invoice", int(time.time() * 1000))
+    gmail.records = [
+        {"messagesAdded": [{"message": {"id": "m9"}}]},
+        {"messagesDeleted": [{"message": {"id": "m1"}}]},
+    ]
+    gmail.history_id = 11
+    assert mail_mirror.incremental_sync() == 2
+    assert _subjects(mail_mirror.search("subject:invoice", limit=1)) == ["New invoice"]
+    assert mail_mirror.search("subject:lunch", limit=1) is None
+
+
+def test_keywords_need_mirrored_bodies(gmail, monkeypatch):
+    # Without bodies a keyword could match only the part the mirror lacks
+    assert mail_mirror.search("statement", limit=1) is None
+    monkeypatch.setattr(mail_mirror, "MIRROR_BODIES", True)
+    assert _subjects(mail_mirror.search("statement", limit=1)) == ["Your statement"]
+
+
+def test_expired_history_triggers_full_sync(gmail):
+    gmail.expired = True
+    gmail.history_id = 42
+    mail_mirror.incremental_sync()
+    import memory_db
+    assert memory_db.get_state(mail_mirror.HISTORY_KEY) == "42"
@@ -0,0 +1,80 @@
+import google_auth
+import mail_watcher
+import memory_db
+
+
+class Call:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        self.owner.requests += 1
+        return self.result
+
+
+class FakeGmail:
+    def __init__(self):
+        self.requests = 0
+        self.history_id = "100"
+        self.records = []
+        self.mail = {}
+
+    def _call(self, result):
+        call = Call(result)
+        call.owner = self
+        return call
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def history(self):
+        return self
+
+    def getProfile(self, **kwargs):
+        return self._call({"historyId": self.history_id})
+
+    def list(self, **kwargs):
+        assert kwargs["startHistoryId"]
+        return self._call({"history": self.records, "historyId": self.history_id})
+
+    def get(self, id, **kwargs):
+        return self._call(self.mail[id])
+
+    def deliver(self, msg_id, subject, labels=("INBOX", "UNREAD")):
+        self.mail[msg_id] = {
+            "id": msg_id,
+            "labelIds": list(labels),
+            "snippet": "",
+            "payload": {"headers": [
+                {"name": "From", "value": "a@example.com"},
+                {"name": "Subject", "value": subject},
+            ]},
+        }
+        self.records.append({"messagesAdded": [{"message": {"id": msg_id, "labelIds": list(labels)}}]})
+        self.history_id = str(int(self.history_id) + 1)
+
+
+def test_only_new_unread_mail_is_reported(monkeypatch):
+    gmail = FakeGmail()
+    monkeypatch.setattr(google_auth, "build", lambda *a, **k: gmail)
+    monkeypatch.setattr(google_auth, "get_credentials", lambda: None)
+
+    # First tick only records the cursor
+    assert mail_watcher.check_new_mail() == []
+    # Idle inbox: one history request, nothing fetched
+    before = gmail.requests
+    assert mail_watcher.check_new_mail() == []
+    assert gmail.requests - before == 1
+
+    gmail.deliver("m1", "Hello")
+    gmail.deliver("m2", "Already read", labels=("INBOX",))
+    new = mail_watcher.check_new_mail()
+    assert [e["subject"] for e in new] == ["Hello"]
+    assert memory_db.get_state(mail_watcher.CURSOR_KEY) == gmail.history_id
+
+    conn = memory_db._connect()
+    assert conn.execute("SELECT subject FROM emails").fetchall() == [("Hello",)]
+    conn.close()
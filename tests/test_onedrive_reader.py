@@ -0,0 +1,114 @@
+import os
+import time
+
+import doc_extract
+import doc_index
+import onedrive_reader
+
+
+def _write(folder, name, text):
+    path = folder / name
+    path.write_text(text)
+    return path
+
+
+def test_search_uses_ranked_index(tmp_path, monkeypatch):
+    drive = tmp_path / "OneDrive"
+    (drive / "notes").mkdir(parents=True)
+    _write(drive, "budget.txt", "Quarterly budget for the offsite, catering included.")
+    _write(drive / "notes", "offsite.md", "Offsite agenda: planning, budget review, offsite dinner.")
+    _write(drive, "ignored.png", "offsite")
+    monkeypatch.setattr(onedrive_reader, "ONEDRIVE_DIR", str(drive))
+
+    extracted = []
+    real_extract = onedrive_reader._extract
+    monkeypatch.setattr(onedrive_reader, "_extract", lambda p: extracted.append(p) or real_extract(p))
+
+    hits = onedrive_reader.search("offsite")
+    # The file named after the query ranks first; the .png is not indexed
+    assert [h["name"] for h in hits] == ["offsite.md", "budget.txt"]
+    assert "offsite" in hits[1]["snippet"].lower()
+    assert onedrive_reader.search("catering")[0]["name"] == "budget.txt"
+    assert onedrive_reader.search("cater")[0]["name"] == "budget.txt"
+    assert onedrive_reader.search('"; DROP') == []
+    # Every document was parsed once, at index time
+    assert len(extracted) == 2
+
+
+def test_reindex_only_touches_changed_files(tmp_path, monkeypatch):
+    drive = tmp_path / "OneDrive"
+    drive.mkdir()
+    keep = _write(drive, "keep.txt", "alpha")
+    edit = _write(drive, "edit.txt", "beta")
+    gone = _write(drive, "gone.txt", "gamma")
+    monkeypatch.setattr(onedrive_reader, "ONEDRIVE_DIR", str(drive))
+    assert onedrive_reader.refresh_index() == {"added": 3, "updated": 0, "removed": 0, "quarantined": 0}
+
+    extracted = []
+    real_extract = onedrive_reader._extract
+    monkeypatch.setattr(onedrive_reader, "_extract", lambda p: extracted.append(p) or real_extract(p))
+    edit.write_text("beta delta")
+    os.utime(edit, (time.time() + 5, time.time() + 5))
+    gone.unlink()
+    _write(drive, "new.txt", "epsilon")
+    assert onedrive_reader.refresh_index() == {"added": 1, "updated": 1, "removed": 1, "quarantined": 0}
+    assert sorted(os.path.basename(p) for p in extracted) == ["edit.txt", "new.txt"]
+    assert onedrive_reader.search("delta")[0]["name"] == "edit.txt"
+    assert onedrive_reader.search("gamma") == []
+    assert str(keep) not in extracted
+
+
+def test_polling_watcher_picks_up_new_files(tmp_path, monkeypatch):
+    drive = tmp_path / "OneDrive"
+    drive.mkdir()
+    monkeypatch.setattr(onedrive_reader, "ONEDRIVE_DIR", str(drive))
+    monkeypatch.setattr(onedrive_reader, "Observer", None)
+    # Searches must not rescan on their own
+    monkeypatch.setattr(onedrive_reader, "INDEX_INTERVAL", 3600)
+    onedrive_reader.start_watcher(interval=0.05)
+    try:
+        _write(drive, "later.md", "watched words")
+        deadline = time.time() + 5
+        while not onedrive_reader.search("watched") and time.time() < deadline:
+            time.sleep(0.05)
+        assert onedrive_reader.search("watched")[0]["name"] == "later.md"
+    finally:
+        onedrive_reader.stop_watcher()
+
+
+def _slow_extract(path):
+    name = os.path.basename(path)
+    if name.startswith("hang"):
+        time.sleep(30)
+    if name.startswith("bad"):
+        raise ValueError("corrupt file")
+    with open(path) as f:
+        return f.read()
+
+
+def test_pool_extraction_quarantines_hangs_and_failures(tmp_path, monkeypatch):
+    drive = tmp_path / "OneDrive"
+    drive.mkdir()
+    for i in range(6):
+        _write(drive, f"doc{i}.txt", f"body {i}")
+    _write(drive, "hang.txt", "never")
+    _write(drive, "bad.txt", "broken")
+    monkeypatch.setattr(onedrive_reader, "ONEDRIVE_DIR", str(drive))
+    real_extract = onedrive_reader._extract
+    monkeypatch.setattr(onedrive_reader, "_extract", _slow_extract)
+    monkeypatch.setattr(doc_extract, "WORKERS", 2)
+    monkeypatch.setattr(doc_extract, "TIMEOUT", 1.0)
+
+    counts = onedrive_reader.refresh_index()
+    assert counts == {"added": 6, "updated": 0, "removed": 0, "quarantined": 2}
+    reasons = {os.path.basename(p): r for p, (_, _, r) in doc_index.quarantined().items()}
+    assert reasons == {"hang.txt": "timed out after 1s", "bad.txt": "ValueError: corrupt file"}
+    assert doc_extract.last_stats["files"] == 8 and doc_extract.last_stats["files_per_s"] > 0
+
+    # Quarantined files are not retried until they change
+    assert onedrive_reader.refresh_index()["quarantined"] == 0
+    _write(drive, "bad.txt", "fixed now")
+    monkeypatch.setattr(onedrive_reader, "_extract", real_extract)
+    assert onedrive_reader.refresh_index()["added"] == 1
+    assert onedrive_reader.search("fixed")[0]["name"] == "bad.txt"
+    assert list(doc_index.quarantined()) == [str(drive / "hang.txt")]
@@ -0,0 +1,54 @@
+import json
+
+import assistant_router as ar
+import tracing
+
+
+def test_schema_covers_registry():
+    variants = ar.plan_schema()["properties"]["actions"]["items"]["anyOf"]
+    names = {v["properties"]["type"]["enum"][0] for v in variants}
+    assert names == set(ar.TOOL_REGISTRY) & set(ar.TOOL_SPECS)
+
+
+def test_validate_actions():
+    valid, errors = ar.validate_actions([
+        {"type": "search_email", "query": "today", "extra": 1},
+        {"tool": "get_calendar", "date": "today"},
+        {"type": "get_calendar"},
+        {"type": "summarize", "source": "slack"},
+        {"type": "launch_rockets"},
+    ])
+    assert valid == [
+        {"type": "search_email", "query": "today"},
+        {"type": "get_calendar", "date": "today"},
+    ]
+    assert len(errors) == 3
+
+
+def test_json_plan_retries_with_errors(monkeypatch):
+    tracing.reset()
+    replies = iter([
+        json.dumps({"actions": [{"type": "get_calendar"}]}),
+        json.dumps({"actions": [{"type": "get_calendar", "date": "today"}]}),
+    ])
+    calls = []
+
+    def fake(model, messages, options=None, format=None, cache=False):
+        calls.append((messages, format))
+        return next(replies)
+
+    monkeypatch.setattr(ar, "PLANNER_JSON_MODE", True)
+    monkeypatch.setattr(ar, "chat_completion", fake)
+    assert ar.plan_actions("what's on today", "m") == [{"type": "get_calendar", "date": "today"}]
+    assert calls[0][1] == ar.plan_schema()
+    assert "missing date" in calls[1][0][-1]["content"]
+    counts = tracing.counter_values("planner_parse_total")
+    assert counts[(("attempt", "1"), ("mode", "json"), ("result", "invalid"))] == 1
+    assert counts[(("attempt", "2"), ("mode", "json"), ("result", "ok"))] == 1
+
+
+def test_reflection_revises_in_one_call(monkeypatch):
+    revised = {"proceed": False, "actions": [{"type": "search_email", "query": "bank"}]}
+    monkeypatch.setattr(ar, "chat_completion", lambda *a, **k: json.dumps(revised))
+    out = ar._reflect_json("bank mail", [{"type": "chat"}], "m")
+    assert out == [{"type": "search_email", "query": "bank"}]
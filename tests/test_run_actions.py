@@ -0,0 +1,46 @@
+import threading
+import time
+
+import assistant_router as ar
+
+
+def test_independent_actions_run_concurrently(monkeypatch):
+    barrier = threading.Barrier(2, timeout=2)
+
+    def slow(name):
+        def tool(a):
+            barrier.wait()
+            return [{"subject": name}]
+        return tool
+
+    monkeypatch.setitem(ar.TOOL_REGISTRY, "search_email", slow("mail"))
+    monkeypatch.setitem(ar.TOOL_REGISTRY, "get_calendar", slow("event"))
+    monkeypatch.setitem(ar.TOOL_REGISTRY, "summarize", lambda a: f"summary of {a['_results'][a['source']]}")
+    results = ar.run_actions([
+        {"type": "summarize", "source": "email"},
+        {"type": "search_email"},
+        {"type": "get_calendar"},
+    ])
+    assert list(results) == ["summarize", "search_email", "email", "get_calendar", "calendar"]
+    assert results["summarize"] == "summary of [{'subject': 'mail'}]"
+
+
+def test_slow_action_times_out(monkeypatch):
+    monkeypatch.setattr(ar, "TOOL_TIMEOUT", 0.1)
+    monkeypatch.setitem(ar.TOOL_REGISTRY, "search_email", lambda a: time.sleep(1))
+    monkeypatch.setitem(ar.TOOL_REGISTRY, "get_calendar", lambda a: [])
+    start = time.monotonic()
+    results = ar.run_actions([{"type": "search_email"}, {"type": "get_calendar"}])
+    assert time.monotonic() - start < 0.5
+    assert results["search_email"].endswith("timed out")
+    assert results["calendar"] == []
+
+
+def test_dependent_action_times_out(monkeypatch):
+    monkeypatch.setattr(ar, "TOOL_TIMEOUT", 0.1)
+    monkeypatch.setitem(ar.TOOL_REGISTRY, "get_calendar", lambda a: [])
+    monkeypatch.setitem(ar.TOOL_REGISTRY, "summarize", lambda a: time.sleep(1))
+    start = time.monotonic()
+    results = ar.run_actions([{"type": "get_calendar"}, {"type": "summarize", "source": "calendar"}])
+    assert time.monotonic() - start < 0.5
+    assert results["summarize"].endswith("timed out")
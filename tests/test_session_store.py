@@ -0,0 +1,28 @@
+import time
+
+import session_store
+from user_settings import get_selected_model, set_selected_model
+
+
+def test_sessions_are_isolated():
+    with session_store.use_session("tab-a"):
+        set_selected_model("gpt-4o")
+        session_store.get_session()["last_tool_output"] = {"email": []}
+    with session_store.use_session("tab-b"):
+        set_selected_model("qwen3:30b-a3b")
+        assert session_store.get_session()["last_tool_output"] == {}
+    with session_store.use_session("tab-a"):
+        assert get_selected_model() == "gpt-4o"
+        assert session_store.get_session()["last_tool_output"] == {"email": []}
+
+
+def test_bounded_and_idle_eviction(monkeypatch):
+    monkeypatch.setattr(session_store, "_sessions", session_store.OrderedDict())
+    monkeypatch.setattr(session_store, "MAX_SESSIONS", 2)
+    for sid in ("s1", "s2", "s3"):
+        session_store.get_session(sid)
+    assert list(session_store._sessions) == ["s2", "s3"]
+    time.sleep(0.01)
+    monkeypatch.setattr(session_store, "SESSION_IDLE_TIMEOUT", 0)
+    session_store.get_session("s4")
+    assert list(session_store._sessions) == ["s4"]
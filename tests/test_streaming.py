@@ -0,0 +1,57 @@
+import json
+import llm_client
+import tracing
+import assistant_router as ar
+
+
+class FakeResponse:
+    def __init__(self, lines):
+        self.lines = lines
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self):
+        return iter(self.lines)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def test_stream_ollama_ndjson(monkeypatch):
+    lines = [
+        json.dumps({"message": {"content": "Hel"}, "done": False}).encode(),
+        b"",
+        json.dumps({"message": {"content": "lo"}, "done": False}).encode(),
+        json.dumps({"message": {"content": ""}, "done": True}).encode(),
+    ]
+    session = type("S", (), {"post": lambda self, *a, **k: FakeResponse(lines)})()
+    monkeypatch.setattr(llm_client, "get_session", lambda name: session)
+    chunks = list(llm_client.stream_chat_completion("qwen3:30b-a3b", []))
+    assert chunks == ["Hel", "lo"]
+
+
+def test_route_stream_saves_full_reply(monkeypatch):
+    saved = {}
+    monkeypatch.setattr(ar, "_load_model", lambda: "qwen3:30b-a3b")
+    monkeypatch.setattr(ar, "stream_chat_completion", lambda model, msgs: iter(["Hi", " there"]))
+    monkeypatch.setattr(ar, "save_message", lambda q, r: saved.update(q=q, r=r))
+    chunks = list(ar.route_stream("hello"))
+    assert chunks == ["Hi", " there"]
+    assert saved == {"q": "hello", "r": "Hi there"}
+
+
+def test_route_stream_records_route_span(monkeypatch):
+    monkeypatch.setattr(ar, "_load_model", lambda: "qwen3:30b-a3b")
+    monkeypatch.setattr(ar, "stream_chat_completion", lambda model, msgs: iter(["Hi", " there"]))
+    monkeypatch.setattr(ar, "save_message", lambda q, r: None)
+    tracing.reset()
+    stream = ar.route_stream("hello")
+    assert next(stream) == "Hi"
+    assert "router.route" not in tracing._histograms
+    stream.close()
+    assert tracing._histograms["router.route"]["count"] == 1
+    assert tracing._errors.get("router.route", 0) == 0
@@ -0,0 +1,58 @@
+import os
+import time
+
+import onedrive_reader
+import summarizer
+import text_cache
+
+
+def test_extract_hits_by_stat_and_by_content(tmp_path):
+    doc = tmp_path / "a.txt"
+    doc.write_text("hello world")
+    calls = []
+
+    def extractor(path):
+        calls.append(path)
+        return open(path).read().upper()
+
+    assert text_cache.extract(str(doc), extractor) == "HELLO WORLD"
+    assert text_cache.extract(str(doc), extractor) == "HELLO WORLD"
+    # Touched and copied files are found by content hash
+    os.utime(doc, (time.time() + 10, time.time() + 10))
+    copy = tmp_path / "b.txt"
+    copy.write_text("hello world")
+    assert text_cache.extract(str(doc), extractor) == "HELLO WORLD"
+    assert text_cache.extract(str(copy), extractor) == "HELLO WORLD"
+    assert len(calls) == 1
+    assert text_cache.stats()["entries"] == 1
+
+
+def test_lru_eviction_by_size(tmp_path, monkeypatch):
+    paths = []
+    for i in range(3):
+        doc = tmp_path / f"{i}.txt"
+        doc.write_text(str(i))
+        paths.append(str(doc))
+        text_cache.put(paths[-1], 1, 1.0, os.urandom(600).hex())
+        if i == 0:
+            # Room for two entries
+            monkeypatch.setattr(text_cache, "MAX_BYTES", text_cache.stats()["bytes"] * 2 + 100)
+        if i == 1:
+            assert text_cache.get(paths[0], 1, 1.0) is not None  # keep 0 recent
+    assert text_cache.get(paths[1], 1, 1.0, by_content=False) is None
+    assert text_cache.get(paths[0], 1, 1.0) is not None
+    assert text_cache.stats()["evictions"] == 1
+
+
+def test_summarizer_reuses_text_extracted_for_search(tmp_path, monkeypatch):
+    drive = tmp_path / "OneDrive"
+    drive.mkdir()
+    (drive / "plan.md").write_text("Roadmap: ship the index first.")
+    monkeypatch.setattr(onedrive_reader, "ONEDRIVE_DIR", str(drive))
+    calls = []
+    real_extract = onedrive_reader._extract
+    monkeypatch.setattr(onedrive_reader, "_extract", lambda p: calls.append(p) or real_extract(p))
+    monkeypatch.setattr(summarizer, "gpt", lambda prompt, model=None: prompt)
+    assert onedrive_reader.search("roadmap")[0]["name"] == "plan.md"
+    assert "ship the index" in summarizer.summarize_document(str(drive / "plan.md"))
+    assert len(calls) == 1
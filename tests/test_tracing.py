@@ -0,0 +1,43 @@
+import pytest
+from flask import Flask
+
+import InsightMate.Scripts.server_common as server_common
+import assistant_router as ar
+import tracing
+
+
+@pytest.fixture(autouse=True)
+def _fresh_metrics():
+    tracing.reset()
+    yield
+    tracing.reset()
+
+
+def test_span_records_duration_and_errors():
+    with tracing.start_trace() as trace:
+        with tracing.span("stage.ok"):
+            pass
+        with pytest.raises(ValueError):
+            with tracing.span("stage.fail"):
+                raise ValueError("boom")
+    text = tracing.render_prometheus()
+    assert 'insightmate_span_duration_seconds_count{span="stage.ok"} 1' in text
+    assert 'insightmate_span_errors_total{span="stage.fail"} 1' in text
+    assert [s["name"] for s in tracing.get_trace(trace["id"])["spans"]] == ["stage.ok", "stage.fail"]
+
+
+def test_chat_returns_trace_id_and_metrics(monkeypatch):
+    monkeypatch.setattr(ar, "_load_model", lambda: "qwen3:30b-a3b")
+    monkeypatch.setattr(ar, "chat_completion", lambda model, msgs, **kw: "Hi there")
+    app = Flask(__name__)
+    server_common.register_common(app)
+    client = app.test_client()
+
+    res = client.post("/chat", json={"query": "hello"})
+    trace_id = res.get_json()["trace_id"]
+    spans = client.get(f"/trace/{trace_id}").get_json()["spans"]
+    assert "router.route" in [s["name"] for s in spans]
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'insightmate_span_duration_seconds_count{span="router.route"} 1' in text
+    assert "insightmate_llm_cache_hits" in text
@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import assistant_router as ar
+import onedrive_reader
+import vector_index
+
+# Words that mean the same thing share an embedding dimension
+CONCEPTS = {
+    "car": 0, "automobile": 0, "vehicle": 0,
+    "budget": 1, "money": 1, "costs": 1, "spending": 1,
+    "holiday": 2, "vacation": 2, "trip": 2,
+}
+
+
+def fake_embed(texts):
+    fake_embed.calls += 1
+    out = []
+    for text in texts:
+        vec = [0.0] * 4
+        for word in text.lower().split():
+            vec[CONCEPTS.get(word.strip(".,?"), 3)] += 1
+        out.append(vec)
+    return out
+
+
+@pytest.fixture
+def drive(tmp_path, monkeypatch):
+    folder = tmp_path / "OneDrive"
+    folder.mkdir()
+    (folder / "garage.txt").write_text("Notes on the car and the vehicle service schedule.")
+    (folder / "plans.md").write_text("Vacation ideas: a trip to the coast for the holiday.")
+    (folder / "ledger.txt").write_text("Household budget and monthly spending.")
+    monkeypatch.setattr(onedrive_reader, "ONEDRIVE_DIR", str(folder))
+    fake_embed.calls = 0
+    monkeypatch.setattr(vector_index, "_post_embed", fake_embed)
+    # Tests refresh explicitly instead of racing the background thread
+    monkeypatch.setattr(vector_index, "SYNC_INTERVAL", 3600)
+    onedrive_reader.refresh_index()
+    vector_index.refresh()
+    return folder
+
+
+def test_chunks_overlap_and_break_at_spaces():
+    text = " ".join(f"w{i}" for i in range(200))
+    chunks = vector_index.chunk_text(text, size=100, overlap=30)
+    assert all(len(c) <= 100 for c in chunks)
+    assert all(not c.startswith(" ") and not c.endswith(" ") for c in chunks)
+    # Each chunk starts with words from the end of the previous one
+    assert all(b.split()[0] in a.split() for a, b in zip(chunks, chunks[1:]))
+    assert chunks[-1].endswith("w199")
+
+
+def test_semantic_search_finds_paraphrases(drive, monkeypatch):
+    hits = vector_index.search("automobile", k=2)
+    assert hits[0]["name"] == "garage.txt" and hits[0]["score"] > hits[1]["score"]
+    results = vector_index.search_many(["money", "vacation"], k=1)
+    assert [r[0]["name"] for r in results] == ["ledger.txt", "plans.md"]
+
+    # Only the edited document is embedded again; deleted ones disappear
+    calls = fake_embed.calls
+    ledger = drive / "ledger.txt"
+    ledger.write_text("Trip itinerary for the vacation.")
+    os.utime(ledger, (time.time() + 5, time.time() + 5))
+    (drive / "plans.md").unlink()
+    onedrive_reader.refresh_index()
+    vector_index.refresh()
+    assert vector_index.search("holiday", k=3)[0]["name"] == "ledger.txt"
+    # One embed request for the changed document, one for the query
+    assert fake_embed.calls == calls + 2
+    assert {h["name"] for h in vector_index.search("holiday", k=3)} == {"ledger.txt", "garage.txt"}
+
+    assert vector_index.compact() == 2
+    assert vector_index.search("car", k=1)[0]["name"] == "garage.txt"
+
+
+def test_first_query_does_not_wait_for_embedding(tmp_path, monkeypatch):
+    folder = tmp_path / "OneDrive"
+    folder.mkdir()
+    (folder / "garage.txt").write_text("Notes on the car.")
+    monkeypatch.setattr(onedrive_reader, "ONEDRIVE_DIR", str(folder))
+    fake_embed.calls = 0
+    release = threading.Event()
+
+    def slow_embed(texts):
+        release.wait(5)
+        return fake_embed(texts)
+
+    monkeypatch.setattr(vector_index, "_post_embed", slow_embed)
+    # Nothing is embedded yet: the query returns at once and callers fall back
+    assert vector_index.search("automobile") is None
+    release.set()
+    vector_index._refresh_thread.join(timeout=5)
+    assert vector_index.search("automobile")[0]["name"] == "garage.txt"
+
+
+def test_search_documents_tool_respects_token_budget(drive, monkeypatch):
+    out = ar._search_documents({"query": "vehicle", "tokens": 15})
+    assert [e["name"] for e in out] == ["garage.txt"]
+
+    # Without vector search the tool falls back to keyword snippets
+    monkeypatch.setattr(vector_index, "ENABLED", False)
+    out = ar._search_documents({"query": "budget"})
+    assert out[0]["name"] == "ledger.txt" and "budget" in out[0]["text"].lower()
+
+
+def test_route_answers_from_document_excerpts(drive, monkeypatch):
+    prompts = []
+    monkeypatch.setattr(vector_index, "ENABLED", False)
+    monkeypatch.setattr(ar, "get_selected_model", lambda: "m")
+    monkeypatch.setattr(ar, "save_message", lambda q, r: None)
+    monkeypatch.setattr(
+        ar, "_plan_with_llm", lambda prompt, model: [{"type": "search_documents", "query": "budget"}]
+    )
+    monkeypatch.setattr(ar, "gpt", lambda prompt, model=None, **kw: prompts.append(prompt) or "Spending is tracked.")
+    assert ar.route("what is in my household budget file") == "Spending is tracked."
+    assert "ledger.txt" in prompts[0] and "Household budget" in prompts[0]
+    assert "Question: what is in my household budget file" in prompts[0]
+    assert ar.estimate_tokens(prompts[0]) < ar.DOC_CONTEXT_TOKENS + 100
+
+
+def test_document_excerpts_render_in_results():
+    out = ar.format_results({"search_documents": [{"name": "a.txt", "path": "/d/a.txt", "text": "hello"}]})
+    assert out == "• a.txt (/d/a.txt)\n  hello"
+
+
+def test_concurrent_queries_start_one_refresh(monkeypatch):
+    release = threading.Event()
+    started = []
+    monkeypatch.setattr(
+        vector_index, "_refresh_in_background", lambda: started.append(1) or release.wait(5)
+    )
+    threads = [threading.Thread(target=vector_index._start_refresh) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    release.set()
+    vector_index._refresh_thread.join(timeout=5)
+    assert started == [1]